@@ -0,0 +1,240 @@
+from __future__ import annotations
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+from board import (BOARD_SIZE, ZOBRIST_BLACK, ZOBRIST_FLIP, ZOBRIST_SIDE, ZOBRIST_WHITE,
+                   Board, Tile, flipped_tiles, legal_moves, popcount)
+from endgame import EndgameSolver
+from transposition import EXACT, LOWER_BOUND, NO_MOVE, UPPER_BOUND, TranspositionTable
+
+if TYPE_CHECKING:
+    from book import OpeningBook
+
+COMPUTER_UID = "computer"
+
+WIN_SCORE = 1_000_000
+INFINITY = 10 * WIN_SCORE
+TIME_CHECK_INTERVAL = 256  # nodes searched between two deadline checks
+
+CORNERS = 0x8100_0000_0000_0081
+X_SQUARES = 0x0042_0000_0000_4200  # diagonal neighbours of the corners
+C_SQUARES = 0x4281_0000_0000_8142  # edge neighbours of the corners
+EDGES = 0x3C00_8181_8181_003C  # remaining edge squares
+INNER = ~(CORNERS | X_SQUARES | C_SQUARES | EDGES) & 0xFFFF_FFFF_FFFF_FFFF
+
+
+@dataclass(frozen=True)
+class EngineConfig:
+    time_budget: float = 1.0  # hard limit for a single move, in seconds
+    max_depth: int = 60
+    tt_memory_bytes: int = 4 * 1024 * 1024
+    mobility_weight: int = 8
+    corner_weight: int = 100
+    x_square_weight: int = -50
+    c_square_weight: int = -20
+    edge_weight: int = 5
+    inner_weight: int = -1
+    book_min_games: int = 4  # book moves played fewer times are ignored
+    endgame_empties: int = 14  # solve the game exactly from this many empty squares, 0 to never try
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+def _square_priorities(config: EngineConfig) -> list[int]:
+    priorities = []
+    for square in range(BOARD_SIZE * BOARD_SIZE):
+        bit = 1 << square
+        if bit & CORNERS:
+            priorities.append(config.corner_weight)
+        elif bit & X_SQUARES:
+            priorities.append(config.x_square_weight)
+        elif bit & C_SQUARES:
+            priorities.append(config.c_square_weight)
+        elif bit & EDGES:
+            priorities.append(config.edge_weight)
+        else:
+            priorities.append(config.inner_weight)
+    return priorities
+
+
+class Engine:
+    """
+    Computer player: negamax alpha-beta search with iterative deepening, a transposition table
+    and a hard wall-clock budget per move. Follows the same rules as `Board.winner`,
+    so the game ends as soon as either player has no valid move.
+    With an opening book, well-tested book moves are played without searching, and close to the
+    end of the game half of the budget goes to solving it exactly before falling back to the search.
+    """
+
+    def __init__(self, config: EngineConfig = EngineConfig(), book: Optional[OpeningBook] = None) -> None:
+        self._config = config
+        self._book = book
+        self._solver: Optional[EndgameSolver] = None  # created for the first endgame
+        self._tt = TranspositionTable(config.tt_memory_bytes)
+        self._priorities = _square_priorities(config)
+        self._weighted_masks = [
+            (CORNERS, config.corner_weight),
+            (X_SQUARES, config.x_square_weight),
+            (C_SQUARES, config.c_square_weight),
+            (EDGES, config.edge_weight),
+            (INNER, config.inner_weight),
+        ]
+        self._deadline = 0.0
+        self._nodes = 0
+
+        self.last_depth = 0
+        self.last_nodes = 0
+
+    def choose_move(self, board: Board, color: Tile) -> Optional[tuple[int, int]]:
+        """
+        Returns the best (row, col) found within the time budget, or None if `color` cannot move.
+        """
+
+        started = time.perf_counter()
+        self._deadline = started + self._config.time_budget
+        self._nodes = 0
+        self._tt.new_search()
+
+        own, opp = board._masks(color)
+        moves = legal_moves(own, opp)
+        if not moves:
+            return None
+
+        if self._book is not None:
+            book_move = self._book.best_move(board, color, self._config.book_min_games)
+            if book_move is not None and moves >> (book_move[0] * BOARD_SIZE + book_move[1]) & 1:
+                self.last_depth = 0
+                self.last_nodes = 0
+                return book_move
+
+        empties = popcount(~(own | opp) & 0xFFFF_FFFF_FFFF_FFFF)
+        if empties <= self._config.endgame_empties:
+            if self._solver is None:
+                self._solver = EndgameSolver(self._config.time_budget / 2, self._config.tt_memory_bytes)
+            solution = self._solver.solve(board, color)
+            if solution is not None and solution.move is not None:
+                self.last_depth = empties
+                self.last_nodes = solution.nodes
+                return solution.move
+
+        key = board.zobrist ^ (ZOBRIST_SIDE if color == Tile.WHITE else 0)
+        best_move = self._ordered(moves, NO_MOVE)[0]
+        self.last_depth = 0
+
+        try:
+            for depth in range(1, self._config.max_depth + 1):
+                best_move = self._search_root(own, opp, key, color == Tile.BLACK, depth, best_move)
+                self.last_depth = depth
+                if depth >= popcount(~(own | opp) & 0xFFFF_FFFF_FFFF_FFFF):
+                    break  # searched to the end of the game
+                if time.perf_counter() - started > self._config.time_budget / 2:
+                    break  # the next iteration would not finish in time anyway
+        except _SearchTimeout:
+            pass
+
+        self.last_nodes = self._nodes
+        return divmod(best_move, BOARD_SIZE)
+
+    def _search_root(self, own: int, opp: int, key: int, black: bool, depth: int, previous_best: int) -> int:
+        alpha = -INFINITY
+        best_move = previous_best
+        for square in self._ordered(legal_moves(own, opp), previous_best):
+            value = -self._negamax(*self._play(own, opp, key, black, square), depth - 1, -INFINITY, -alpha)
+            if value > alpha:
+                alpha = value
+                best_move = square
+        self._tt.store(key, depth, alpha, EXACT, best_move)
+        return best_move
+
+    def _play(self, own: int, opp: int, key: int, black: bool, square: int) -> tuple[int, int, int, bool]:
+        """
+        Plays `square` for the side to move and returns the child node from the opponent's perspective.
+        """
+
+        bit = 1 << square
+        flipped = flipped_tiles(own, opp, bit)
+        key ^= ZOBRIST_SIDE ^ (ZOBRIST_BLACK[square] if black else ZOBRIST_WHITE[square])
+        bits = flipped
+        while bits:
+            low = bits & -bits
+            key ^= ZOBRIST_FLIP[low.bit_length() - 1]
+            bits ^= low
+        return opp & ~flipped, own | bit | flipped, key, not black
+
+    def _negamax(self, own: int, opp: int, key: int, black: bool, depth: int, alpha: int, beta: int) -> int:
+        self._nodes += 1
+        if self._nodes % TIME_CHECK_INTERVAL == 0 and time.perf_counter() >= self._deadline:
+            raise _SearchTimeout()
+
+        moves = legal_moves(own, opp)
+        opp_moves = legal_moves(opp, own)
+        if not moves or not opp_moves:
+            difference = popcount(own) - popcount(opp)
+            if difference > 0:
+                return WIN_SCORE + difference
+            elif difference < 0:
+                return -WIN_SCORE + difference
+            return 0
+
+        if depth == 0:
+            return self._evaluate(own, opp, moves, opp_moves)
+
+        original_alpha = alpha
+        tt_move = NO_MOVE
+        entry = self._tt.probe(key)
+        if entry is not None:
+            tt_move = entry.move
+            if entry.depth >= depth:
+                if entry.flag == EXACT:
+                    return entry.value
+                elif entry.flag == LOWER_BOUND:
+                    alpha = max(alpha, entry.value)
+                else:
+                    beta = min(beta, entry.value)
+                if alpha >= beta:
+                    return entry.value
+
+        best_value = -INFINITY
+        best_move = NO_MOVE
+        for square in self._ordered(moves, tt_move):
+            value = -self._negamax(*self._play(own, opp, key, black, square), depth - 1, -beta, -alpha)
+            if value > best_value:
+                best_value = value
+                best_move = square
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+
+        if best_value <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_value >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self._tt.store(key, depth, best_value, flag, best_move)
+        return best_value
+
+    def _evaluate(self, own: int, opp: int, moves: int, opp_moves: int) -> int:
+        value = self._config.mobility_weight * (popcount(moves) - popcount(opp_moves))
+        for mask, weight in self._weighted_masks:
+            value += weight * (popcount(own & mask) - popcount(opp & mask))
+        return value
+
+    def _ordered(self, moves: int, first: int) -> list[int]:
+        """
+        Squares of `moves`, the transposition table move first and then by square priority.
+        """
+
+        squares = []
+        while moves:
+            low = moves & -moves
+            squares.append(low.bit_length() - 1)
+            moves ^= low
+        squares.sort(key=self._priorities.__getitem__, reverse=True)
+        if first in squares:
+            squares.remove(first)
+            squares.insert(0, first)
+        return squares
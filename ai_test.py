@@ -0,0 +1,28 @@
+import time
+from ai import Engine, EngineConfig
+from board import Board
+from board import Tile
+
+
+def test_engine_moves_within_budget():
+    board = Board.deserialize("........|.B......|..B.....|...BB...|...WW...|........|........|........")
+    engine = Engine(EngineConfig(time_budget=0.2))
+
+    started = time.perf_counter()
+    move = engine.choose_move(board, Tile.WHITE)
+    elapsed = time.perf_counter() - started
+
+    assert move is not None and board._is_move_valid(Tile.WHITE, *move), f'test_engine_moves_within_budget(): invalid move {move}'
+    assert engine.last_depth >= 1 and engine.last_nodes > 0, 'test_engine_moves_within_budget(): nothing searched'
+    assert elapsed < 2.0, f'test_engine_moves_within_budget(): took {elapsed:.3f}s, ignoring its 0.2s budget'
+
+
+def test_engine_passes_without_moves():
+    board = Board.deserialize("BBBBBBBB|BBBBBBBB|BBBBBBBB|BBBBBBBB|BBBBBBBB|BBBBBBBB|BBBBBBBB|BBBBBBB.")
+    assert Engine().choose_move(board, Tile.WHITE) is None, 'test_engine_passes_without_moves(): expected no move'
+
+
+if __name__ == '__main__':
+    test_engine_moves_within_budget()
+    test_engine_passes_without_moves()
+    print("AI tested successful, all tests passed")
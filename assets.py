@@ -0,0 +1,264 @@
+"""
+Precompiled RGB565 asset pack and a compositor that draws board frames directly in RGB565.
+
+    python assets.py    # (re)build the pack from img/ and minecraft_font.ttf
+
+The pack holds every image of img/ as big-endian RGB565 (the panel's own format) plus a 1-bit
+alpha plane, and the score digits of the font as alpha-only glyphs. It is loaded with mmap, so the
+arrays handed out by `AssetPack` are views into the file and PIL is only needed to build it.
+"""
+
+from __future__ import annotations
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+import log
+from board import (BLACK_SCORE_POSITION, BOARD_SIZE, TILE_SIZE, TURN_INDICATOR_POSITION, WHITE_SCORE_POSITION,
+                   Board, Tile)
+
+ASSET_PACK_PATH = "./img/assets.bin"
+IMAGE_DIRECTORY = "./img"
+FONT_PATH = "./minecraft_font.ttf"
+FONT_SIZE = 8
+GLYPHS = "0123456789"
+
+MAGIC = b"OTH5"
+VERSION = 1
+HEADER = struct.Struct("<4sHH")  # magic, version, entry count
+ENTRY = struct.Struct("<24sHHhhhBxI")  # name, width, height, x offset, y offset, advance, flags, data offset
+FLAG_COLOR = 1  # followed by width * height big-endian RGB565 pixels
+FLAG_ALPHA = 2  # followed by width * height bytes, 1 where the pixel is opaque
+
+WHITE_565 = 0xFFFF
+FRAME_WIDTH = 96
+FRAME_HEIGHT = 64
+
+
+@dataclass(frozen=True)
+class Asset:
+    name: str
+    rgb565: Optional[np.ndarray]  # (height, width) big-endian uint16, None for glyphs
+    alpha: Optional[np.ndarray]  # (height, width) bool, None for fully opaque images
+    x_offset: int = 0
+    y_offset: int = 0
+    advance: int = 0
+
+
+def _to_rgb565(pixels: np.ndarray) -> np.ndarray:
+    pixels = pixels.astype(np.uint16)
+    rgb565 = ((pixels[..., 0] & 0xF8) << 8) | ((pixels[..., 1] & 0xFC) << 3) | (pixels[..., 2] >> 3)
+    return rgb565.astype(">u2")
+
+
+def build_pack(path: str = ASSET_PACK_PATH) -> None:
+    """
+    Convert img/*.png and the score glyphs into a pack at `path`. Requires PIL.
+    """
+
+    from PIL import Image, ImageDraw, ImageFont
+
+    entries = []  # (name, width, height, x offset, y offset, advance, flags, payload)
+    for file_name in sorted(os.listdir(IMAGE_DIRECTORY)):
+        if not file_name.endswith(".png"):
+            continue
+        pixels = np.asarray(Image.open(os.path.join(IMAGE_DIRECTORY, file_name)).convert("RGBA"))
+        height, width = pixels.shape[:2]
+        payload = _to_rgb565(pixels).tobytes()
+        flags = FLAG_COLOR
+        opaque = pixels[..., 3] >= 128
+        if not opaque.all():
+            payload += opaque.astype(np.uint8).tobytes()
+            flags |= FLAG_ALPHA
+        entries.append((file_name[:-len(".png")], width, height, 0, 0, 0, flags, payload))
+
+    font = ImageFont.truetype(FONT_PATH, FONT_SIZE)
+    for glyph in GLYPHS:
+        advance = int(font.getlength(glyph))
+        canvas = Image.new("L", (advance, 2 * FONT_SIZE))
+        ImageDraw.Draw(canvas).text((0, 0), glyph, font=font, fill=255)
+        left, top, right, bottom = canvas.getbbox()
+        mask = np.asarray(canvas.crop((left, top, right, bottom))) >= 128
+        entries.append((f"glyph-{glyph}", right - left, bottom - top, left, top, advance, FLAG_ALPHA,
+                        mask.astype(np.uint8).tobytes()))
+
+    offset = HEADER.size + ENTRY.size * len(entries)
+    with open(path + ".tmp", "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(entries)))
+        for name, width, height, x_offset, y_offset, advance, flags, payload in entries:
+            file.write(ENTRY.pack(name.encode("utf-8"), width, height, x_offset, y_offset, advance, flags, offset))
+            offset += len(payload)
+        for *_, payload in entries:
+            file.write(payload)
+    os.replace(path + ".tmp", path)
+
+
+class AssetPack:
+    """
+    Read-only view of an asset pack file, mapped into memory once.
+    """
+
+    def __init__(self, path: str = ASSET_PACK_PATH) -> None:
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Unsupported asset pack: {path}")
+
+        self._assets: dict[str, Asset] = {}
+        for i in range(count):
+            raw_name, width, height, x_offset, y_offset, advance, flags, offset = \
+                ENTRY.unpack_from(self._mmap, HEADER.size + i * ENTRY.size)
+            name = raw_name.rstrip(b"\0").decode("utf-8")
+            rgb565 = None
+            alpha = None
+            if flags & FLAG_COLOR:
+                rgb565 = np.frombuffer(self._mmap, dtype=">u2", count=width * height, offset=offset).reshape(height, width)
+                offset += 2 * width * height
+            if flags & FLAG_ALPHA:
+                alpha = np.frombuffer(self._mmap, dtype=np.bool_, count=width * height, offset=offset).reshape(height, width)
+            self._assets[name] = Asset(name, rgb565, alpha, x_offset, y_offset, advance)
+
+    def __getitem__(self, name: str) -> Asset:
+        return self._assets[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._assets
+
+
+def load_pack(path: str = ASSET_PACK_PATH) -> AssetPack:
+    """
+    Load the asset pack, building it first if it does not exist yet.
+    """
+
+    if not os.path.exists(path):
+        build_pack(path)
+    return AssetPack(path)
+
+
+def blit(target: np.ndarray, asset: Asset, x: int, y: int) -> None:
+    """
+    Draw `asset` onto an RGB565 `target` with its top-left corner at (x, y).
+    """
+
+    height, width = asset.rgb565.shape
+    region = target[y:y + height, x:x + width]
+    if asset.alpha is None:
+        region[...] = asset.rgb565
+    else:
+        np.copyto(region, asset.rgb565, where=asset.alpha)
+
+
+def draw_text(target: np.ndarray, pack: AssetPack, text: str, x: int, y: int, color: int = WHITE_565) -> None:
+    """
+    Draw `text` made of `GLYPHS` onto an RGB565 `target`, positioned the same way as PIL's `ImageDraw.text`.
+    """
+
+    for character in text:
+        glyph = pack[f"glyph-{character}"]
+        height, width = glyph.alpha.shape
+        gx = x + glyph.x_offset
+        gy = y + glyph.y_offset
+        target[gy:gy + height, gx:gx + width][glyph.alpha] = color
+        x += glyph.advance
+
+
+class FrameCompositor:
+    """
+    RGB565 counterpart of `board.BoardRenderer`: a persistent base layer patched only where the
+    position, scores or turn indicator changed, and a reusable frame buffer with the selection on top.
+    The returned frame is overwritten by the next `render` call.
+    """
+
+    def __init__(self, pack: AssetPack) -> None:
+        self._pack = pack
+        self._background = pack["board"].rgb565
+        self._tiles = {
+            Tile.BLACK: pack["black"],
+            Tile.WHITE: pack["white"],
+        }
+        self._possible = pack["possible-tile"]
+        self._selected_row = pack["selected-row"]
+        self._selected_tile = pack["selected-tile"]
+
+        self._base = self._background.copy()
+        self._frame = np.empty_like(self._base)
+        self._black = 0
+        self._white = 0
+        self._moves = 0
+        self._scores: dict[tuple[int, int], int] = {}
+        self._color = Tile.EMPTY
+        self._fresh = True
+
+    def reset(self) -> None:
+        self._fresh = True
+
+    def render(self, board: Board, selected_row: Optional[int] = None, selected_col: Optional[int] = None,
+               color: Tile = Tile.EMPTY) -> np.ndarray:
+        moves = board._legal_moves(color) if color != Tile.EMPTY else 0
+        if self._fresh:
+            np.copyto(self._base, self._background)
+            self._scores = {}
+            self._color = Tile.EMPTY
+            self._fresh = False
+            changed = board._black | board._white | moves
+        else:
+            changed = (board._black ^ self._black) | (board._white ^ self._white) | (moves ^ self._moves)
+
+        while changed:
+            low = changed & -changed
+            self._draw_square(low.bit_length() - 1, board._black, board._white, moves)
+            changed ^= low
+        self._black = board._black
+        self._white = board._white
+        self._moves = moves
+
+        scores = board.scores()
+        self._draw_score(WHITE_SCORE_POSITION, scores[Tile.WHITE])
+        self._draw_score(BLACK_SCORE_POSITION, scores[Tile.BLACK])
+        if color != self._color:
+            x, y = TURN_INDICATOR_POSITION
+            self._base[y:y + TILE_SIZE, x:x + TILE_SIZE] = self._background[y:y + TILE_SIZE, x:x + TILE_SIZE]
+            if color in self._tiles:
+                blit(self._base, self._tiles[color], x, y)
+            self._color = color
+
+        np.copyto(self._frame, self._base)
+        if selected_row is not None:
+            if selected_col is not None:
+                blit(self._frame, self._selected_tile, selected_col * TILE_SIZE, selected_row * TILE_SIZE)
+            else:
+                blit(self._frame, self._selected_row, 0, selected_row * TILE_SIZE)
+        return self._frame
+
+    def _draw_square(self, square: int, black: int, white: int, moves: int) -> None:
+        row, col = divmod(square, BOARD_SIZE)
+        x, y = col * TILE_SIZE, row * TILE_SIZE
+        self._base[y:y + TILE_SIZE, x:x + TILE_SIZE] = self._background[y:y + TILE_SIZE, x:x + TILE_SIZE]
+
+        bit = 1 << square
+        if black & bit:
+            blit(self._base, self._tiles[Tile.BLACK], x, y)
+        elif white & bit:
+            blit(self._base, self._tiles[Tile.WHITE], x, y)
+        elif moves & bit:
+            blit(self._base, self._possible, x, y)
+
+    def _draw_score(self, position: tuple[int, int], score: int) -> None:
+        if self._scores.get(position) == score:
+            return
+        previous = self._scores.get(position)
+        self._scores[position] = score
+
+        x, y = position
+        width = max(len(str(score)), len(str(previous)) if previous is not None else 0) * self._pack["glyph-0"].advance
+        self._base[y:y + 2 * FONT_SIZE, x:x + width] = self._background[y:y + 2 * FONT_SIZE, x:x + width]
+        draw_text(self._base, self._pack, str(score), x, y)
+
+
+if __name__ == "__main__":
+    build_pack()
+    log.info("Asset pack written to {}", ASSET_PACK_PATH)
@@ -0,0 +1,39 @@
+import numpy as np
+from assets import FrameCompositor, load_pack
+from board import Board
+from board import Tile
+from lib.oled.SSD1331 import SSD1331
+from lib.oled.backend import FakeSpiBackend
+
+
+def test_compositor_matches_pil_frames(tmp_path):
+    pack = load_pack(str(tmp_path / "assets.bin"))
+    compositor = FrameCompositor(pack)
+    ssd1331 = SSD1331(FakeSpiBackend())
+
+    board = Board()
+    steps = [(None, None, Tile.EMPTY, None), (2, None, Tile.BLACK, (3, 2)), (4, 2, Tile.WHITE, (4, 2)), (1, 1, Tile.BLACK, None)]
+    for selected_row, selected_col, player, move in steps:
+        frame = compositor.render(board, selected_row, selected_col, player)
+        expected = ssd1331.ToRGB565(board.to_image(selected_row, selected_col, player))
+        assert (frame.view(np.uint8).reshape(expected.shape) == expected).all(), \
+            f'test_compositor_matches_pil_frames(): frame differs for {selected_row},{selected_col},{player}'
+        if move is not None:
+            board.place(*move, player)
+
+
+def test_compositor_matches_pil_two_digit_scores(tmp_path):
+    compositor = FrameCompositor(load_pack(str(tmp_path / "assets.bin")))
+    ssd1331 = SSD1331(FakeSpiBackend())
+
+    boards = [
+        Board.deserialize("BBBBBBBB|BBBB....|..WW....|WWWWWWWW|........|........|........|........"),  # 12 to 10
+        Board.deserialize("WWWWWWWW|WWWWWWWW|WWWWWWWW|W.BBBBBB|BBBBBBBB|BBBBBBBB|BBBBBBBB|BBBBBBBB"),  # 38 to 25
+        Board.deserialize("BBBBBBBB|BBBBBBBB|BBBBBBBB|BBBBBBBB|WWWWWWWW|WWWWWWWW|WWWWWWWW|WWWW...."),  # 32 to 28
+    ]
+    for board in boards:
+        for selected_row, selected_col, player in ((None, None, Tile.EMPTY), (0, None, Tile.WHITE)):
+            frame = compositor.render(board, selected_row, selected_col, player)
+            expected = ssd1331.ToRGB565(board.to_image(selected_row, selected_col, player))
+            assert (frame.view(np.uint8).reshape(expected.shape) == expected).all(), \
+                f'test_compositor_matches_pil_two_digit_scores(): frame differs for scores {board.scores()}'
@@ -0,0 +1,616 @@
+"""
+Micro-benchmarks of the client and server hot paths.
+
+    python benchmark.py                            # run everything
+    python benchmark.py to_image                   # run only the named benchmarks
+    python benchmark.py --json new.json            # also write the results as JSON
+    python benchmark.py --compare old.json         # print the change against an earlier JSON run
+
+Workloads are seeded, so two runs on the same machine measure the same positions and frames.
+"""
+
+from __future__ import annotations
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from threading import Thread
+from typing import Callable
+from board import RENDERER, Board, Tile
+from lib.oled.SSD1331 import SSD1331
+from lib.oled.backend import FakeSpiBackend
+from display import Display
+from assets import FrameCompositor, load_pack
+from netcode import ClientChannel, LoopbackBroker, LoopbackTransport, Mailbox, Match, Message, ServerChannel
+from journal import Journal, JournalReader
+from book import BookBuilder, OpeningBook
+from endgame import EndgameSolver, random_position
+from perft import perft
+from metrics import Registry
+import log
+from input_reader import SETTLE_PERIOD_NS, EventKind, InputEvents, SimulatedGpio
+
+BENCHMARKS: dict[str, Callable[[], dict[str, float]]] = {}
+
+
+def benchmark(function: Callable[[], dict[str, float]]) -> Callable[[], dict[str, float]]:
+    BENCHMARKS[function.__name__.removeprefix("bench_")] = function
+    return function
+
+
+def time_per_call(function: Callable[[], object], calls: int, repeats: int = 5) -> float:
+    """
+    Best average time of a single call out of `repeats` runs, in microseconds.
+    """
+
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, (time.perf_counter() - started) / calls)
+    return best * 1e6
+
+
+def midgame_board(seed: int = 0, plies: int = 20) -> Board:
+    rng = random.Random(seed)
+    board = Board()
+    turn = Tile.BLACK
+    for _ in range(plies):
+        if board.winner() != Tile.EMPTY:
+            break
+        row = rng.choice(board.rows_with_valid_moves(turn))
+        board.place(row, rng.choice(board.tiles_with_valid_move(turn, row)), turn)
+        turn = turn.opposite()
+    return board
+
+
+def midgame_boards(count: int = 50, plies: int = 20) -> list[Board]:
+    return [midgame_board(seed, plies) for seed in range(count)]
+
+
+def random_games(count: int, seed: int = 0) -> list[list[tuple[int, int, Tile]]]:
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        board = Board()
+        turn = Tile.BLACK
+        moves = []
+        while board.winner() == Tile.EMPTY:
+            row = rng.choice(board.rows_with_valid_moves(turn))
+            col = rng.choice(board.tiles_with_valid_move(turn, row))
+            board.place(row, col, turn)
+            moves.append((row, col, turn))
+            turn = turn.opposite()
+        games.append(moves)
+    return games
+
+
+@benchmark
+def bench_move_generation() -> dict[str, float]:
+    """
+    Move validation and placement over seeded random midgame positions. The move caches are
+    invalidated before each call, as they are after every `place` in a real game.
+    """
+
+    boards = midgame_boards()
+    squares = [(board, row, col) for board in boards for row in range(8) for col in range(8)]
+    moves = [(board._black, board._white, row, col)
+             for board in boards for row in board.rows_with_valid_moves(Tile.BLACK)
+             for col in board.tiles_with_valid_move(Tile.BLACK, row)]
+    scratch = Board()
+    index = 0
+
+    def is_move_valid() -> None:
+        nonlocal index
+        board, row, col = squares[index % len(squares)]
+        board._black_moves = None
+        board._is_move_valid(Tile.BLACK, row, col)
+        index += 1
+
+    def place() -> None:
+        nonlocal index
+        black, white, row, col = moves[index % len(moves)]
+        scratch._set_position(black, white)
+        scratch.place(row, col, Tile.BLACK)
+        index += 1
+
+    def reset_only() -> None:
+        nonlocal index
+        black, white, _, _ = moves[index % len(moves)]
+        scratch._set_position(black, white)
+        index += 1
+
+    def rows_with_valid_moves() -> None:
+        nonlocal index
+        board = boards[index % len(boards)]
+        board._black_moves = None
+        board.rows_with_valid_moves(Tile.BLACK)
+        index += 1
+
+    def winner() -> None:
+        nonlocal index
+        board = boards[index % len(boards)]
+        board._black_moves = board._white_moves = None
+        board.winner()
+        index += 1
+
+    reset_us = time_per_call(reset_only, 2000)
+    return {
+        "is_move_valid_us": time_per_call(is_move_valid, 5000),
+        "place_us": time_per_call(place, 2000) - reset_us,
+        "rows_with_valid_moves_us": time_per_call(rows_with_valid_moves, 2000),
+        "winner_us": time_per_call(winner, 2000),
+    }
+
+
+@benchmark
+def bench_serialization() -> dict[str, float]:
+    """
+    Text board encoding used by the first protocol version.
+    """
+
+    boards = midgame_boards()
+    buffers = [board.serialize() for board in boards]
+    index = 0
+
+    def serialize() -> None:
+        nonlocal index
+        boards[index % len(boards)].serialize()
+        index += 1
+
+    def deserialize() -> None:
+        nonlocal index
+        Board.deserialize(buffers[index % len(buffers)])
+        index += 1
+
+    return {"serialize_us": time_per_call(serialize, 2000), "deserialize_us": time_per_call(deserialize, 2000)}
+
+
+@benchmark
+def bench_to_image() -> dict[str, float]:
+    """
+    Encoder redraws: the selected row moves while the position stays the same.
+    The cold variant rebuilds the whole frame every time, like every call did before caching.
+    """
+
+    board = midgame_board()
+    frame = 0
+
+    def redraw() -> None:
+        nonlocal frame
+        board.to_image(frame % 8, None, Tile.BLACK)
+        frame += 1
+
+    def cold_redraw() -> None:
+        RENDERER.reset()
+        redraw()
+
+    warm = time_per_call(redraw, 2000)
+    cold = time_per_call(cold_redraw, 200)
+    return {"warm_us": warm, "cold_us": cold, "speedup": cold / warm}
+
+
+@benchmark
+def bench_compositor() -> dict[str, float]:
+    """
+    The same encoder redraws as `to_image`, composed straight into an RGB565 frame from the asset pack.
+    """
+
+    compositor = FrameCompositor(load_pack())
+    board = midgame_board()
+    frame = 0
+
+    def redraw() -> None:
+        nonlocal frame
+        compositor.render(board, frame % 8, None, Tile.BLACK)
+        frame += 1
+
+    def cold_redraw() -> None:
+        compositor.reset()
+        redraw()
+
+    return {"warm_us": time_per_call(redraw, 2000), "cold_us": time_per_call(cold_redraw, 200)}
+
+
+@benchmark
+def bench_show_image() -> dict[str, float]:
+    """
+    Full-frame `SSD1331.ShowImage` against the in-memory panel. The per-byte path used to issue
+    one SPI transfer per byte, 12288 per frame.
+    """
+
+    fake = FakeSpiBackend()
+    ssd1331 = SSD1331(fake)
+    image = midgame_board().to_image(3, None, Tile.BLACK)
+
+    fake.reset_counters()
+    ssd1331.ShowImage(image, 0, 0)
+    transfers = fake.transfers
+    data_bytes = fake.data_bytes
+
+    frame_us = time_per_call(lambda: ssd1331.ShowImage(image, 0, 0), 500)
+    return {"frame_us": frame_us, "transfers_per_frame": transfers, "data_bytes_per_frame": data_bytes}
+
+
+@benchmark
+def bench_display_draw() -> dict[str, float]:
+    """
+    `Display.draw` for encoder redraws, where only the highlighted row changes between frames.
+    """
+
+    fake = FakeSpiBackend()
+    display = Display(fake)
+    board = midgame_board()
+    frames = [board.to_image(row, None, Tile.BLACK) for row in range(8)]
+    display.draw(frames[-1])
+
+    fake.reset_counters()
+    for frame in frames:
+        display.draw(frame)
+    data_bytes = fake.data_bytes / len(frames)
+    transfers = fake.transfers / len(frames)
+
+    frame_index = 0
+
+    def draw() -> None:
+        nonlocal frame_index
+        display.draw(frames[frame_index % len(frames)])
+        frame_index += 1
+
+    return {"draw_us": time_per_call(draw, 500), "data_bytes_per_frame": data_bytes, "transfers_per_frame": transfers}
+
+
+@benchmark
+def bench_board_codec() -> dict[str, float]:
+    """
+    Payload size and decode time of a board update in the text and binary protocols.
+    """
+
+    board = midgame_board()
+    text = board.serialize()
+    packed = board.pack(Tile.BLACK, 20)
+    text_us = time_per_call(lambda: Board.deserialize(text), 2000)
+    binary_us = time_per_call(lambda: Board.unpack(packed), 2000)
+    return {
+        "text_bytes": len(text.encode("utf-8")),
+        "binary_bytes": len(packed),
+        "text_decode_us": text_us,
+        "binary_decode_us": binary_us,
+        "speedup": text_us / binary_us,
+    }
+
+
+@benchmark
+def bench_mailbox_wakeup() -> dict[str, float]:
+    """
+    Time from `Mailbox.put` on one thread to `receive_matching` returning on another, and the CPU
+    time a receiver burns while it waits for a message that never comes.
+    """
+
+    mailbox = Mailbox()
+    latencies = []
+    received = Mailbox()
+
+    def receiver() -> None:
+        for _ in range(500):
+            message = mailbox.receive_matching(lambda m: m.tag == "ping")
+            latencies.append(time.perf_counter() - float(message.content))
+        received.put(Message("bench", "bench", "done", ""))
+
+    thread = Thread(target=receiver)
+    thread.start()
+    for _ in range(500):
+        time.sleep(0.0005)
+        mailbox.put(Message("bench", "bench", "ping", repr(time.perf_counter())))
+    received.receive_matching(lambda m: m.tag == "done")
+    thread.join()
+
+    def wait_idle() -> None:
+        try:
+            Mailbox().receive_matching(lambda m: True, timeout=0.5)
+        except TimeoutError:
+            pass
+
+    waiter = Thread(target=wait_idle)
+    cpu_started = time.process_time()
+    waiter.start()
+    waiter.join()
+    idle_cpu = (time.process_time() - cpu_started) / 0.5
+
+    latencies.sort()
+    return {
+        "median_us": statistics.median(latencies) * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+        "idle_cpu_fraction": idle_cpu,
+    }
+
+
+@benchmark
+def bench_mailbox_backlog() -> dict[str, float]:
+    """
+    Receiving one player's move from a mailbox holding a backlog of other rooms' messages,
+    with a Match looked up in the index and with an equivalent predicate that scans the backlog.
+    """
+
+    mailbox = Mailbox()
+    for i in range(2000):
+        mailbox.put(Message(f"player-{i % 200}", "server", "board-ack", ""))
+
+    def receive(condition) -> Callable[[], None]:
+        def round_trip() -> None:
+            mailbox.put(Message("player-x", "server", "place", "00"))
+            mailbox.receive_matching(condition)
+        return round_trip
+
+    indexed = time_per_call(receive(Match("player-x", "place")), 2000)
+    scanning = time_per_call(receive(lambda m: m.sender == "player-x" and m.tag == "place"), 200)
+    return {"indexed_us": indexed, "scanning_us": scanning, "speedup": scanning / indexed}
+
+
+@benchmark
+def bench_input_wait() -> dict[str, float]:
+    """
+    Time from a simulated button edge to `InputEvents.get` returning on another thread, and the CPU
+    time spent waiting for input that never comes, which the old polling loop kept at a full core.
+    """
+
+    gpio = SimulatedGpio()
+    inputs = InputEvents(gpio)
+    inputs.add_button("red", 5)
+    latencies = []
+
+    def receiver() -> None:
+        for _ in range(200):
+            event = inputs.get()
+            if event.kind == EventKind.PRESSED:
+                latencies.append(time.monotonic_ns() - event.timestamp_ns)
+
+    thread = Thread(target=receiver)
+    thread.start()
+    for _ in range(200):
+        time.sleep(SETTLE_PERIOD_NS / 1e9 + 0.0005)
+        gpio.press(5)
+        time.sleep(SETTLE_PERIOD_NS / 1e9 + 0.0005)
+        gpio.release(5)
+    thread.join()
+
+    waiter = Thread(target=lambda: inputs.get(timeout=0.5))
+    cpu_started = time.process_time()
+    waiter.start()
+    waiter.join()
+    idle_cpu = (time.process_time() - cpu_started) / 0.5
+
+    latencies.sort()
+    return {
+        "median_us": statistics.median(latencies) / 1e3,
+        "p99_us": latencies[int(len(latencies) * 0.99)] / 1e3,
+        "idle_cpu_fraction": idle_cpu,
+    }
+
+
+@benchmark
+def bench_channel_throughput() -> dict[str, float]:
+    """
+    Messages per second from many client channels to the server channel over the in-process
+    loopback broker, so only our own topic routing, decoding and mailbox code is measured.
+    """
+
+    broker = LoopbackBroker()
+    clients = [ClientChannel("loopback", f"player-{i}", LoopbackTransport(broker)) for i in range(100)]
+    server = ServerChannel(LoopbackTransport(broker))
+    rounds = 50
+    count = rounds * len(clients)
+
+    def feed() -> None:
+        for _ in range(rounds):
+            for client in clients:
+                client.send_to_server("place-bin", b"\x13")
+
+    level = log.get_level()
+    log.set_level(log.WARNING)
+    try:
+        server.__enter__()
+        for client in clients:
+            client.__enter__()
+        server.flush_mailbox()
+
+        started = time.perf_counter()
+        producer = Thread(target=feed)
+        producer.start()
+        for i in range(count):
+            server.receive_matching(Match(f"player-{i % len(clients)}", "place-bin"))
+        producer.join()
+        elapsed = time.perf_counter() - started
+
+        for client in clients:
+            client.__exit__()
+        server.__exit__()
+    finally:
+        log.set_level(level)
+
+    return {"messages_per_second": count / elapsed, "message_us": elapsed / count * 1e6}
+
+
+@benchmark
+def bench_journal() -> dict[str, float]:
+    """
+    Appending moves to the game journal, and recovering a journal of 2000 seeded random games,
+    100 of them still in progress, as the server does on startup.
+    """
+
+    games = random_games(2000)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "games.journal")
+        with Journal(path, sync_every=256) as journal:
+            started = time.perf_counter()
+            records = 0
+            for index, moves in enumerate(games):
+                record = journal.start_game({Tile.BLACK: f"player-{index}", Tile.WHITE: f"player-{index + 1}"})
+                for row, col, color in moves[:len(moves) // 2 if index % 20 == 0 else None]:
+                    record.move(row, col, color)
+                    records += 1
+                if index % 20 != 0:
+                    record.finish(Tile.BLACK)
+            append_us = (time.perf_counter() - started) / records * 1e6
+
+        size = os.path.getsize(path)
+        started = time.perf_counter()
+        with JournalReader(path) as reader:
+            boards = [game.board_at() for game in reader.in_progress()]
+        recovery_ms = (time.perf_counter() - started) * 1e3
+
+        started = time.perf_counter()
+        with JournalReader(path) as reader:
+            reader.game(2)
+        full_index_ms = (time.perf_counter() - started) * 1e3
+
+    return {
+        "append_us": append_us,
+        "recovery_ms": recovery_ms,
+        "full_index_ms": full_index_ms,
+        "recovered_games": len(boards),
+        "journal_kb": size / 1024,
+    }
+
+
+@benchmark
+def bench_opening_book() -> dict[str, float]:
+    """
+    Opening and querying an opening book built from the first 16 moves of 2000 seeded random games,
+    looking up positions from those games.
+    """
+
+    games = random_games(2000)
+    builder = BookBuilder(plies=16)
+    for moves in games:
+        builder.add_game(moves, Tile.BLACK)
+    queries = []
+    for moves in games[:50]:
+        board = Board()
+        for row, col, color in moves[:10]:
+            board.place(row, col, color)
+        queries.append((board, moves[10][2]))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "book.bin")
+        entries = builder.write(path)
+        started = time.perf_counter()
+        book = OpeningBook(path)
+        open_us = (time.perf_counter() - started) * 1e6
+        lookup_us = time_per_call(lambda: [book.lookup(board, color) for board, color in queries], 20) / len(queries)
+        size = os.path.getsize(path)
+        book.close()
+
+    return {"open_us": open_us, "lookup_us": lookup_us, "entries": entries, "book_kb": size / 1024}
+
+
+@benchmark
+def bench_metrics() -> dict[str, float]:
+    """
+    Cost of recording a histogram observation and a labelled counter increment, and of rendering.
+    """
+
+    registry = Registry()
+    histogram = registry.histogram("bench_seconds", "Benchmark.")
+    counter = registry.counter("bench_total", "Benchmark.", ("direction", "tag"))
+    return {
+        "observe_ns": time_per_call(lambda: histogram.observe(0.003), 100_000) * 1e3,
+        "inc_ns": time_per_call(lambda: counter.inc("sent", "board"), 100_000) * 1e3,
+        "render_us": time_per_call(registry.render, 1000),
+    }
+
+
+@benchmark
+def bench_logging() -> dict[str, float]:
+    """
+    Cost for the logging thread of a queued INFO line and of a disabled DEBUG call, against
+    a synchronous print, all written to /dev/null.
+    """
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        message = Message("player-1", "server", "place", "3,4")
+        results = {
+            "info_ns": time_per_call(lambda: log.info("Dropping message: {}", message), 1000) * 1e3,
+            "debug_disabled_ns": time_per_call(lambda: log.debug("{}", message), 100_000) * 1e3,
+            "print_ns": time_per_call(lambda: print(f"[INFO] Dropping message: {message}"), 1000) * 1e3,
+        }
+        log.flush()
+    return results
+
+
+@benchmark
+def bench_perft() -> dict[str, float]:
+    """
+    Leaves counted per second by perft to depth 8 from the starting position, on one core.
+    """
+
+    own, opp = Board()._masks(Tile.BLACK)
+    started = time.perf_counter()
+    nodes = perft(own, opp, 8)
+    return {"nodes_per_second": nodes / (time.perf_counter() - started)}
+
+
+@benchmark
+def bench_endgame() -> dict[str, float]:
+    """
+    Solving seeded random positions to the end: exactly with 14 empty squares, and only for
+    win / draw / loss with 16.
+    """
+
+    results = {}
+    for name, empties, exact in (("exact_14", 14, True), ("wld_16", 16, False)):
+        nodes = 0
+        started = time.perf_counter()
+        for seed in range(3):
+            board, turn = random_position(seed, empties)
+            nodes += EndgameSolver(time_budget=600).solve(board, turn, exact).nodes
+        elapsed = time.perf_counter() - started
+        results[f"{name}_seconds"] = elapsed / 3
+        results[f"{name}_nodes_per_second"] = nodes / elapsed
+    return results
+
+
+def compare(previous: dict, current: dict) -> None:
+    for name, results in current["results"].items():
+        for key, value in results.items():
+            old = previous.get("results", {}).get(name, {}).get(key)
+            if old:
+                print(f"[INFO] {name}.{key}: {old:.2f} -> {value:.2f} ({value / old - 1:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the micro-benchmarks.")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run, out of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": time.time(),
+        "results": {},
+    }
+    for name in args.names or list(BENCHMARKS):
+        results = BENCHMARKS[name]()
+        report["results"][name] = results
+        print(f"[INFO] {name}: " + ", ".join(f"{key}={value:.2f}" for key, value in results.items()))
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            compare(json.load(file), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 from __future__ import annotations
+import random
 import re
+import struct
+import time
 from enum import Enum
 from typing import Optional
 from PIL import Image, ImageDraw, ImageFont
+from metrics import REGISTRY
 
 BOARD_SIZE = 8
 TILE_SIZE = 8
@@ -12,7 +16,35 @@ WHITE_IMAGE = Image.open("./img/white.png")
 SELECTED_ROW_IMAGE = Image.open("./img/selected-row.png")
 SELECTED_TILE_IMAGE = Image.open("./img/selected-tile.png")
 POSSIBLE_TILE_IMAGE = Image.open("./img/possible-tile.png")
+FONT = ImageFont.truetype("./minecraft_font.ttf", 8)
+WHITE_SCORE_POSITION = (67, 14)
+BLACK_SCORE_POSITION = (67, 38)
+TURN_INDICATOR_POSITION = (86, 54)
 BUFFER_PATTERN = re.compile(f"^([BW.]{{{BOARD_SIZE}}}($|\\|)){{{BOARD_SIZE}}}")
+PACKED_BOARD = struct.Struct("!QQBI")  # black, white, side to move, sequence number
+PACKED_DELTA = struct.Struct("!IBBI")  # sequence number, square, colour, checksum of the resulting board
+TO_IMAGE_SECONDS = REGISTRY.histogram("othello_to_image_seconds", "Time to build a board image with `Board.to_image`.")
+
+# Bitboards: bit `row * BOARD_SIZE + col` is set when the tile at (row, col) is taken.
+FULL_MASK = 0xFFFF_FFFF_FFFF_FFFF
+NOT_FIRST_COL = 0xFEFE_FEFE_FEFE_FEFE  # valid targets after shifting towards higher columns
+NOT_LAST_COL = 0x7F7F_7F7F_7F7F_7F7F  # valid targets after shifting towards lower columns
+ROW_MASK = 0xFF
+INITIAL_BLACK = (1 << (3 * BOARD_SIZE + 4)) | (1 << (4 * BOARD_SIZE + 3))
+INITIAL_WHITE = (1 << (3 * BOARD_SIZE + 3)) | (1 << (4 * BOARD_SIZE + 4))
+
+# Zobrist keys, seeded so hashes stay stable across processes and runs.
+_zobrist_random = random.Random(0x07E110)
+ZOBRIST_BLACK = [_zobrist_random.getrandbits(64) for _ in range(BOARD_SIZE * BOARD_SIZE)]
+ZOBRIST_WHITE = [_zobrist_random.getrandbits(64) for _ in range(BOARD_SIZE * BOARD_SIZE)]
+ZOBRIST_FLIP = [b ^ w for b, w in zip(ZOBRIST_BLACK, ZOBRIST_WHITE)]
+ZOBRIST_SIDE = _zobrist_random.getrandbits(64)  # for searchers that hash the side to move too
+
+try:
+    popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def popcount(bits: int) -> int:
+        return bin(bits).count("1")
 
 
 def deserialize_place(place_string: str) -> Optional[tuple[int, int]]:
@@ -25,6 +57,301 @@ def deserialize_place(place_string: str) -> Optional[tuple[int, int]]:
         return None
 
 
+def pack_place(row: int, col: int) -> bytes:
+    """
+    Binary form of a move: the square index in a single byte.
+    """
+
+    return bytes((row * BOARD_SIZE + col,))
+
+
+def unpack_place(data: bytes) -> Optional[tuple[int, int]]:
+    if len(data) != 1 or data[0] >= BOARD_SIZE * BOARD_SIZE:
+        return None
+    return divmod(data[0], BOARD_SIZE)
+
+
+def square_bit(row: int, col: int) -> int:
+    return 1 << (row * BOARD_SIZE + col)
+
+
+def zobrist_hash(black: int, white: int) -> int:
+    """
+    Hash of a position computed from scratch. `Board` keeps the same value up to date incrementally.
+    """
+
+    result = 0
+    for keys, bits in ((ZOBRIST_BLACK, black), (ZOBRIST_WHITE, white)):
+        while bits:
+            low = bits & -bits
+            result ^= keys[low.bit_length() - 1]
+            bits ^= low
+    return result
+
+
+def legal_moves(own: int, opp: int) -> int:
+    """
+    Bitboard of all empty squares where the owner of `own` can place a tile.
+    Each direction is a shift-and-mask fill over the opponent's tiles.
+    """
+
+    empty = ~(own | opp) & FULL_MASK
+    moves = 0
+
+    # right (+1), down-right (+9), down-left (+7), down (+8)
+    o = opp & NOT_FIRST_COL
+    x = (own << 1) & o
+    x |= (x << 1) & o
+    x |= (x << 1) & o
+    x |= (x << 1) & o
+    x |= (x << 1) & o
+    x |= (x << 1) & o
+    moves |= (x << 1) & NOT_FIRST_COL
+
+    x = (own << 9) & o
+    x |= (x << 9) & o
+    x |= (x << 9) & o
+    x |= (x << 9) & o
+    x |= (x << 9) & o
+    x |= (x << 9) & o
+    moves |= (x << 9) & NOT_FIRST_COL
+
+    o = opp & NOT_LAST_COL
+    x = (own << 7) & o
+    x |= (x << 7) & o
+    x |= (x << 7) & o
+    x |= (x << 7) & o
+    x |= (x << 7) & o
+    x |= (x << 7) & o
+    moves |= (x << 7) & NOT_LAST_COL
+
+    x = (own << 8) & opp
+    x |= (x << 8) & opp
+    x |= (x << 8) & opp
+    x |= (x << 8) & opp
+    x |= (x << 8) & opp
+    x |= (x << 8) & opp
+    moves |= x << 8
+
+    # left (-1), up-left (-9), up-right (-7), up (-8)
+    x = (own >> 1) & o
+    x |= (x >> 1) & o
+    x |= (x >> 1) & o
+    x |= (x >> 1) & o
+    x |= (x >> 1) & o
+    x |= (x >> 1) & o
+    moves |= (x >> 1) & NOT_LAST_COL
+
+    x = (own >> 9) & o
+    x |= (x >> 9) & o
+    x |= (x >> 9) & o
+    x |= (x >> 9) & o
+    x |= (x >> 9) & o
+    x |= (x >> 9) & o
+    moves |= (x >> 9) & NOT_LAST_COL
+
+    o = opp & NOT_FIRST_COL
+    x = (own >> 7) & o
+    x |= (x >> 7) & o
+    x |= (x >> 7) & o
+    x |= (x >> 7) & o
+    x |= (x >> 7) & o
+    x |= (x >> 7) & o
+    moves |= (x >> 7) & NOT_FIRST_COL
+
+    x = (own >> 8) & opp
+    x |= (x >> 8) & opp
+    x |= (x >> 8) & opp
+    x |= (x >> 8) & opp
+    x |= (x >> 8) & opp
+    x |= (x >> 8) & opp
+    moves |= x >> 8
+
+    return moves & empty
+
+
+def has_legal_move(own: int, opp: int) -> bool:
+    """
+    Whether the owner of `own` can place a tile anywhere. Same fills as `legal_moves`, but stops
+    at the first direction with a move, which is usually the first one tried.
+    """
+
+    empty = ~(own | opp) & FULL_MASK
+
+    x = (own << 8) & opp
+    x |= (x << 8) & opp
+    x |= (x << 8) & opp
+    x |= (x << 8) & opp
+    x |= (x << 8) & opp
+    x |= (x << 8) & opp
+    if (x << 8) & empty:
+        return True
+
+    x = (own >> 8) & opp
+    x |= (x >> 8) & opp
+    x |= (x >> 8) & opp
+    x |= (x >> 8) & opp
+    x |= (x >> 8) & opp
+    x |= (x >> 8) & opp
+    if (x >> 8) & empty:
+        return True
+
+    o = opp & NOT_FIRST_COL
+    x = (own << 1) & o
+    x |= (x << 1) & o
+    x |= (x << 1) & o
+    x |= (x << 1) & o
+    x |= (x << 1) & o
+    x |= (x << 1) & o
+    if (x << 1) & NOT_FIRST_COL & empty:
+        return True
+
+    x = (own << 9) & o
+    x |= (x << 9) & o
+    x |= (x << 9) & o
+    x |= (x << 9) & o
+    x |= (x << 9) & o
+    x |= (x << 9) & o
+    if (x << 9) & NOT_FIRST_COL & empty:
+        return True
+
+    x = (own >> 7) & o
+    x |= (x >> 7) & o
+    x |= (x >> 7) & o
+    x |= (x >> 7) & o
+    x |= (x >> 7) & o
+    x |= (x >> 7) & o
+    if (x >> 7) & NOT_FIRST_COL & empty:
+        return True
+
+    o = opp & NOT_LAST_COL
+    x = (own >> 1) & o
+    x |= (x >> 1) & o
+    x |= (x >> 1) & o
+    x |= (x >> 1) & o
+    x |= (x >> 1) & o
+    x |= (x >> 1) & o
+    if (x >> 1) & NOT_LAST_COL & empty:
+        return True
+
+    x = (own >> 9) & o
+    x |= (x >> 9) & o
+    x |= (x >> 9) & o
+    x |= (x >> 9) & o
+    x |= (x >> 9) & o
+    x |= (x >> 9) & o
+    if (x >> 9) & NOT_LAST_COL & empty:
+        return True
+
+    x = (own << 7) & o
+    x |= (x << 7) & o
+    x |= (x << 7) & o
+    x |= (x << 7) & o
+    x |= (x << 7) & o
+    x |= (x << 7) & o
+    return bool((x << 7) & NOT_LAST_COL & empty)
+
+
+def flipped_tiles(own: int, opp: int, move: int) -> int:
+    """
+    Bitboard of the opponent's tiles flipped by placing a tile on the single-bit square `move`.
+    Returns 0 when the move flips nothing (and therefore is not valid).
+    """
+
+    flipped = 0
+
+    o = opp & NOT_FIRST_COL
+    x = (move << 1) & o
+    x |= (x << 1) & o
+    x |= (x << 1) & o
+    x |= (x << 1) & o
+    x |= (x << 1) & o
+    x |= (x << 1) & o
+    if (x << 1) & NOT_FIRST_COL & own:
+        flipped |= x
+
+    x = (move << 9) & o
+    x |= (x << 9) & o
+    x |= (x << 9) & o
+    x |= (x << 9) & o
+    x |= (x << 9) & o
+    x |= (x << 9) & o
+    if (x << 9) & NOT_FIRST_COL & own:
+        flipped |= x
+
+    x = (move >> 7) & o
+    x |= (x >> 7) & o
+    x |= (x >> 7) & o
+    x |= (x >> 7) & o
+    x |= (x >> 7) & o
+    x |= (x >> 7) & o
+    if (x >> 7) & NOT_FIRST_COL & own:
+        flipped |= x
+
+    o = opp & NOT_LAST_COL
+    x = (move >> 1) & o
+    x |= (x >> 1) & o
+    x |= (x >> 1) & o
+    x |= (x >> 1) & o
+    x |= (x >> 1) & o
+    x |= (x >> 1) & o
+    if (x >> 1) & NOT_LAST_COL & own:
+        flipped |= x
+
+    x = (move >> 9) & o
+    x |= (x >> 9) & o
+    x |= (x >> 9) & o
+    x |= (x >> 9) & o
+    x |= (x >> 9) & o
+    x |= (x >> 9) & o
+    if (x >> 9) & NOT_LAST_COL & own:
+        flipped |= x
+
+    x = (move << 7) & o
+    x |= (x << 7) & o
+    x |= (x << 7) & o
+    x |= (x << 7) & o
+    x |= (x << 7) & o
+    x |= (x << 7) & o
+    if (x << 7) & NOT_LAST_COL & own:
+        flipped |= x
+
+    x = (move << 8) & opp
+    x |= (x << 8) & opp
+    x |= (x << 8) & opp
+    x |= (x << 8) & opp
+    x |= (x << 8) & opp
+    x |= (x << 8) & opp
+    if (x << 8) & own:
+        flipped |= x
+
+    x = (move >> 8) & opp
+    x |= (x >> 8) & opp
+    x |= (x >> 8) & opp
+    x |= (x >> 8) & opp
+    x |= (x >> 8) & opp
+    x |= (x >> 8) & opp
+    if (x >> 8) & own:
+        flipped |= x
+
+    return flipped
+
+
+def neighbours(bits: int) -> int:
+    """
+    Bitboard of all squares adjacent (including diagonally) to any square of `bits`.
+    """
+
+    left = (bits >> 1) & NOT_LAST_COL
+    right = (bits << 1) & NOT_FIRST_COL
+    row = bits | left | right
+    return ((row << 8) | (row >> 8) | left | right) & FULL_MASK
+
+
+INITIAL_HASH = zobrist_hash(INITIAL_BLACK, INITIAL_WHITE)
+NEIGHBOURS = [neighbours(1 << square) for square in range(BOARD_SIZE * BOARD_SIZE)]
+
+
 class Tile(Enum):
     EMPTY = "."
     BLACK = "B"
@@ -51,311 +378,335 @@ class Tile(Enum):
         return self != Tile.EMPTY
 
 
-class Board:
-    def __init__(self) -> None:
-        self._board = [[Tile.EMPTY for _c in range(BOARD_SIZE)] for _r in range(BOARD_SIZE)]
-        self._board[3][3] = Tile.WHITE
-        self._board[3][4] = Tile.BLACK
-        self._board[4][3] = Tile.BLACK
-        self._board[4][4] = Tile.WHITE
+_SIDE_CODES = {Tile.EMPTY: 0, Tile.BLACK: 1, Tile.WHITE: 2}
+_SIDES = {code: tile for tile, code in _SIDE_CODES.items()}
 
-    def to_image(self, selected_row: Optional[int] = None, selected_col: Optional[int] = None, color: Tile = Tile.EMPTY) -> Image.Image:
-        image = Image.new("RGBA", BOARD_IMAGE.size)
-        image.paste(BOARD_IMAGE)
-        draw = ImageDraw.Draw(image)
-        font = ImageFont.truetype("./minecraft_font.ttf", 8)
-
-        # Checkerboard, possible moves and placed tiles
-        for r in range(BOARD_SIZE):
-            for c in range(BOARD_SIZE):
-                tile_image = self._board[r][c].image
-                if tile_image is not None:
-                    image.paste(tile_image, (c * TILE_SIZE, r * TILE_SIZE), tile_image)
-                elif color != Tile.EMPTY and self._is_move_valid(color, r, c):
-                    image.paste(POSSIBLE_TILE_IMAGE, (c * TILE_SIZE, r * TILE_SIZE), POSSIBLE_TILE_IMAGE)
-
-        # Selected rows, columns
+
+# Square states cached by the renderer
+_EMPTY_SQUARE = 0
+_BLACK_SQUARE = 1
+_WHITE_SQUARE = 2
+_POSSIBLE_SQUARE = 3
+_SQUARE_IMAGES = {_BLACK_SQUARE: BLACK_IMAGE, _WHITE_SQUARE: WHITE_IMAGE, _POSSIBLE_SQUARE: POSSIBLE_TILE_IMAGE}
+_MAX_CACHED_SELECTIONS = 1024
+
+
+class BoardRenderer:
+    """
+    Builds the frames returned by `Board.to_image`. The background, tiles, scores and turn indicator
+    live in a persistent base layer, and only the squares and overlays that changed since the previous
+    frame are patched, using pre-composited patches that are built once and then reused.
+    Every frame is a copy of the base layer with the selection overlay pasted on top.
+    """
+
+    def __init__(self) -> None:
+        self._background = BOARD_IMAGE.convert("RGB")
+        self._base: Optional[Image.Image] = None
+        self._squares = [_EMPTY_SQUARE] * (BOARD_SIZE * BOARD_SIZE)
+        self._black = 0
+        self._white = 0
+        self._moves = 0
+        self._scores: dict[tuple[int, int], int] = {}
+        self._color = Tile.EMPTY
+
+        self._square_patches: dict[tuple[int, int], Image.Image] = {}
+        self._score_patches: dict[tuple[tuple[int, int], int], Image.Image] = {}
+        self._indicator_patches: dict[Tile, Image.Image] = {}
+        self._selection_patches: dict[tuple, Image.Image] = {}
+
+        digit_boxes = [FONT.getbbox(str(score)) for score in range(BOARD_SIZE * BOARD_SIZE + 1)]
+        self._score_size = (max(box[2] for box in digit_boxes), max(box[3] for box in digit_boxes))
+
+    def reset(self) -> None:
+        """
+        Drop the base layer, the next frame is then built from scratch.
+        """
+
+        self._base = None
+
+    def render(self, board: Board, selected_row: Optional[int], selected_col: Optional[int], color: Tile) -> Image.Image:
+        moves = board._legal_moves(color) if color != Tile.EMPTY else 0
+        if self._base is None:
+            self._base = self._background.copy()
+            self._squares = [_EMPTY_SQUARE] * (BOARD_SIZE * BOARD_SIZE)
+            self._scores = {}
+            self._color = Tile.EMPTY
+            changed = board._black | board._white | moves
+        else:
+            changed = (board._black ^ self._black) | (board._white ^ self._white) | (moves ^ self._moves)
+
+        while changed:
+            low = changed & -changed
+            self._update_square(low.bit_length() - 1, board._black, board._white, moves)
+            changed ^= low
+        self._black = board._black
+        self._white = board._white
+        self._moves = moves
+
+        scores = board.scores()
+        self._update_score(WHITE_SCORE_POSITION, scores[Tile.WHITE])
+        self._update_score(BLACK_SCORE_POSITION, scores[Tile.BLACK])
+        if color != self._color:
+            self._base.paste(self._indicator_patch(color), TURN_INDICATOR_POSITION)
+            self._color = color
+
+        frame = self._base.copy()
         if selected_row is not None:
             if selected_col is not None:
-                image.paste(SELECTED_TILE_IMAGE,
-                            (selected_col * TILE_SIZE, selected_row * TILE_SIZE), SELECTED_TILE_IMAGE)
+                frame.paste(self._selection_patch(selected_row, selected_col),
+                            (selected_col * TILE_SIZE, selected_row * TILE_SIZE))
             else:
-                image.paste(SELECTED_ROW_IMAGE, (0, selected_row * TILE_SIZE), SELECTED_ROW_IMAGE)
+                frame.paste(self._selection_patch(selected_row, None), (0, selected_row * TILE_SIZE))
+        return frame
+
+    def _update_square(self, square: int, black: int, white: int, moves: int) -> None:
+        bit = 1 << square
+        if black & bit:
+            state = _BLACK_SQUARE
+        elif white & bit:
+            state = _WHITE_SQUARE
+        elif moves & bit:
+            state = _POSSIBLE_SQUARE
+        else:
+            state = _EMPTY_SQUARE
+
+        if self._squares[square] != state:
+            self._squares[square] = state
+            row, col = divmod(square, BOARD_SIZE)
+            self._base.paste(self._square_patch(square, state), (col * TILE_SIZE, row * TILE_SIZE))
+
+    def _square_patch(self, square: int, state: int) -> Image.Image:
+        patch = self._square_patches.get((square, state))
+        if patch is None:
+            row, col = divmod(square, BOARD_SIZE)
+            box = (col * TILE_SIZE, row * TILE_SIZE, (col + 1) * TILE_SIZE, (row + 1) * TILE_SIZE)
+            patch = self._background.crop(box)
+            tile_image = _SQUARE_IMAGES.get(state)
+            if tile_image is not None:
+                patch.paste(tile_image, (0, 0), tile_image)
+            self._square_patches[(square, state)] = patch
+        return patch
+
+    def _update_score(self, position: tuple[int, int], score: int) -> None:
+        if self._scores.get(position) == score:
+            return
+        self._scores[position] = score
+
+        patch = self._score_patches.get((position, score))
+        if patch is None:
+            x, y = position
+            patch = self._background.crop((x, y, x + self._score_size[0], y + self._score_size[1]))
+            ImageDraw.Draw(patch).text((0, 0), str(score), font=FONT, fill="WHITE")
+            self._score_patches[(position, score)] = patch
+        self._base.paste(patch, position)
+
+    def _indicator_patch(self, color: Tile) -> Image.Image:
+        patch = self._indicator_patches.get(color)
+        if patch is None:
+            x, y = TURN_INDICATOR_POSITION
+            patch = self._background.crop((x, y, x + TILE_SIZE, y + TILE_SIZE))
+            if color.image is not None:
+                patch.paste(color.image, (0, 0), color.image)
+            self._indicator_patches[color] = patch
+        return patch
+
+    def _selection_patch(self, row: int, col: Optional[int]) -> Image.Image:
+        if col is not None:
+            states = (self._squares[row * BOARD_SIZE + col],)
+            overlay = SELECTED_TILE_IMAGE
+            x = col * TILE_SIZE
+        else:
+            states = tuple(self._squares[row * BOARD_SIZE:(row + 1) * BOARD_SIZE])
+            overlay = SELECTED_ROW_IMAGE
+            x = 0
+
+        key = (row, col, states)
+        patch = self._selection_patches.get(key)
+        if patch is None:
+            y = row * TILE_SIZE
+            patch = self._base.crop((x, y, x + overlay.width, y + overlay.height))
+            patch.paste(overlay, (0, 0), overlay)
+            if len(self._selection_patches) >= _MAX_CACHED_SELECTIONS:
+                self._selection_patches.clear()
+            self._selection_patches[key] = patch
+        return patch
 
-        # Current turn indicator
-        if color != Tile.EMPTY:
-            image.paste(color.image, (86, 54), color.image)
 
-        # Current scores
-        scores = self.scores()
-        draw.text((67, 14), str(scores[Tile.WHITE]), font=font, fill="WHITE")
-        draw.text((67, 38), str(scores[Tile.BLACK]), font=font, fill="WHITE")
+RENDERER = BoardRenderer()
 
-        return image.convert("RGB")
+
+class Board:
+    def __init__(self) -> None:
+        self._set_position(INITIAL_BLACK, INITIAL_WHITE)
+
+    def _set_position(self, black: int, white: int) -> None:
+        """
+        Replaces the whole position and re-derives everything `place` keeps up to date incrementally.
+        """
+
+        self._black = black
+        self._white = white
+        self._hash = zobrist_hash(black, white)
+        self._black_count = popcount(black)
+        self._white_count = popcount(white)
+        self._frontier = neighbours(black | white) & ~(black | white)  # empty squares next to a tile
+        self._black_moves: Optional[int] = None  # legal moves, computed lazily once per position
+        self._white_moves: Optional[int] = None
+
+    @property
+    def zobrist(self) -> int:
+        """
+        64-bit Zobrist hash of the tiles on the board (the side to move is not included).
+        """
+
+        return self._hash
+
+    @property
+    def checksum(self) -> int:
+        """
+        32 bits of the Zobrist hash, sent with move deltas so replicas can detect divergence.
+        """
+
+        return self._hash & 0xFFFF_FFFF
+
+    def _masks(self, color: Tile) -> tuple[int, int]:
+        """
+        Returns the (own, opponent) bitboards from the perspective of `color`.
+        """
+
+        if color == Tile.BLACK:
+            return self._black, self._white
+        elif color == Tile.WHITE:
+            return self._white, self._black
+        else:
+            raise ValueError()
+
+    def _tile_at(self, row: int, col: int) -> Tile:
+        bit = square_bit(row, col)
+        if self._black & bit:
+            return Tile.BLACK
+        elif self._white & bit:
+            return Tile.WHITE
+        else:
+            return Tile.EMPTY
+
+    def to_image(self, selected_row: Optional[int] = None, selected_col: Optional[int] = None, color: Tile = Tile.EMPTY) -> Image.Image:
+        started = time.perf_counter()
+        image = RENDERER.render(self, selected_row, selected_col, color)
+        TO_IMAGE_SECONDS.observe(time.perf_counter() - started)
+        return image
 
     def serialize(self) -> str:
-        return "|".join("".join(c.value for c in r) for r in self._board)
+        return "|".join("".join(self._tile_at(r, c).value for c in range(BOARD_SIZE)) for r in range(BOARD_SIZE))
 
     @staticmethod
     def deserialize(buffer: str) -> Optional[Board]:
         if not BUFFER_PATTERN.match(buffer):
             return None
 
-        board = Board()
+        black = 0
+        white = 0
         for r, tiles in enumerate(buffer.split("|")):
             for c, tile in enumerate(tiles):
-                board._board[r][c] = Tile(tile)
+                tile = Tile(tile)
+                if tile == Tile.BLACK:
+                    black |= square_bit(r, c)
+                elif tile == Tile.WHITE:
+                    white |= square_bit(r, c)
+
+        return Board.from_bitboards(black, white)
+
+    def pack(self, side: Tile = Tile.EMPTY, sequence: int = 0) -> bytes:
+        """
+        Binary form of the position: both bitboards, the side to move and a sequence number.
+        """
+
+        return PACKED_BOARD.pack(self._black, self._white, _SIDE_CODES[side], sequence)
 
+    @staticmethod
+    def unpack(data: bytes) -> Optional[tuple[Board, Tile, int]]:
+        if len(data) != PACKED_BOARD.size:
+            return None
+        black, white, side, sequence = PACKED_BOARD.unpack(data)
+        if black & white or side not in _SIDES:
+            return None
+        return Board.from_bitboards(black, white), _SIDES[side], sequence
+
+    @staticmethod
+    def from_bitboards(black: int, white: int) -> Board:
+        board = Board()
+        board._set_position(black, white)
         return board
 
+    def _legal_moves(self, color: Tile) -> int:
+        if color == Tile.BLACK:
+            if self._black_moves is None:
+                self._black_moves = legal_moves(self._black, self._white)
+            return self._black_moves
+        elif color == Tile.WHITE:
+            if self._white_moves is None:
+                self._white_moves = legal_moves(self._white, self._black)
+            return self._white_moves
+        else:
+            raise ValueError()
+
     def rows_with_valid_moves(self, color: Tile) -> list[int]:
-        return list(row for row in range(BOARD_SIZE) if self.tiles_with_valid_move(color, row))
+        moves = self._legal_moves(color)
+        return list(row for row in range(BOARD_SIZE) if (moves >> (row * BOARD_SIZE)) & ROW_MASK)
 
     def tiles_with_valid_move(self, color: Tile, row: int) -> list[int]:
-        return list(col for col in range(BOARD_SIZE) if self._is_move_valid(color, row, col))
+        row_moves = (self._legal_moves(color) >> (row * BOARD_SIZE)) & ROW_MASK
+        return list(col for col in range(BOARD_SIZE) if (row_moves >> col) & 1)
 
     def _is_move_valid(self, color: Tile, row: int, col: int) -> bool:
-
-        do_i_return_true = False
-
-        if (self._board[row][col].is_occupied()):
+        if not (0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE):
             return False
 
-        # right
-        for i in range(BOARD_SIZE - col - 1):
-            tile_to_check = self._board[row][col + (i + 1)]
-            if tile_to_check.is_occupied():
-                if tile_to_check == color.opposite():
-                    do_i_return_true = True
-                elif do_i_return_true:
-                    return True
-                else:
-                    break
-            else:
-                break
-
-        do_i_return_true = False
-
-        # left
-        for i in range(col):
-            tile_to_check = self._board[row][col - (i + 1)]
-            if tile_to_check.is_occupied():
-                if tile_to_check == color.opposite():
-                    do_i_return_true = True
-                elif do_i_return_true:
-                    return True
-                else:
-                    break
-            else:
-                break
-
-        do_i_return_true = False
-
-        # up
-        for i in range(row):
-            tile_to_check = self._board[row - (i + 1)][col]
-            if tile_to_check.is_occupied():
-                if tile_to_check == color.opposite():
-                    do_i_return_true = True
-                elif do_i_return_true:
-                    return True
-                else:
-                    break
-            else:
-                break
-
-        do_i_return_true = False
-
-        # down
-        for i in range(BOARD_SIZE - row - 1):
-            tile_to_check = self._board[row + (i + 1)][col]
-            if tile_to_check.is_occupied():
-                if tile_to_check == color.opposite():
-                    do_i_return_true = True
-                elif do_i_return_true:
-                    return True
-                else:
-                    break
-            else:
-                break
-
-        do_i_return_true = False
-
-        # up-right
-        for i in range(min(BOARD_SIZE - col - 1, row)):
-            tile_to_check = self._board[row - (i + 1)][col + (i + 1)]
-            if tile_to_check.is_occupied():
-                if tile_to_check == color.opposite():
-                    do_i_return_true = True
-                elif do_i_return_true:
-                    return True
-                else:
-                    break
-            else:
-                break
-
-        do_i_return_true = False
-
-        # up-left
-        for i in range(min(col, row)):
-            tile_to_check = self._board[row - (i + 1)][col - (i + 1)]
-            if tile_to_check.is_occupied():
-                if tile_to_check == color.opposite():
-                    do_i_return_true = True
-                elif do_i_return_true:
-                    return True
-                else:
-                    break
-            else:
-                break
-
-        do_i_return_true = False
-
-        # down-left
-        for i in range(min(col, BOARD_SIZE - row - 1)):
-            tile_to_check = self._board[row + (i + 1)][col - (i + 1)]
-            if tile_to_check.is_occupied():
-                if tile_to_check == color.opposite():
-                    do_i_return_true = True
-                elif do_i_return_true:
-                    return True
-                else:
-                    break
-            else:
-                break
-
-        do_i_return_true = False
-
-        # down-right
-        for i in range(min(BOARD_SIZE - col - 1, BOARD_SIZE - row - 1)):
-            tile_to_check = self._board[row + (i + 1)][col + (i + 1)]
-            if tile_to_check.is_occupied():
-                if tile_to_check == color.opposite():
-                    do_i_return_true = True
-                elif do_i_return_true:
-                    return True
-                else:
-                    break
-            else:
-                break
+        move = square_bit(row, col)
+        if not self._frontier & move:
+            return False
 
-        return False
+        return bool(self._legal_moves(color) & move)
 
     def _flip_tiles(self, color: Tile, row: int, col: int):
-
-        # right
-        for i in range(BOARD_SIZE - col - 1):
-            tile_to_check = self._board[row][col + (i + 1)]
-            if tile_to_check.is_occupied():
-                if tile_to_check == color:
-                    while i >= 0:
-                        self._board[row][col + (i + 1)] = color
-                        i -= 1
-                    break
-            else:
-                break
-
-        # left
-        for i in range(col):
-            tile_to_check = self._board[row][col - (i + 1)]
-            if tile_to_check.is_occupied():
-                if tile_to_check == color:
-                    while i >= 0:
-                        self._board[row][col - (i + 1)] = color
-                        i -= 1
-                    break
-            else:
-                break
-
-        # up
-        for i in range(row):
-            tile_to_check = self._board[row - (i + 1)][col]
-            if tile_to_check.is_occupied():
-                if tile_to_check == color:
-                    while i >= 0:
-                        self._board[row - (i + 1)][col] = color
-                        i -= 1
-                    break
-            else:
-                break
-
-        # down
-        for i in range(BOARD_SIZE - row - 1):
-            tile_to_check = self._board[row + (i + 1)][col]
-            if tile_to_check.is_occupied():
-                if tile_to_check == color:
-                    while i >= 0:
-                        self._board[row + (i + 1)][col] = color
-                        i -= 1
-                    break
-            else:
-                break
-
-        # up-right
-        for i in range(min(BOARD_SIZE - col - 1, row)):
-            tile_to_check = self._board[row - (i + 1)][col + (i + 1)]
-            if tile_to_check.is_occupied():
-                if tile_to_check == color:
-                    while i >= 0:
-                        self._board[row - (i + 1)][col + (i + 1)] = color
-                        i -= 1
-                    break
-            else:
-                break
-
-        # up-left
-        for i in range(min(col, row)):
-            tile_to_check = self._board[row - (i + 1)][col - (i + 1)]
-            if tile_to_check.is_occupied():
-                if tile_to_check == color:
-                    while i >= 0:
-                        self._board[row - (i + 1)][col - (i + 1)] = color
-                        i -= 1
-                    break
-            else:
-                break
-
-        # down-left
-        for i in range(min(col, BOARD_SIZE - row - 1)):
-            tile_to_check = self._board[row + (i + 1)][col - (i + 1)]
-            if tile_to_check.is_occupied():
-                if tile_to_check == color:
-                    while i >= 0:
-                        self._board[row + (i + 1)][col - (i + 1)] = color
-                        i -= 1
-                    break
-            else:
-                break
-
-        # down-right
-        for i in range(min(BOARD_SIZE - col - 1, BOARD_SIZE - row - 1)):
-            tile_to_check = self._board[row + (i + 1)][col + (i + 1)]
-            if tile_to_check.is_occupied():
-                if tile_to_check == color:
-                    while i >= 0:
-                        self._board[row + (i + 1)][col + (i + 1)] = color
-                        i -= 1
-                    break
-            else:
-                break
+        own, opp = self._masks(color)
+        flipped = flipped_tiles(own, opp, square_bit(row, col))
+
+        count = popcount(flipped)
+        if color == Tile.BLACK:
+            self._black |= flipped
+            self._white &= ~flipped
+            self._black_count += count
+            self._white_count -= count
+        else:
+            self._white |= flipped
+            self._black &= ~flipped
+            self._white_count += count
+            self._black_count -= count
+        self._black_moves = None
+        self._white_moves = None
+
+        while flipped:
+            low = flipped & -flipped
+            self._hash ^= ZOBRIST_FLIP[low.bit_length() - 1]
+            flipped ^= low
 
     def place(self, row: int, col: int, color: Tile) -> None:
         if self._is_move_valid(color, row, col):
-            self._board[row][col] = color
+            square = row * BOARD_SIZE + col
+            if color == Tile.BLACK:
+                self._black |= 1 << square
+                self._black_count += 1
+                self._hash ^= ZOBRIST_BLACK[square]
+            else:
+                self._white |= 1 << square
+                self._white_count += 1
+                self._hash ^= ZOBRIST_WHITE[square]
+            self._frontier = (self._frontier | NEIGHBOURS[square]) & ~(self._black | self._white)
             self._flip_tiles(color, row, col)
 
     def scores(self) -> dict[Tile, int]:
-        blacks = 0
-        whites = 0
-
-        for row in self._board:
-            for tile in row:
-                if tile == Tile.BLACK:
-                    blacks += 1
-                elif tile == Tile.WHITE:
-                    whites += 1
-
-        return {Tile.BLACK: blacks, Tile.WHITE: whites}
+        return {Tile.BLACK: self._black_count, Tile.WHITE: self._white_count}
 
     def winner(self) -> Tile:
         # players wins when at least one condition is met:
@@ -363,7 +714,7 @@ class Board:
 
         # 1) the board has no empty tile
         # 2) any of the players cannot make a valid move
-        if score[Tile.WHITE] + score[Tile.BLACK] == BOARD_SIZE * BOARD_SIZE or not self.rows_with_valid_moves(Tile.BLACK) or not self.rows_with_valid_moves(Tile.WHITE):
+        if score[Tile.WHITE] + score[Tile.BLACK] == BOARD_SIZE * BOARD_SIZE or not self._legal_moves(Tile.BLACK) or not self._legal_moves(Tile.WHITE):
             return max(score, key=score.get)
 
         # 3) there is only one tile color on the board
@@ -371,3 +722,62 @@ class Board:
             return min(score, key=score.get)
 
         return Tile.EMPTY
+
+
+def pack_delta(sequence: int, row: int, col: int, color: Tile, board: Board) -> bytes:
+    """
+    Binary form of a single move played on `board`, which must already include it.
+    """
+
+    return PACKED_DELTA.pack(sequence, row * BOARD_SIZE + col, _SIDE_CODES[color], board.checksum)
+
+
+def unpack_delta(data: bytes) -> Optional[tuple[int, int, int, Tile, int]]:
+    if len(data) != PACKED_DELTA.size:
+        return None
+    sequence, square, color, checksum = PACKED_DELTA.unpack(data)
+    if square >= BOARD_SIZE * BOARD_SIZE or color not in (_SIDE_CODES[Tile.BLACK], _SIDE_CODES[Tile.WHITE]):
+        return None
+    row, col = divmod(square, BOARD_SIZE)
+    return sequence, row, col, _SIDES[color], checksum
+
+
+class BoardReplica:
+    """
+    Client-side copy of the server's board, kept up to date by applying move deltas with `Board.place`.
+    A sequence gap or a checksum mismatch marks the replica out of sync until the next full snapshot.
+    """
+
+    def __init__(self) -> None:
+        self.board = Board()
+        self.sequence = 0
+        self.in_sync = True
+
+    def apply_snapshot(self, data: bytes) -> bool:
+        unpacked = Board.unpack(data)
+        if unpacked is None:
+            return False
+        self.board, _, self.sequence = unpacked
+        self.in_sync = True
+        return True
+
+    def apply_delta(self, data: bytes) -> bool:
+        """
+        Apply a packed move delta. Returns True when the replica has just fallen out of sync,
+        meaning a snapshot has to be requested.
+        """
+
+        delta = unpack_delta(data)
+        if delta is None or not self.in_sync:
+            return False
+        sequence, row, col, color, checksum = delta
+        if sequence <= self.sequence:
+            return False  # duplicate of a move already applied
+        if sequence != self.sequence + 1:
+            self.in_sync = False
+            return True
+
+        self.board.place(row, col, color)
+        self.sequence = sequence
+        self.in_sync = self.board.checksum == checksum
+        return not self.in_sync
@@ -0,0 +1,180 @@
+"""
+Vectorized counterparts of the `Board` bitboard primitives, operating on many positions at once.
+
+Positions are either an (N, 8, 8) array of tile codes (`EMPTY`, `BLACK`, `WHITE`) or an (N, 2)
+array of packed uint64 bitboards, where column 0 holds black's tiles and column 1 white's.
+Bit `row * 8 + col` of a bitboard corresponds to the tile at (row, col), same as in `board.py`.
+Colour vectors use the same `BLACK` / `WHITE` codes.
+"""
+
+from __future__ import annotations
+import numpy as np
+from board import BOARD_SIZE, NOT_FIRST_COL, NOT_LAST_COL, Board, Tile
+
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+
+_NOT_FIRST_COL = np.uint64(NOT_FIRST_COL)
+_NOT_LAST_COL = np.uint64(NOT_LAST_COL)
+_ALL = np.uint64(0xFFFF_FFFF_FFFF_FFFF)
+_ZERO = np.uint64(0)
+_ONE = np.uint64(1)
+
+# (shift, is_left_shift, mask applied to both the opponent's tiles and the shifted result)
+_DIRECTIONS = (
+    (np.uint64(1), True, _NOT_FIRST_COL),
+    (np.uint64(9), True, _NOT_FIRST_COL),
+    (np.uint64(7), True, _NOT_LAST_COL),
+    (np.uint64(8), True, _ALL),
+    (np.uint64(1), False, _NOT_LAST_COL),
+    (np.uint64(9), False, _NOT_LAST_COL),
+    (np.uint64(7), False, _NOT_FIRST_COL),
+    (np.uint64(8), False, _ALL),
+)
+
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _shift(bits: np.ndarray, amount: np.uint64, left: bool) -> np.ndarray:
+    return bits << amount if left else bits >> amount
+
+
+def popcount(bits: np.ndarray) -> np.ndarray:
+    """
+    Number of set bits in every element of a uint64 array.
+    """
+
+    bits = np.ascontiguousarray(bits, dtype=np.uint64)
+    return _POPCOUNT_TABLE[bits.view(np.uint8)].reshape(bits.shape + (8,)).sum(axis=-1, dtype=np.int64)
+
+
+def pack(grids: np.ndarray) -> np.ndarray:
+    """
+    Convert an (N, 8, 8) array of tile codes into an (N, 2) array of bitboards.
+    """
+
+    grids = np.asarray(grids).reshape(-1, BOARD_SIZE * BOARD_SIZE)
+    packed = np.empty((grids.shape[0], 2), dtype=np.uint64)
+    for i, code in enumerate((BLACK, WHITE)):
+        bits = np.packbits(grids == code, axis=-1, bitorder="little")
+        packed[:, i] = np.ascontiguousarray(bits).view("<u8")[:, 0]
+    return packed
+
+
+def unpack(packed: np.ndarray) -> np.ndarray:
+    """
+    Convert an (N, 2) array of bitboards into an (N, 8, 8) array of tile codes.
+    """
+
+    packed = np.ascontiguousarray(packed, dtype="<u8")
+    grids = np.zeros((packed.shape[0], BOARD_SIZE * BOARD_SIZE), dtype=np.int8)
+    for i, code in enumerate((BLACK, WHITE)):
+        bits = np.unpackbits(packed[:, i:i + 1].copy().view(np.uint8), axis=-1, bitorder="little")
+        grids[bits.astype(bool)] = code
+    return grids.reshape(-1, BOARD_SIZE, BOARD_SIZE)
+
+
+def from_boards(boards: list[Board]) -> np.ndarray:
+    """
+    Pack a list of `Board` objects into an (N, 2) array of bitboards.
+    """
+
+    return np.array([(board._black, board._white) for board in boards], dtype=np.uint64).reshape(-1, 2)
+
+
+def to_boards(positions: np.ndarray) -> list[Board]:
+    """
+    Inverse of `from_boards`, accepts both position layouts.
+    """
+
+    return [Board.from_bitboards(black, white) for black, white in _as_packed(positions).tolist()]
+
+
+def colors_from_tiles(tiles: list[Tile]) -> np.ndarray:
+    return np.array([BLACK if tile == Tile.BLACK else WHITE for tile in tiles], dtype=np.int8)
+
+
+def _as_packed(positions: np.ndarray) -> np.ndarray:
+    positions = np.asarray(positions)
+    if positions.ndim == 3 and positions.shape[1:] == (BOARD_SIZE, BOARD_SIZE):
+        return pack(positions)
+    if positions.ndim == 2 and positions.shape[1] == 2:
+        return positions.astype(np.uint64, copy=False)
+    raise ValueError(f"Expected an (N, 8, 8) or (N, 2) array, got shape {positions.shape}")
+
+
+def _own_opp(packed: np.ndarray, colors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    is_black = np.asarray(colors) == BLACK
+    black, white = packed[:, 0], packed[:, 1]
+    return np.where(is_black, black, white), np.where(is_black, white, black)
+
+
+def legal_moves(positions: np.ndarray, colors: np.ndarray) -> np.ndarray:
+    """
+    (N,) uint64 bitboards of the legal moves for the player of `colors[i]` in `positions[i]`.
+    """
+
+    packed = _as_packed(positions)
+    own, opp = _own_opp(packed, colors)
+    empty = ~(own | opp)
+    moves = np.zeros_like(own)
+
+    for amount, left, mask in _DIRECTIONS:
+        o = opp & mask
+        x = _shift(own, amount, left) & o
+        for _ in range(5):
+            x |= _shift(x, amount, left) & o
+        moves |= _shift(x, amount, left) & mask
+
+    return moves & empty
+
+
+def moves_to_grid(moves: np.ndarray) -> np.ndarray:
+    """
+    Expand (N,) move bitboards into an (N, 8, 8) boolean array.
+    """
+
+    moves = np.ascontiguousarray(moves, dtype="<u8").reshape(-1, 1)
+    bits = np.unpackbits(moves.view(np.uint8), axis=-1, bitorder="little")
+    return bits.astype(bool).reshape(-1, BOARD_SIZE, BOARD_SIZE)
+
+
+def flip(positions: np.ndarray, colors: np.ndarray, squares: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Play `squares[i]` (`row * 8 + col`) for `colors[i]` in every position at once.
+    Returns the resulting (N, 2) positions and the (N,) bitboards of flipped tiles.
+    Positions where the move is not valid are returned unchanged with nothing flipped.
+    """
+
+    packed = _as_packed(positions)
+    own, opp = _own_opp(packed, colors)
+    move = _ONE << np.asarray(squares).astype(np.uint64)
+    flipped = np.zeros_like(own)
+
+    for amount, left, mask in _DIRECTIONS:
+        o = opp & mask
+        x = _shift(move, amount, left) & o
+        for _ in range(5):
+            x |= _shift(x, amount, left) & o
+        captured = (_shift(x, amount, left) & mask & own) != _ZERO
+        flipped |= np.where(captured, x, _ZERO)
+
+    valid = (flipped != _ZERO) & ((move & (own | opp)) == _ZERO)
+    flipped = np.where(valid, flipped, _ZERO)
+    own = own | np.where(valid, move, _ZERO) | flipped
+    opp = opp & ~flipped
+
+    is_black = np.asarray(colors) == BLACK
+    result = np.empty_like(packed)
+    result[:, 0] = np.where(is_black, own, opp)
+    result[:, 1] = np.where(is_black, opp, own)
+    return result, flipped
+
+
+def scores(positions: np.ndarray) -> np.ndarray:
+    """
+    (N, 2) array of tile counts, black's in column 0 and white's in column 1.
+    """
+
+    return popcount(_as_packed(positions))
@@ -0,0 +1,36 @@
+import numpy as np
+import board_batch
+from board import Board
+from board import Tile
+
+
+def test_batch_matches_board():
+    boards = [Board(), Board(), Board()]
+    boards[1].place(3, 2, Tile.BLACK)
+    boards[2].place(3, 2, Tile.BLACK)
+    boards[2].place(4, 2, Tile.WHITE)
+    colors = [Tile.BLACK, Tile.WHITE, Tile.BLACK]
+
+    positions = board_batch.from_boards(boards)
+    color_codes = board_batch.colors_from_tiles(colors)
+    assert (board_batch.pack(board_batch.unpack(positions)) == positions).all(), 'test_batch_matches_board(): pack round trip failed'
+
+    moves = board_batch.legal_moves(positions, color_codes)
+    for board, color, mask in zip(boards, colors, moves.tolist()):
+        assert mask == board._legal_moves(color), 'test_batch_matches_board(): legal moves mismatch'
+
+    squares = np.array([3 * 8 + 2, 2 * 8 + 2, 0])
+    played, flipped = board_batch.flip(positions, color_codes, squares)
+    for board, color, square in zip(boards, colors, squares.tolist()):
+        board.place(square // 8, square % 8, color)
+    assert flipped[2] == 0, 'test_batch_matches_board(): invalid move flipped tiles'
+    assert [b.serialize() for b in board_batch.to_boards(played)] == [b.serialize() for b in boards], \
+        'test_batch_matches_board(): flip results mismatch'
+
+    expected_scores = [[b.scores()[Tile.BLACK], b.scores()[Tile.WHITE]] for b in boards]
+    assert board_batch.scores(played).tolist() == expected_scores, 'test_batch_matches_board(): scores mismatch'
+
+
+if __name__ == '__main__':
+    test_batch_matches_board()
+    print("Board batch tested successful, all tests passed")
@@ -1,5 +1,6 @@
 from board import Board
 from board import Tile
+from board import BoardReplica, pack_delta, pack_place, unpack_place
 
 def start_position_test_black():
     board = Board() 
@@ -38,10 +39,123 @@ def place_test_black():
     board.place(5,4,Tile.BLACK)
     
     print(board.serialize())
+
+
+def test_place_flips_tiles():
+    board = Board()
+
+    board.place(3, 2, Tile.BLACK)
+    board.place(4, 2, Tile.WHITE)
+    board.place(5, 4, Tile.BLACK)
+
+    expected = "........|........|........|..BBB...|..WBB...|....B...|........|........"
+    assert board.serialize() == expected, f'test_place_flips_tiles(): unexpected board {board.serialize()}'
+    assert board.scores() == {Tile.BLACK: 6, Tile.WHITE: 1}, 'test_place_flips_tiles(): unexpected scores'
+
+
+def test_valid_moves_agree_with_is_move_valid():
+    board = Board.deserialize("........|........|..W.....|..BBB...|..WBW...|...WBB..|........|........")
+
+    for player in (Tile.BLACK, Tile.WHITE):
+        rows = board.rows_with_valid_moves(player)
+        for x in range(8):
+            cols = board.tiles_with_valid_move(player, x)
+            assert (x in rows) == bool(cols), f'test_valid_moves_agree_with_is_move_valid(): row {x} mismatch'
+            for y in range(8):
+                assert (y in cols) == board._is_move_valid(player, x, y), \
+                    f'test_valid_moves_agree_with_is_move_valid(): mismatch at row:{x} col:{y}'
+
+
+def test_zobrist_hash_is_incremental():
+    board = Board()
+    moves = [(3, 2, Tile.BLACK), (4, 2, Tile.WHITE), (5, 4, Tile.BLACK), (2, 2, Tile.WHITE), (0, 0, Tile.BLACK)]
+
+    for row, col, player in moves:
+        board.place(row, col, player)
+        rebuilt = Board.deserialize(board.serialize())
+        assert board.zobrist == rebuilt.zobrist, f'test_zobrist_hash_is_incremental(): hash drifted after {row},{col}'
+
+    assert board.zobrist != Board().zobrist, 'test_zobrist_hash_is_incremental(): hash did not change'
+
+
+def test_incremental_state_matches_rebuilt_board():
+    board = Board()
+    moves = [(3, 2, Tile.BLACK), (2, 2, Tile.WHITE), (2, 3, Tile.BLACK), (4, 2, Tile.WHITE), (5, 2, Tile.BLACK)]
+
+    for row, col, player in moves:
+        board.rows_with_valid_moves(Tile.BLACK)  # fill the move caches before they get invalidated
+        board.rows_with_valid_moves(Tile.WHITE)
+        board.place(row, col, player)
+        rebuilt = Board.deserialize(board.serialize())
+        assert board.scores() == rebuilt.scores(), f'test_incremental_state_matches_rebuilt_board(): scores after {row},{col}'
+        assert board._frontier == rebuilt._frontier, f'test_incremental_state_matches_rebuilt_board(): frontier after {row},{col}'
+        for player in (Tile.BLACK, Tile.WHITE):
+            assert board.rows_with_valid_moves(player) == rebuilt.rows_with_valid_moves(player), \
+                f'test_incremental_state_matches_rebuilt_board(): moves after {row},{col}'
+
+
+def test_cached_frames_match_full_redraw():
+    from board import RENDERER
+
+    board = Board()
+    board.place(3, 2, Tile.BLACK)
+    frames = [(None, None, Tile.WHITE), (2, None, Tile.WHITE), (4, 2, Tile.WHITE), (None, None, Tile.EMPTY)]
+
+    for selected_row, selected_col, player in frames:
+        cached = board.to_image(selected_row, selected_col, player)
+        RENDERER.reset()
+        redrawn = board.to_image(selected_row, selected_col, player)
+        assert cached.tobytes() == redrawn.tobytes(), \
+            f'test_cached_frames_match_full_redraw(): frame differs for {selected_row},{selected_col},{player}'
     
 
+def test_packed_board_round_trip():
+    board = Board()
+    board.place(2, 3, Tile.BLACK)
+    data = board.pack(Tile.WHITE, 7)
+    assert len(data) == 21, 'test_packed_board_round_trip(): wrong packed size'
+    unpacked, side, sequence = Board.unpack(data)
+    assert unpacked.serialize() == board.serialize(), 'test_packed_board_round_trip(): position changed'
+    assert (side, sequence) == (Tile.WHITE, 7), 'test_packed_board_round_trip(): header changed'
+    assert Board.unpack(data[:-1]) is None, 'test_packed_board_round_trip(): truncated board accepted'
+    assert unpack_place(pack_place(5, 6)) == (5, 6), 'test_packed_board_round_trip(): move changed'
+    assert unpack_place(bytes((64,))) is None, 'test_packed_board_round_trip(): invalid move accepted'
+
+
+def test_replica_follows_deltas_and_detects_gaps():
+    server = Board()
+    replica = BoardReplica()
+    replica.apply_snapshot(server.pack(Tile.BLACK, 0))
+
+    server.place(2, 3, Tile.BLACK)
+    assert not replica.apply_delta(pack_delta(1, 2, 3, Tile.BLACK, server)), \
+        'test_replica_follows_deltas_and_detects_gaps(): in-order delta rejected'
+    assert replica.board.serialize() == server.serialize(), 'test_replica_follows_deltas_and_detects_gaps(): diverged'
+
+    server.place(2, 2, Tile.WHITE)
+    assert not replica.apply_delta(pack_delta(1, 2, 3, Tile.BLACK, server)), \
+        'test_replica_follows_deltas_and_detects_gaps(): duplicate delta not ignored'
+    server.place(2, 1, Tile.BLACK)
+    assert replica.apply_delta(pack_delta(3, 2, 1, Tile.BLACK, server)), \
+        'test_replica_follows_deltas_and_detects_gaps(): gap not detected'
+    assert replica.apply_snapshot(server.pack(Tile.WHITE, 3)) and replica.in_sync, \
+        'test_replica_follows_deltas_and_detects_gaps(): snapshot did not resync'
+
+    tampered = Board.from_bitboards(server._black, server._white)
+    tampered.place(1, 1, Tile.WHITE)
+    assert replica.apply_delta(pack_delta(4, 3, 5, Tile.WHITE, tampered)), \
+        'test_replica_follows_deltas_and_detects_gaps(): checksum mismatch not detected'
+
+
 if __name__ == '__main__':
     #start_position_test_black()
     #start_position_test_white()
     place_test_black()
+    test_place_flips_tiles()
+    test_valid_moves_agree_with_is_move_valid()
+    test_zobrist_hash_is_incremental()
+    test_incremental_state_matches_rebuilt_board()
+    test_cached_frames_match_full_redraw()
+    test_packed_board_round_trip()
+    test_replica_follows_deltas_and_detects_gaps()
     print("Board tested successful, all tests passed")
\ No newline at end of file
@@ -0,0 +1,340 @@
+"""
+Opening book built from finished games, read through `mmap` so opening it costs nothing up front.
+
+    python book.py build --journal games.journal --self-play 2000 --plies 16
+    python book.py show                          # book moves from the starting position
+
+A position and all its mirror images and rotations share a single entry: positions are reduced to
+the smallest of their 8 symmetric forms, keyed by the 64-bit Zobrist hash of that form and the side
+to move, and moves are stored relative to it. The file is a header followed by fixed-size entries
+sorted by key, so a lookup is a binary search over the mapped file.
+"""
+
+from __future__ import annotations
+import argparse
+import mmap
+import os
+import random
+import struct
+import time
+from dataclasses import dataclass
+from multiprocessing import Pool
+from typing import Iterable, Optional
+from ai import Engine, EngineConfig
+from board import BOARD_SIZE, ZOBRIST_SIDE, Board, Tile, zobrist_hash
+from journal import JournalReader
+import log
+
+BOOK_PATH = "./book.bin"
+MAGIC = b"OTHB"
+VERSION = 1
+HEADER = struct.Struct("!4sHI")  # magic, version, number of entries
+ENTRY = struct.Struct("!QBII")  # position key, square relative to the canonical form, games, half points
+KEY = struct.Struct("!Q")
+
+BOOK_PLIES = 16  # moves of every game added to the book
+SELF_PLAY_TIME_BUDGET = 0.02
+SELF_PLAY_RANDOM_PLIES = 4  # random moves opening every self-play game, for variety
+
+_MASK = 0xFFFF_FFFF_FFFF_FFFF
+
+
+def flip_vertical(bits: int) -> int:
+    """
+    Mirrors a bitboard top to bottom (row -> 7 - row).
+    """
+
+    return int.from_bytes(bits.to_bytes(8, "little"), "big")
+
+
+def mirror_horizontal(bits: int) -> int:
+    """
+    Mirrors a bitboard left to right (col -> 7 - col).
+    """
+
+    bits = ((bits >> 1) & 0x5555_5555_5555_5555) | ((bits & 0x5555_5555_5555_5555) << 1)
+    bits = ((bits >> 2) & 0x3333_3333_3333_3333) | ((bits & 0x3333_3333_3333_3333) << 2)
+    return ((bits >> 4) & 0x0F0F_0F0F_0F0F_0F0F) | ((bits & 0x0F0F_0F0F_0F0F_0F0F) << 4)
+
+
+def transpose(bits: int) -> int:
+    """
+    Mirrors a bitboard along its main diagonal (row <-> col).
+    """
+
+    t = 0x0F0F_0F0F_0000_0000 & (bits ^ (bits << 28))
+    bits ^= t ^ (t >> 28)
+    t = 0x3333_0000_3333_0000 & (bits ^ (bits << 14))
+    bits ^= t ^ (t >> 14)
+    t = 0x5500_5500_5500_5500 & (bits ^ (bits << 7))
+    bits ^= t ^ (t >> 7)
+    return bits & _MASK
+
+
+def symmetries(bits: int) -> tuple[int, ...]:
+    """
+    The 8 images of a bitboard under the symmetries of the square, always in the same order.
+    """
+
+    vertical = flip_vertical(bits)
+    transposed = transpose(bits)
+    transposed_vertical = flip_vertical(transposed)
+    return (bits, vertical, mirror_horizontal(bits), mirror_horizontal(vertical),
+            transposed, transposed_vertical, mirror_horizontal(transposed), mirror_horizontal(transposed_vertical))
+
+
+# SQUARE_MAPS[s][square] is where symmetry s moves `square`, INVERSE_MAPS[s] undoes it
+SQUARE_MAPS = tuple(zip(*(tuple(image.bit_length() - 1 for image in symmetries(1 << square))
+                          for square in range(BOARD_SIZE * BOARD_SIZE))))
+INVERSE_MAPS = tuple(tuple(mapping.index(square) for square in range(BOARD_SIZE * BOARD_SIZE))
+                     for mapping in SQUARE_MAPS)
+
+
+def canonical(board: Board, color: Tile) -> tuple[int, tuple[int, ...]]:
+    """
+    Returns the book key of the position with `color` to move and the symmetries that turn the
+    position into its canonical form, the smallest (black, white) pair among its 8 images.
+    More than one symmetry does so when the position itself is symmetric, like the starting one.
+    """
+
+    black, white = board._masks(Tile.BLACK)
+    images = list(zip(symmetries(black), symmetries(white)))
+    smallest = min(images)
+    key = zobrist_hash(*smallest) ^ (ZOBRIST_SIDE if color == Tile.WHITE else 0)
+    return key, tuple(symmetry for symmetry, image in enumerate(images) if image == smallest)
+
+
+@dataclass(frozen=True)
+class BookMove:
+    row: int
+    col: int
+    games: int
+    score: float  # average result for the side to move: 1 win, 0.5 draw, 0 loss
+
+
+class OpeningBook:
+    """
+    Read-only opening book mapped into memory.
+    """
+
+    def __init__(self, path: str = BOOK_PATH) -> None:
+        self._file = open(path, "rb")
+        try:
+            if os.fstat(self._file.fileno()).st_size < HEADER.size:
+                raise ValueError(f"Truncated opening book: {path}")
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self._file.close()
+            raise
+        magic, version, self._entries = HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported opening book: {path}")
+        if HEADER.size + self._entries * ENTRY.size > len(self._data):
+            self.close()
+            raise ValueError(f"Truncated opening book: {path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def close(self) -> None:
+        self._data.close()
+        self._file.close()
+
+    def _key_at(self, index: int) -> int:
+        return KEY.unpack_from(self._data, HEADER.size + index * ENTRY.size)[0]
+
+    def _first_entry(self, key: int) -> int:
+        low, high = 0, self._entries
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def lookup(self, board: Board, color: Tile) -> list[BookMove]:
+        """
+        Book moves for `color` on `board`, most played first. Empty if the position is not in the book.
+        """
+
+        key, found = canonical(board, color)
+        inverse = INVERSE_MAPS[found[0]]
+        moves = []
+        offset = HEADER.size + self._first_entry(key) * ENTRY.size
+        end = HEADER.size + self._entries * ENTRY.size
+        while offset < end:
+            entry_key, square, games, half_points = ENTRY.unpack_from(self._data, offset)
+            if entry_key != key:
+                break
+            row, col = divmod(inverse[square], BOARD_SIZE)
+            moves.append(BookMove(row, col, games, half_points / (2 * games)))
+            offset += ENTRY.size
+        moves.sort(key=lambda move: move.games, reverse=True)
+        return moves
+
+    def best_move(self, board: Board, color: Tile, min_games: int = 1) -> Optional[tuple[int, int]]:
+        """
+        The book move with the best score among those played at least `min_games` times, if any.
+        """
+
+        moves = [move for move in self.lookup(board, color) if move.games >= min_games]
+        if not moves:
+            return None
+        best = max(moves, key=lambda move: (move.score, move.games))
+        return best.row, best.col
+
+
+def open_book(path: str = BOOK_PATH) -> Optional[OpeningBook]:
+    """
+    Opens the book at `path`, or returns None when there is none or it cannot be used.
+    """
+
+    if not os.path.exists(path):
+        return None
+    try:
+        return OpeningBook(path)
+    except (OSError, ValueError) as error:
+        log.warning("Ignoring the opening book: {}", error)
+        return None
+
+
+class BookBuilder:
+    """
+    Collects move statistics from finished games and writes them as an opening book.
+    """
+
+    def __init__(self, plies: int = BOOK_PLIES) -> None:
+        self._plies = plies
+        self._stats: dict[tuple[int, int], list[int]] = {}  # (key, canonical square) -> [games, half points]
+        self.games = 0
+
+    def add_game(self, moves: Iterable[tuple[int, int, Tile]], winner: Tile) -> None:
+        """
+        Adds the first moves of a game that `winner` won, or that was drawn if `winner` is Tile.EMPTY.
+        """
+
+        board = Board()
+        for ply, (row, col, color) in enumerate(moves):
+            if ply >= self._plies:
+                break
+            key, found = canonical(board, color)
+            square = min(SQUARE_MAPS[symmetry][row * BOARD_SIZE + col] for symmetry in found)  # one of equivalent moves
+            stats = self._stats.setdefault((key, square), [0, 0])
+            stats[0] += 1
+            stats[1] += 1 if winner == Tile.EMPTY else 2 if winner == color else 0
+            board.place(row, col, color)
+        self.games += 1
+
+    def add_journal(self, path: str) -> int:
+        """
+        Adds every finished game of a journal and returns how many there were. Games that ended
+        on the board count with their final score, abandoned ones with the recorded winner.
+        """
+
+        added = 0
+        with JournalReader(path) as reader:
+            for game_id in reader.game_ids():
+                game = reader.game(game_id)
+                if game.in_progress:
+                    continue
+                board = game.board_at()
+                winner = _result(board) if board.winner() != Tile.EMPTY else game.winner
+                self.add_game(((row, col, color) for row, col, color, _ in game.moves), winner)
+                added += 1
+        return added
+
+    def add_self_play(self, games: int, processes: Optional[int] = None, seed: int = 0,
+                      time_budget: float = SELF_PLAY_TIME_BUDGET) -> None:
+        with Pool(processes or os.cpu_count() or 1) as pool:
+            tasks = [(seed + index, time_budget, self._plies) for index in range(games)]
+            for played, (moves, winner) in enumerate(pool.imap_unordered(_self_play_game, tasks), 1):
+                self.add_game(moves, winner)
+                if played % 100 == 0:
+                    print(f"[INFO] {played} self-play games played")
+
+    def write(self, path: str = BOOK_PATH) -> int:
+        """
+        Writes the book to `path`, replacing it atomically, and returns the number of entries.
+        """
+
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, len(self._stats)))
+            for (key, square), (games, half_points) in sorted(self._stats.items()):
+                file.write(ENTRY.pack(key, square, games, half_points))
+        os.replace(temporary, path)
+        return len(self._stats)
+
+
+def _result(board: Board) -> Tile:
+    scores = board.scores()
+    if scores[Tile.BLACK] == scores[Tile.WHITE]:
+        return Tile.EMPTY
+    return max(scores, key=scores.get)
+
+
+def _self_play_game(task: tuple[int, float, int]) -> tuple[list[tuple[int, int, Tile]], Tile]:
+    """
+    Plays one engine game after a few random moves. The engine only searches the plies the book
+    keeps, the rest of the game is played at random to finish it quickly.
+    """
+
+    seed, time_budget, plies = task
+    rng = random.Random(seed)
+    engine = Engine(EngineConfig(time_budget=time_budget))
+    board = Board()
+    turn = Tile.BLACK
+    moves = []
+    while board.winner() == Tile.EMPTY:
+        if SELF_PLAY_RANDOM_PLIES <= len(moves) < plies:
+            row, col = engine.choose_move(board, turn)
+        else:
+            row = rng.choice(board.rows_with_valid_moves(turn))
+            col = rng.choice(board.tiles_with_valid_move(turn, row))
+        board.place(row, col, turn)
+        moves.append((row, col, turn))
+        turn = turn.opposite()
+    return moves, _result(board)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the opening book.")
+    parser.add_argument("--book", default=BOOK_PATH, help="opening book file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build the book from a journal and/or self-play games")
+    build.add_argument("--journal", action="append", default=[], help="journal of played games, may be repeated")
+    build.add_argument("--self-play", type=int, default=0, help="number of self-play games to add")
+    build.add_argument("--plies", type=int, default=BOOK_PLIES, help="moves of every game added to the book")
+    build.add_argument("--processes", type=int, default=None, help="self-play worker processes, all cores by default")
+    build.add_argument("--time-budget", type=float, default=SELF_PLAY_TIME_BUDGET, help="seconds per self-play move")
+    build.add_argument("--seed", type=int, default=0)
+    commands.add_parser("show", help="list the book moves from the starting position")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        started = time.perf_counter()
+        builder = BookBuilder(args.plies)
+        for path in args.journal:
+            print(f"[INFO] Added {builder.add_journal(path)} games from {path}")
+        if args.self_play:
+            builder.add_self_play(args.self_play, args.processes, args.seed, args.time_budget)
+        entries = builder.write(args.book)
+        print(f"[INFO] Wrote {entries} entries from {builder.games} games to {args.book} "
+              f"in {time.perf_counter() - started:.1f}s")
+    else:
+        with OpeningBook(args.book) as book:
+            print(f"[INFO] {len(book)} entries")
+            for move in book.lookup(Board(), Tile.BLACK):
+                print(f"{move.row},{move.col}: {move.games} games, score {move.score:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import random
+from ai import Engine, EngineConfig
+from board import Board, Tile
+from book import BookBuilder, OpeningBook, canonical, open_book, symmetries
+
+
+def _naive_image(bits, symmetry):
+    result = 0
+    for square in range(64):
+        if bits >> square & 1:
+            row, col = divmod(square, 8)
+            if symmetry & 4:
+                row, col = col, row
+            if symmetry & 1:
+                row = 7 - row
+            if symmetry & 2:
+                col = 7 - col
+            result |= 1 << (row * 8 + col)
+    return result
+
+
+def test_symmetric_positions_share_an_entry(tmp_path):
+    bits = random.Random(1).getrandbits(64)
+    assert list(symmetries(bits)) == [_naive_image(bits, symmetry) for symmetry in range(8)], \
+        'test_symmetric_positions_share_an_entry(): wrong symmetry images'
+
+    keys = set()
+    for row, col in ((2, 3), (3, 2), (4, 5), (5, 4)):  # the four equivalent first moves
+        board = Board()
+        board.place(row, col, Tile.BLACK)
+        keys.add(canonical(board, Tile.WHITE)[0])
+    assert len(keys) == 1, 'test_symmetric_positions_share_an_entry(): symmetric positions have different keys'
+    assert canonical(Board(), Tile.BLACK)[0] != canonical(Board(), Tile.WHITE)[0], \
+        'test_symmetric_positions_share_an_entry(): side to move not part of the key'
+
+    builder = BookBuilder(plies=1)
+    for row, col in ((2, 3), (3, 2), (4, 5), (5, 4)):
+        builder.add_game([(row, col, Tile.BLACK)], Tile.BLACK)
+    assert builder.write(str(tmp_path / "book.bin")) == 1, \
+        'test_symmetric_positions_share_an_entry(): equivalent first moves not merged'
+
+
+def test_lookup_maps_moves_back(tmp_path):
+    builder = BookBuilder(plies=2)
+    for _ in range(3):
+        builder.add_game([(5, 4, Tile.BLACK), (5, 5, Tile.WHITE)], Tile.WHITE)
+    builder.add_game([(5, 4, Tile.BLACK), (5, 3, Tile.WHITE)], Tile.BLACK)
+    path = str(tmp_path / "book.bin")
+    builder.write(path)
+
+    with OpeningBook(path) as book:
+        board = Board()
+        board.place(2, 3, Tile.BLACK)  # the mirror image of (5, 4)
+        moves = book.lookup(board, Tile.WHITE)
+        assert [(move.row, move.col, move.games) for move in moves] == [(2, 2, 3), (2, 4, 1)], \
+            'test_lookup_maps_moves_back(): wrong book moves'
+        assert moves[0].score == 1.0 and moves[1].score == 0.0, 'test_lookup_maps_moves_back(): wrong scores'
+        assert book.lookup(Board(), Tile.WHITE) == [], 'test_lookup_maps_moves_back(): unknown position found'
+        engine = Engine(EngineConfig(book_min_games=2), book)
+        assert engine.choose_move(board, Tile.WHITE) == (2, 2) and engine.last_nodes == 0, \
+            'test_lookup_maps_moves_back(): book move not played'
+
+
+def test_unusable_book_is_ignored(tmp_path):
+    path = tmp_path / "unusable.bin"
+    assert open_book(str(path)) is None, 'test_unusable_book_is_ignored(): missing book opened'
+    for content in (b"", b"OTHB\x00", b"NOPE\x00\x01\x00\x00\x00\x00", b"OTHB\x00\x01\x00\x00\x00\x05"):
+        path.write_bytes(content)
+        assert open_book(str(path)) is None, f'test_unusable_book_is_ignored(): opened {content!r}'
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+    with tempfile.TemporaryDirectory() as directory:
+        test_symmetric_positions_share_an_entry(pathlib.Path(directory))
+        test_lookup_maps_moves_back(pathlib.Path(directory))
+        test_unusable_book_is_ignored(pathlib.Path(directory))
+    print("book_test.py tested successful, all tests passed")
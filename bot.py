@@ -0,0 +1,144 @@
+"""
+Headless player speaking the same protocol as `client.game_loop`, with moves picked at random.
+
+    python bot.py <broker address> <uid>
+"""
+
+from __future__ import annotations
+import random
+import sys
+import time
+from threading import Event
+from typing import Optional, Sequence
+from netcode import (ANY, DELTA_PROTOCOL, SUPPORTED_PROTOCOLS, TEXT_PROTOCOL, ClientChannel, Match, Matcher, Message,
+                     ReceiveCancelled, Transport)
+from board import Board, BoardReplica, Tile, pack_place
+
+POLL_TIMEOUT = 0.5  # seconds between checks of the stop event while waiting for messages
+
+
+class BotChannel(ClientChannel):
+    """
+    ClientChannel offering a chosen set of protocol versions and counting its traffic.
+    """
+
+    def __init__(self, broker_address: str, uid: str, transport: Optional[Transport] = None,
+                 protocols: Sequence[int] = SUPPORTED_PROTOCOLS) -> None:
+        super().__init__(broker_address, uid, transport)
+        self._protocols = protocols
+        self.sent = 0
+        self.received = 0
+
+    def _on_connect(self) -> None:
+        self.rejoin()
+
+    def _on_message(self, topic: str, payload: bytes) -> None:
+        self.received += 1
+        super()._on_message(topic, payload)
+
+    def _send_message(self, receiver: str, tag: str, content=None) -> None:
+        self.sent += 1
+        super()._send_message(receiver, tag, content)
+
+    def rejoin(self) -> None:
+        self.send_to_server("connected", ",".join(map(str, self._protocols)))
+
+
+class Bot:
+    """
+    Plays games until `stop` is set, recording the time from each `place` to the board update
+    that follows it.
+    """
+
+    def __init__(self, channel: BotChannel, seed: int = 0, think_time: float = 0.0,
+                 stop: Optional[Event] = None) -> None:
+        self._channel = channel
+        self._rng = random.Random(seed)
+        self._think_time = think_time
+        self._stop = stop or Event()
+        self.games = 0
+        self.turn_latencies: list[float] = []
+
+    def play(self, games: Optional[int] = None) -> None:
+        while not self._stop.is_set() and (games is None or self.games < games):
+            if self.play_game() is None:
+                return
+            self.games += 1
+            self._channel.rejoin()
+
+    def play_game(self) -> Optional[Tile]:
+        """
+        Play until the server announces the winner, returning None when stopped first.
+        """
+
+        replica = BoardReplica()
+        protocol = TEXT_PROTOCOL
+        placed_at: Optional[float] = None
+        while True:
+            message = self._receive(ANY)
+            if message is None:
+                return None
+
+            if message.tag in ("board", "board-bin", "move-bin") and placed_at is not None:
+                self.turn_latencies.append(time.perf_counter() - placed_at)
+                placed_at = None
+
+            if message.tag == "protocol":
+                protocol = int(message.content)
+            elif message.tag == "board":
+                board = Board.deserialize(message.content)
+                if board is not None:
+                    replica.board = board
+                    self._channel.send_to_server("board-ack")
+            elif message.tag == "board-bin":
+                if replica.apply_snapshot(message.content) and protocol != DELTA_PROTOCOL:
+                    self._channel.send_to_server("board-ack")
+            elif message.tag == "move-bin":
+                if replica.apply_delta(message.content):
+                    self._channel.send_to_server("resync")
+            elif message.tag == "your-turn":
+                color_value, _, sequence = message.content.partition(",")
+                color = Tile(color_value)
+                if sequence and (not replica.in_sync or int(sequence) != replica.sequence):
+                    self._channel.send_to_server("resync")
+                    snapshot = self._receive(Match(tag="board-bin"))
+                    if snapshot is None:
+                        return None
+                    replica.apply_snapshot(snapshot.content)
+
+                if self._think_time:
+                    time.sleep(self._think_time)
+                row = self._rng.choice(replica.board.rows_with_valid_moves(color))
+                col = self._rng.choice(replica.board.tiles_with_valid_move(color, row))
+                placed_at = time.perf_counter()
+                if protocol != TEXT_PROTOCOL:
+                    self._channel.send_to_server("place-bin", pack_place(row, col))
+                else:
+                    self._channel.send_to_server("place", f"{row},{col}")
+            elif message.tag == "winner":
+                return Tile(message.content)
+
+    def _receive(self, condition: Matcher) -> Optional[Message]:
+        """
+        Wait for a message matching `condition`, returning None once stopped or disconnected.
+        """
+
+        while not self._stop.is_set():
+            try:
+                return self._channel.receive_matching(condition, POLL_TIMEOUT)
+            except TimeoutError:
+                continue
+            except ReceiveCancelled:
+                return None
+        return None
+
+
+def main():
+    broker_address = sys.argv[1]
+    uid = sys.argv[2]
+    with BotChannel(broker_address, uid) as channel:
+        Bot(channel).play()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+from threading import Event, Thread
+from bot import POLL_TIMEOUT, Bot, BotChannel
+from netcode import LoopbackBroker, LoopbackTransport, Match, ServerChannel
+from server import RoomManager
+
+
+def play_games(protocols: dict[str, tuple[int, ...]], games: int) -> list[Bot]:
+    broker = LoopbackBroker()
+    with ServerChannel(LoopbackTransport(broker)) as server:
+        manager = Thread(target=RoomManager(server).run, daemon=True)
+        manager.start()
+
+        channels = [BotChannel("loopback", uid, LoopbackTransport(broker), offer) for uid, offer in protocols.items()]
+        bots = [Bot(channel, seed) for seed, channel in enumerate(channels)]
+        threads = [Thread(target=bot.play, args=(games,), daemon=True) for bot in bots]
+        for channel in channels:
+            channel.__enter__()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10.0)
+        for channel in channels:
+            channel.__exit__()
+    manager.join(timeout=1.0)
+    return bots
+
+
+def test_bots_finish_games_in_every_protocol():
+    bots = play_games({"text": (1,), "delta": (1, 2, 3)}, 3)
+    assert [bot.games for bot in bots] == [3, 3], 'test_bots_finish_games_in_every_protocol(): games did not finish'
+    assert all(bot.turn_latencies for bot in bots), 'test_bots_finish_games_in_every_protocol(): no turns measured'
+
+
+def test_bot_waiting_for_a_snapshot_stops():
+    broker = LoopbackBroker()
+    stop = Event()
+    with ServerChannel(LoopbackTransport(broker)) as server, \
+            BotChannel("loopback", "bot", LoopbackTransport(broker)) as channel:
+        bot = Bot(channel, stop=stop)
+        thread = Thread(target=bot.play_game, daemon=True)
+        thread.start()
+        server.send_to_client("bot", "your-turn", "B,5")  # the bot has no board yet, so it asks for one
+        assert server.receive_matching(Match("bot", "resync"), 1.0), 'test_bot_waiting_for_a_snapshot_stops(): no resync'
+
+        stop.set()
+        thread.join(POLL_TIMEOUT * 4)
+        assert not thread.is_alive(), 'test_bot_waiting_for_a_snapshot_stops(): bot kept waiting for the snapshot'
+
+
+if __name__ == '__main__':
+    test_bots_finish_games_in_every_protocol()
+    test_bot_waiting_for_a_snapshot_stops()
+    print("Bot tested successful, all tests passed")
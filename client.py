@@ -1,22 +1,33 @@
 import sys
 import time
 from typing import Any, Callable, Optional
-from PIL import Image
 from config import *
-from netcode import ClientChannel, LOCALHOST
-from board import Board, Tile
+from netcode import DELTA_PROTOCOL, TEXT_PROTOCOL, ClientChannel, LOCALHOST, Match
+from board import Board, BoardReplica, Tile, pack_place
 from rfid_reader import RfidReader
-from input_reader import Button, Encoder
+from input_reader import EventKind, HardwareGpio, InputEvents
 from display import Display
+from assets import FrameCompositor, load_pack
+import log
+from metrics import REGISTRY, MetricsFile
 
-RFID_IMAGE = Image.open("./img/rfid.png").convert("RGB")
-WAITING_PLAYER_IMAGE = Image.open("./img/waiting-player.png").convert("RGB")
-WIN_BLACK = Image.open("./img/win-black.png").convert("RGB")
-WIN_WHITE = Image.open("./img/win-white.png").convert("RGB")
+ASSETS = load_pack()
+RFID_IMAGE = ASSETS["rfid"].rgb565
+WAITING_PLAYER_IMAGE = ASSETS["waiting-player"].rgb565
+WIN_BLACK = ASSETS["win-black"].rgb565
+WIN_WHITE = ASSETS["win-white"].rgb565
+compositor = FrameCompositor(ASSETS)
 
-button_red = Button(button_red_pin)
-button_green = Button(button_green_pin)
-encoder = Encoder(encoder_first_pin, encoder_second_pin)
+METRICS_PATH = "./client.prom"
+FRAME_SECONDS = REGISTRY.histogram("othello_frame_build_seconds", "Time to compose a board frame.")
+MOVE_SECONDS = REGISTRY.histogram("othello_client_turn_seconds", "From your-turn to sending the move, on the client.")
+RESYNC_TIMEOUT = 5.0  # seconds to wait for a requested snapshot
+RESYNC_ATTEMPTS = 3  # snapshot requests before giving up and reconnecting
+
+inputs = InputEvents(HardwareGpio())
+inputs.add_button("red", button_red_pin)
+inputs.add_button("green", button_green_pin)
+inputs.add_encoder("encoder", encoder_first_pin, encoder_second_pin)
 
 
 def buzz(duration_seconds: float) -> None:
@@ -25,100 +36,158 @@ def buzz(duration_seconds: float) -> None:
     GPIO.output(buzzer_pin, True)
 
 
+def show(display: Display, board: Board, selected_row: Optional[int] = None, selected_col: Optional[int] = None,
+         color: Tile = Tile.EMPTY) -> None:
+    started = time.perf_counter()
+    frame = compositor.render(board, selected_row, selected_col, color=color)
+    FRAME_SECONDS.observe(time.perf_counter() - started)
+    display.draw_frame(frame)
+
+
 def select_with_encoder(
         choices: list[Any],
         on_selection: Callable[[Any],
                                None],
         can_cancel: bool = False) -> Optional[Any]:
     selected_index = 0
+    inputs.clear()  # ignore anything done before the player was asked
     on_selection(choices[selected_index])
-    print("[INFO] Waiting for user input...")
+    log.debug("Waiting for user input...")
     while True:
-        button_red.update()
-        button_green.update()
-        encoder.update()
+        event = inputs.get()
 
-        if encoder.was_just_turned_left:
+        if event.kind == EventKind.TURNED_LEFT:
             selected_index = (selected_index - 1) % len(choices)
             on_selection(choices[selected_index])
 
-        if encoder.was_just_turned_right:
+        if event.kind == EventKind.TURNED_RIGHT:
             selected_index = (selected_index + 1) % len(choices)
             on_selection(choices[selected_index])
 
-        if button_red.was_just_pressed:
+        if event.source == "red" and event.kind == EventKind.PRESSED:
             return choices[selected_index]
 
-        if can_cancel and button_green.was_just_pressed:
+        if can_cancel and event.source == "green" and event.kind == EventKind.PRESSED:
             return None
 
 
+def request_snapshot(channel: ClientChannel) -> Optional[bytes]:
+    """
+    Ask the server for a new board snapshot, or return None if none arrives after a few attempts.
+    """
+
+    for _ in range(RESYNC_ATTEMPTS):
+        log.warning("Board out of sync, requesting a snapshot...")
+        channel.send_to_server("resync")
+        try:
+            return channel.receive_matching(Match(tag="board-bin"), RESYNC_TIMEOUT).content
+        except TimeoutError:
+            continue
+    return None
+
+
 def game_loop(channel: ClientChannel, display: Display):
-    board = Board()
+    """
+    Plays games until the board cannot be brought back in sync, the caller reconnects then.
+    """
+
+    replica = BoardReplica()
+    protocol = TEXT_PROTOCOL
     while True:
         message = channel.receive_any()
-        if message.tag == "board":
-            print("[INFO] Received new board.")
+        if message.tag == "protocol":
+            protocol = int(message.content)
+            log.info("Using protocol version {}.", protocol)
+        elif message.tag == "board":
+            log.debug("Received new board.")
             new_board = Board.deserialize(message.content)
             if new_board is not None:
-                board = new_board
-                display.draw(board.to_image())
+                replica.board = new_board
+                show(display, replica.board)
                 channel.send_to_server("board-ack")
             else:
-                print("[WARNING] Invalid board received!")
+                log.warning("Invalid board received!")
+        elif message.tag == "board-bin":
+            log.debug("Received new board.")
+            if replica.apply_snapshot(message.content):
+                show(display, replica.board)
+                if protocol != DELTA_PROTOCOL:
+                    channel.send_to_server("board-ack")
+            else:
+                log.warning("Invalid board received!")
+        elif message.tag == "move-bin":
+            if replica.apply_delta(message.content):
+                log.warning("Board out of sync, requesting a snapshot...")
+                channel.send_to_server("resync")
+            elif replica.in_sync:
+                show(display, replica.board)
         elif message.tag == "your-turn":
-            print("[INFO] Your turn!")
-            color = Tile(message.content)
-            display.draw(board.to_image(color=color))
+            log.info("Your turn!")
+            asked = time.perf_counter()
+            color_value, _, sequence = message.content.partition(",")
+            color = Tile(color_value)
+            if sequence and (not replica.in_sync or int(sequence) != replica.sequence):
+                snapshot = request_snapshot(channel)
+                if snapshot is None or not replica.apply_snapshot(snapshot):
+                    log.warning("No valid snapshot received, reconnecting...")
+                    return
+            board = replica.board
+            show(display, board, color=color)
 
             selected_row = None
             selected_col = None
             while selected_col is None:
-                print("[INFO] Select row...")
+                log.debug("Select row...")
                 valid_rows = board.rows_with_valid_moves(color)
                 selected_row = select_with_encoder(
                     valid_rows,
-                    lambda row: display.draw(board.to_image(row, color=color)),
+                    lambda row: show(display, board, row, color=color),
                     can_cancel=False
                 )
-                print("[INFO] Select column...")
+                log.debug("Select column...")
                 valid_cols = board.tiles_with_valid_move(color, selected_row)
                 selected_col = select_with_encoder(
                     valid_cols,
-                    lambda col: display.draw(board.to_image(selected_row, col, color=color)),
+                    lambda col: show(display, board, selected_row, col, color=color),
                     can_cancel=True
                 )
 
-            print("[INFO] Placing tile...")
-            channel.send_to_server("place", f"{selected_row},{selected_col}")
+            log.debug("Placing tile...")
+            if protocol != TEXT_PROTOCOL:
+                channel.send_to_server("place-bin", pack_place(selected_row, selected_col))
+            else:
+                channel.send_to_server("place", f"{selected_row},{selected_col}")
+            MOVE_SECONDS.observe(time.perf_counter() - asked)
             buzz(0.25)
         elif message.tag == "winner":
             winner = Tile(message.content)
-            print(f"[INFO] Game finished, winner: {winner}")
+            log.info("Game finished, winner: {}", winner)
             if winner == Tile.BLACK:
-                display.draw(WIN_BLACK)
+                display.draw_frame(WIN_BLACK)
             elif winner == Tile.WHITE:
-                display.draw(WIN_WHITE)
+                display.draw_frame(WIN_WHITE)
             else:
-                print(f"[WARNING] Invalid winner: {winner}")
+                log.warning("Invalid winner: {}", winner)
             buzz(5)
 
 
 def main():
-    print("[INFO] Starting...")
+    log.info("Starting...")
     broker_address = sys.argv[1] if len(sys.argv) > 1 else LOCALHOST
 
-    with Display() as display:
+    with Display() as display, MetricsFile(METRICS_PATH):
         rfid_reader = RfidReader()
-        display.draw(RFID_IMAGE)
-        print("[INFO] Waiting for RFID card...")
+        display.draw_frame(RFID_IMAGE)
+        log.info("Waiting for RFID card...")
         client_id = rfid_reader.read_uid()
-        print("[INFO] RFID scanned, waiting for other player...")
-        display.draw(WAITING_PLAYER_IMAGE)
+        log.info("RFID scanned, waiting for other player...")
+        display.draw_frame(WAITING_PLAYER_IMAGE)
         buzz(1)
 
-        with ClientChannel(broker_address, client_id) as channel:
-            game_loop(channel, display)
+        while True:
+            with ClientChannel(broker_address, client_id) as channel:
+                game_loop(channel, display)
+            display.draw_frame(WAITING_PLAYER_IMAGE)
 
 
 if __name__ == "__main__":
@@ -1,18 +1,81 @@
+import time
+from typing import Optional
+import numpy as np
 from lib.oled.SSD1331 import SSD1331
 from PIL import Image
+from metrics import REGISTRY
+
+# Dirty row bands closer than this are sent as one window, addressing a window costs 6 command bytes
+MERGE_ROW_GAP = 2
+
+DRAW_SECONDS = REGISTRY.histogram("othello_display_draw_seconds", "Time to send a frame to the display.")
+
+
+def dirty_rectangles(previous: np.ndarray, frame: np.ndarray) -> list[tuple[int, int, int, int]]:
+    """
+    Bounding rectangles (x_start, y_start, x_end, y_end), ends exclusive, of the pixels that differ
+    between two RGB565 frames. Changed rows are grouped into bands, each with its own column range.
+    """
+
+    changed = (previous != frame).any(axis=2)
+    rows = np.flatnonzero(changed.any(axis=1))
+    if len(rows) == 0:
+        return []
+
+    bands = []
+    start = previous_row = rows[0]
+    for row in rows[1:]:
+        if row - previous_row > MERGE_ROW_GAP:
+            bands.append((start, previous_row + 1))
+            start = row
+        previous_row = row
+    bands.append((start, previous_row + 1))
+
+    rectangles = []
+    for y_start, y_end in bands:
+        columns = np.flatnonzero(changed[y_start:y_end].any(axis=0))
+        rectangles.append((int(columns[0]), int(y_start), int(columns[-1]) + 1, int(y_end)))
+    return rectangles
 
 
 class Display:
-    def __init__(self) -> None:
-        self._ssd1331 = SSD1331()
+    def __init__(self, backend=None) -> None:
+        self._ssd1331 = SSD1331(backend)
+        self._last_frame: Optional[np.ndarray] = None  # what the panel currently shows, in RGB565
 
     def __enter__(self):
         self._ssd1331.Init()
-        self._ssd1331.clear()
+        self.clear()
         return self
 
     def __exit__(self, *_) -> None:
+        self.clear()
+
+    def clear(self) -> None:
         self._ssd1331.clear()
+        self._last_frame = None
 
     def draw(self, image: Image) -> None:
-        self._ssd1331.ShowImage(image, 0, 0)
+        """
+        Send only the parts of `image` which differ from the previous frame, identical frames are skipped.
+        """
+
+        self.draw_frame(self._ssd1331.ToRGB565(image))
+
+    def draw_frame(self, frame: np.ndarray) -> None:
+        """
+        Same as `draw`, for frames which are already in RGB565: either (64, 96) big-endian uint16
+        arrays, like the ones from the asset pack, or (64, 96, 2) uint8 arrays with the high byte first.
+        """
+
+        started = time.perf_counter()
+        if frame.ndim == 2:
+            frame = frame.view(np.uint8).reshape(frame.shape + (2,))
+        if self._last_frame is None:
+            self._ssd1331.ShowFrame(frame)
+            self._last_frame = frame.copy()
+        else:
+            for x_start, y_start, x_end, y_end in dirty_rectangles(self._last_frame, frame):
+                self._ssd1331.ShowWindow(frame, x_start, y_start, x_end, y_end)
+            np.copyto(self._last_frame, frame)
+        DRAW_SECONDS.observe(time.perf_counter() - started)
@@ -0,0 +1,57 @@
+import numpy as np
+from PIL import Image
+from lib.oled.SSD1331 import SSD1331
+from lib.oled.backend import FakeSpiBackend
+from board import Board
+from board import Tile
+from display import Display
+
+
+def random_image(seed: int) -> Image.Image:
+    pixels = np.random.default_rng(seed).integers(0, 256, (64, 96, 3), dtype=np.uint8)
+    return Image.fromarray(pixels, "RGB")
+
+
+def expected_rgb565(image: Image.Image) -> np.ndarray:
+    pixels = np.asarray(image).astype(np.uint16)
+    rgb565 = ((pixels[..., 0] & 0xF8) << 8) | ((pixels[..., 1] & 0xFC) << 3) | (pixels[..., 2] >> 3)
+    return np.stack([rgb565 >> 8, rgb565 & 0xFF], axis=-1).astype(np.uint8)
+
+
+def test_show_image_sends_frame_in_bulk():
+    fake = FakeSpiBackend()
+    ssd1331 = SSD1331(fake)
+    ssd1331.Init()
+    ssd1331.clear()
+    assert (fake.ram == 0xFF).all(), 'test_show_image_sends_frame_in_bulk(): clear() left pixels behind'
+
+    image = random_image(0)
+    fake.reset_counters()
+    ssd1331.ShowImage(image, 0, 0)
+    assert (fake.ram == expected_rgb565(image)).all(), 'test_show_image_sends_frame_in_bulk(): wrong pixels'
+    assert fake.data_bytes == 96 * 64 * 2, 'test_show_image_sends_frame_in_bulk(): wrong amount of data'
+    assert fake.transfers < 10, f'test_show_image_sends_frame_in_bulk(): {fake.transfers} transfers per frame'
+
+
+def test_draw_sends_only_changed_windows():
+    fake = FakeSpiBackend()
+    board = Board()
+
+    with Display(fake) as display:
+        display.draw(board.to_image(2, None, Tile.BLACK))
+        fake.reset_counters()
+
+        image = board.to_image(3, None, Tile.BLACK)
+        display.draw(image)
+        assert (fake.ram == expected_rgb565(image)).all(), 'test_draw_sends_only_changed_windows(): wrong pixels'
+        assert fake.data_bytes < 96 * 64 * 2 // 5, f'test_draw_sends_only_changed_windows(): sent {fake.data_bytes} bytes'
+
+        fake.reset_counters()
+        display.draw(image)
+        assert fake.transfers == 0, 'test_draw_sends_only_changed_windows(): identical frame was sent'
+
+
+if __name__ == '__main__':
+    test_show_image_sends_frame_in_bulk()
+    test_draw_sends_only_changed_windows()
+    print("Display tested successful, all tests passed")
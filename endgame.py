@@ -0,0 +1,291 @@
+"""
+Exact endgame solver: perfect play from positions with few empty squares, under the same rules as
+`Board.winner` (the game ends as soon as either player has no valid move, and only the tiles on the
+board count).
+
+    python endgame.py --empties 20 --games 5          # solve seeded random positions
+    python endgame.py --empties 16 --wld              # only win / draw / loss
+
+Moves are ordered by the opponent's mobility after them ("fastest first") while many squares are
+empty, and by parity, odd regions of the board first, close to the end. Results of nodes with
+enough empties are kept in a transposition table, and every search stops at a wall-clock cap.
+"""
+
+from __future__ import annotations
+import argparse
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional
+from board import (BOARD_SIZE, ZOBRIST_BLACK, ZOBRIST_FLIP, ZOBRIST_SIDE, ZOBRIST_WHITE, Board, Tile, flipped_tiles,
+                   has_legal_move, legal_moves, popcount)
+from transposition import EXACT, LOWER_BOUND, NO_MOVE, UPPER_BOUND, TranspositionTable
+
+ENDGAME_EMPTIES = 20  # positions the solver is meant for
+TIME_CHECK_INTERVAL = 1024  # nodes searched between two deadline checks
+MOBILITY_ORDER_EMPTIES = 5  # below this, moves are only ordered by parity and not stored in the table
+ETC_MIN_EMPTIES = 8  # nodes looking up all their children in the table before searching them
+
+_MASK = 0xFFFF_FFFF_FFFF_FFFF
+_QUADRANTS = (0x0000_0000_0F0F_0F0F, 0x0000_0000_F0F0_F0F0, 0x0F0F_0F0F_0000_0000, 0xF0F0_F0F0_0000_0000)
+_CORNERS = 0x8100_0000_0000_0081
+
+
+class _SolveTimeout(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Solution:
+    move: Optional[tuple[int, int]]  # None if the game is already over
+    score: int  # final tile difference for the side to move, or only its sign when solving win / draw / loss
+    nodes: int
+    seconds: float
+
+
+class EndgameSolver:
+    """
+    Negamax alpha-beta search to the end of the game, with principal variation null windows.
+    A win / draw / loss solve uses the narrowest window around zero, which is much faster than
+    finding the exact final score.
+    """
+
+    def __init__(self, time_budget: float = 10.0, tt_memory_bytes: int = 16 * 1024 * 1024) -> None:
+        self._time_budget = time_budget
+        self._tt = TranspositionTable(tt_memory_bytes)
+        self._deadline = 0.0
+        self._nodes = 0
+
+    def solve(self, board: Board, color: Tile, exact: bool = True) -> Optional[Solution]:
+        """
+        Perfect play for `color` on `board`, or None if it was not found within the time budget.
+        """
+
+        started = time.perf_counter()
+        self._deadline = started + self._time_budget
+        self._nodes = 0
+        self._tt.new_search()
+
+        own, opp = board._masks(color)
+        moves = legal_moves(own, opp)
+        if not moves or not has_legal_move(opp, own):
+            return Solution(None, self._final(own, opp, exact), 1, time.perf_counter() - started)
+
+        alpha, beta = (-BOARD_SIZE * BOARD_SIZE, BOARD_SIZE * BOARD_SIZE) if exact else (-1, 1)
+        empties = popcount(~(own | opp) & _MASK)
+        black = color == Tile.BLACK
+        key = board.zobrist ^ (0 if black else ZOBRIST_SIDE)
+        best_move = NO_MOVE
+        try:
+            for square, child_own, child_opp, child_moves, child_key in self._children(own, opp, moves, key, black):
+                child = (child_own, child_opp, child_moves, child_key, not black, empties - 1)
+                if best_move == NO_MOVE:
+                    value = -self._search(*child, -beta, -alpha)
+                else:
+                    value = -self._search(*child, -alpha - 1, -alpha)
+                    if alpha < value < beta:
+                        value = -self._search(*child, -beta, -value)
+                if best_move == NO_MOVE or value > alpha:
+                    alpha = value
+                    best_move = square
+                if alpha >= beta:
+                    break
+        except _SolveTimeout:
+            return None
+
+        score = alpha if exact else (alpha > 0) - (alpha < 0)
+        return Solution(divmod(best_move, BOARD_SIZE), score, self._nodes, time.perf_counter() - started)
+
+    @staticmethod
+    def _final(own: int, opp: int, exact: bool) -> int:
+        difference = popcount(own) - popcount(opp)
+        return difference if exact else (difference > 0) - (difference < 0)
+
+    def _search(self, own: int, opp: int, moves: int, key: int, black: bool, empties: int,
+                alpha: int, beta: int) -> int:
+        """
+        Final tile difference for the side to move, exact if it lies between `alpha` and `beta`,
+        otherwise a bound on the same side of the window. `key` is the Zobrist hash of the position
+        with the side to move, kept up to date move by move like in `Engine`.
+        """
+
+        if empties < MOBILITY_ORDER_EMPTIES:
+            return self._search_shallow(own, opp, moves, empties, alpha, beta)
+
+        self._nodes += 1
+        if self._nodes % TIME_CHECK_INTERVAL == 0 and time.perf_counter() >= self._deadline:
+            raise _SolveTimeout()
+
+        if not moves or not has_legal_move(opp, own):
+            return popcount(own) - popcount(opp)
+
+        tt_move = NO_MOVE
+        original_alpha = alpha
+        entry = self._tt.probe(key)
+        if entry is not None:
+            tt_move = entry.move
+            if entry.flag == EXACT:
+                return entry.value
+            elif entry.flag == LOWER_BOUND:
+                alpha = max(alpha, entry.value)
+            else:
+                beta = min(beta, entry.value)
+            if alpha >= beta:
+                return entry.value
+
+        children = self._children(own, opp, moves, key, black, tt_move)
+        if empties >= ETC_MIN_EMPTIES:
+            for *_, child_key in children:
+                child = self._tt.probe(child_key)
+                if child is not None and child.flag != LOWER_BOUND and -child.value >= beta:
+                    return -child.value  # enhanced transposition cutoff: this move is already known to reach beta
+
+        best_value = -BOARD_SIZE * BOARD_SIZE - 1
+        best_move = NO_MOVE
+        for square, child_own, child_opp, child_moves, child_key in children:
+            child = (child_own, child_opp, child_moves, child_key, not black, empties - 1)
+            if best_move == NO_MOVE:
+                value = -self._search(*child, -beta, -alpha)
+            else:
+                value = -self._search(*child, -alpha - 1, -alpha)
+                if alpha < value < beta:
+                    value = -self._search(*child, -beta, -value)
+            if value > best_value:
+                best_value = value
+                best_move = square
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+
+        if best_value <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_value >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self._tt.store(key, empties, best_value, flag, best_move)
+        return best_value
+
+    def _search_shallow(self, own: int, opp: int, moves: int, empties: int, alpha: int, beta: int) -> int:
+        """
+        `_search` for the last few empties, where ordering by mobility and probing the transposition
+        table cost more than they save: moves in regions with an odd number of empties go first.
+        """
+
+        self._nodes += 1
+        if not moves or not has_legal_move(opp, own):
+            return popcount(own) - popcount(opp)
+
+        if empties == 1:  # both players can play the last square, so the game ends right after it
+            flipped = flipped_tiles(own, opp, moves)
+            return popcount(own | moves | flipped) - popcount(opp & ~flipped)
+
+        empty = ~(own | opp) & _MASK
+        odd = 0
+        for quadrant in _QUADRANTS:
+            if popcount(empty & quadrant) & 1:
+                odd |= quadrant
+
+        best_value = -BOARD_SIZE * BOARD_SIZE - 1
+        for group in (moves & odd, moves & ~odd):
+            while group:
+                bit = group & -group
+                group ^= bit
+                flipped = flipped_tiles(own, opp, bit)
+                child_own = opp & ~flipped
+                child_opp = own | bit | flipped
+                value = -self._search_shallow(child_own, child_opp, legal_moves(child_own, child_opp),
+                                              empties - 1, -beta, -alpha)
+                if value > best_value:
+                    best_value = value
+                    if value > alpha:
+                        alpha = value
+                        if alpha >= beta:
+                            return best_value
+        return best_value
+
+    @staticmethod
+    def _children(own: int, opp: int, moves: int, key: int, black: bool,
+                  first: int = NO_MOVE) -> list[tuple[int, int, int, int, int]]:
+        """
+        (square, own, opp, moves, key) of the positions after each move, seen by the opponent, best first:
+        the transposition table move, moves ending the game in a win, then the moves leaving the
+        opponent the fewest replies ("fastest first"), with corners and squares in regions with an
+        odd number of empties breaking ties. Moves ending the game in a loss go last.
+        """
+
+        empty = ~(own | opp) & _MASK
+        odd = 0
+        for quadrant in _QUADRANTS:
+            if popcount(empty & quadrant) & 1:
+                odd |= quadrant
+
+        children = []
+        while moves:
+            bit = moves & -moves
+            moves ^= bit
+            flipped = flipped_tiles(own, opp, bit)
+            child_own = opp & ~flipped
+            child_opp = own | bit | flipped
+            child_moves = legal_moves(child_own, child_opp)
+            square = bit.bit_length() - 1
+            child_key = key ^ ZOBRIST_SIDE ^ (ZOBRIST_BLACK[square] if black else ZOBRIST_WHITE[square])
+            while flipped:
+                low = flipped & -flipped
+                child_key ^= ZOBRIST_FLIP[low.bit_length() - 1]
+                flipped ^= low
+            if square == first:
+                priority = -1000
+            elif not child_moves:  # the game ends here, wins first and losses last
+                value = popcount(child_opp) - popcount(child_own)
+                priority = -500 - value if value > 0 else 500 - value
+            else:
+                replies = popcount(child_moves) + popcount(child_moves & _CORNERS)  # corner replies count twice
+                priority = 4 * replies - (2 if bit & _CORNERS else 0) - (1 if bit & odd else 0)
+            children.append((priority, square, child_own, child_opp, child_moves, child_key))
+        children.sort()
+        return [child[1:] for child in children]
+
+
+def random_position(seed: int, empties: int) -> tuple[Board, Tile]:
+    """
+    A position with `empties` empty squares reached by random play, with the side to move.
+    Games that end too early are replayed with the next seed.
+    """
+
+    rng = random.Random(seed)
+    while True:
+        board = Board()
+        turn = Tile.BLACK
+        while board.winner() == Tile.EMPTY and BOARD_SIZE * BOARD_SIZE - sum(board.scores().values()) > empties:
+            row = rng.choice(board.rows_with_valid_moves(turn))
+            col = rng.choice(board.tiles_with_valid_move(turn, row))
+            board.place(row, col, turn)
+            turn = turn.opposite()
+        if board.winner() == Tile.EMPTY:
+            return board, turn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve random endgame positions exactly.")
+    parser.add_argument("--empties", type=int, default=ENDGAME_EMPTIES, help="empty squares of the positions")
+    parser.add_argument("--games", type=int, default=1, help="number of positions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--wld", action="store_true", help="only solve for win / draw / loss")
+    parser.add_argument("--time-budget", type=float, default=60.0, help="seconds per position")
+    args = parser.parse_args()
+
+    solver = EndgameSolver(args.time_budget)
+    for index in range(args.games):
+        board, turn = random_position(args.seed + index, args.empties)
+        solution = solver.solve(board, turn, exact=not args.wld)
+        if solution is None:
+            print(f"[WARNING] Position {index} not solved within {args.time_budget}s")
+            continue
+        print(f"[INFO] Position {index}, {turn} to move: {solution.move} scores {solution.score:+d}, "
+              f"{solution.nodes} nodes in {solution.seconds:.2f}s ({solution.nodes / solution.seconds:.0f} nodes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+from board import Board, Tile, flipped_tiles, legal_moves, popcount
+from endgame import EndgameSolver, random_position
+
+
+def _minimax(own, opp):
+    moves = legal_moves(own, opp)
+    if not moves or not legal_moves(opp, own):
+        return popcount(own) - popcount(opp)
+    best = -64
+    while moves:
+        bit = moves & -moves
+        moves ^= bit
+        flipped = flipped_tiles(own, opp, bit)
+        best = max(best, -_minimax(opp & ~flipped, own | bit | flipped))
+    return best
+
+
+def test_solver_matches_minimax():
+    solver = EndgameSolver()
+    for seed in range(20):
+        board, turn = random_position(seed, 8)
+        expected = _minimax(*board._masks(turn))
+        solution = solver.solve(board, turn)
+        assert solution.score == expected, f'test_solver_matches_minimax(): seed {seed} scored {solution.score}, expected {expected}'
+        wld = solver.solve(board, turn, exact=False)
+        assert wld.score == (expected > 0) - (expected < 0), f'test_solver_matches_minimax(): seed {seed} wrong outcome'
+
+        after = Board.from_bitboards(*board._masks(Tile.BLACK))
+        after.place(*solution.move, turn)
+        own, opp = after._masks(turn)
+        assert -_minimax(opp, own) == expected, f'test_solver_matches_minimax(): seed {seed} move is not optimal'
+
+
+def test_solver_gives_up_after_time_budget():
+    board, turn = random_position(4, 20)
+    assert EndgameSolver(time_budget=0.05).solve(board, turn) is None, \
+        'test_solver_gives_up_after_time_budget(): hard position solved instantly'
+
+
+if __name__ == "__main__":
+    test_solver_matches_minimax()
+    test_solver_gives_up_after_time_budget()
+    print("endgame_test.py tested successful, all tests passed")
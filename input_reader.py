@@ -1,7 +1,21 @@
-from config import *
+from __future__ import annotations
 import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from enum import Enum
+from queue import Empty, Queue
+from threading import Lock, Timer
+from typing import Callable, Optional
+
+try:
+    from config import GPIO
+except (ImportError, RuntimeError):  # not on the Pi, only InputEvents with SimulatedGpio is usable
+    GPIO = None
 
 DEBOUNCING_PERIOD_NS = 100_000
+SETTLE_PERIOD_NS = 5_000_000  # contacts of the buttons bounce for a few milliseconds after an edge
+LOW = 0
+HIGH = 1
 
 
 class Button:
@@ -101,3 +115,264 @@ class Encoder:
     @property
     def was_just_turned_right(self) -> bool:
         return self._was_just_turned_right
+
+
+class GpioBackend(ABC):
+    """
+    Edge-triggered access to input pins. Callbacks run on the backend's own thread,
+    the equivalent of an interrupt handler, and receive the pin that changed.
+    The backend is also the clock of the inputs, so simulated pins can come with simulated time.
+    """
+
+    def now_ns(self) -> int:
+        return time.monotonic_ns()
+
+    def call_later(self, delay_ns: int, callback: Callable[[], None]) -> None:
+        timer = Timer(delay_ns / 1e9, callback)
+        timer.daemon = True
+        timer.start()
+
+    @abstractmethod
+    def read(self, pin: int) -> int:
+        pass
+
+    @abstractmethod
+    def add_edge_callback(self, pin: int, callback: Callable[[int], None]) -> None:
+        pass
+
+    @abstractmethod
+    def remove_edge_callback(self, pin: int) -> None:
+        pass
+
+
+class HardwareGpio(GpioBackend):
+    """
+    RPi.GPIO edge detection, the pins have to be set up as inputs by `config` first.
+    """
+
+    def __init__(self) -> None:
+        import RPi.GPIO
+        self._gpio = RPi.GPIO
+
+    def read(self, pin: int) -> int:
+        return self._gpio.input(pin)
+
+    def add_edge_callback(self, pin: int, callback: Callable[[int], None]) -> None:
+        self._gpio.add_event_detect(pin, self._gpio.BOTH, callback=callback)
+
+    def remove_edge_callback(self, pin: int) -> None:
+        self._gpio.remove_event_detect(pin)
+
+
+class SimulatedGpio(GpioBackend):
+    """
+    Pins held in memory for tests and benchmarks. Inputs idle HIGH like the pulled-up pins of
+    the board, and `set_level` runs the edge callbacks on the calling thread. With `virtual_time`
+    the clock only moves on `advance`, which runs the timers that became due, so tests never sleep.
+    """
+
+    def __init__(self, virtual_time: bool = False) -> None:
+        self._levels: dict[int, int] = {}
+        self._callbacks: dict[int, Callable[[int], None]] = {}
+        self._virtual_time = virtual_time
+        self._now_ns = 0
+        self._timers: list[tuple[int, Callable[[], None]]] = []
+
+    def now_ns(self) -> int:
+        return self._now_ns if self._virtual_time else super().now_ns()
+
+    def call_later(self, delay_ns: int, callback: Callable[[], None]) -> None:
+        if not self._virtual_time:
+            super().call_later(delay_ns, callback)
+            return
+        self._timers.append((self._now_ns + delay_ns, callback))
+
+    def advance(self, duration_ns: int) -> None:
+        """
+        Move the virtual clock forward, running the timers that fall due in order.
+        """
+
+        until_ns = self._now_ns + duration_ns
+        while True:
+            due = [timer for timer in self._timers if timer[0] <= until_ns]
+            if not due:
+                break
+            timer = min(due, key=lambda timer: timer[0])
+            self._timers.remove(timer)
+            self._now_ns = timer[0]
+            timer[1]()
+        self._now_ns = until_ns
+
+    def read(self, pin: int) -> int:
+        return self._levels.get(pin, HIGH)
+
+    def add_edge_callback(self, pin: int, callback: Callable[[int], None]) -> None:
+        self._callbacks[pin] = callback
+
+    def remove_edge_callback(self, pin: int) -> None:
+        self._callbacks.pop(pin, None)
+
+    def set_level(self, pin: int, level: int) -> None:
+        if self.read(pin) == level:
+            return
+        self._levels[pin] = level
+        callback = self._callbacks.get(pin)
+        if callback is not None:
+            callback(pin)
+
+    def press(self, pin: int, bounces: int = 0) -> None:
+        for _ in range(bounces):
+            self.set_level(pin, LOW)
+            self.set_level(pin, HIGH)
+        self.set_level(pin, LOW)
+
+    def release(self, pin: int, bounces: int = 0) -> None:
+        for _ in range(bounces):
+            self.set_level(pin, HIGH)
+            self.set_level(pin, LOW)
+        self.set_level(pin, HIGH)
+
+    def turn(self, first_pin: int, second_pin: int, right: bool, bounces: int = 0) -> None:
+        """
+        One detent of a quadrature encoder: the leading pin falls first and rises first.
+        """
+
+        leading, trailing = (first_pin, second_pin) if right else (second_pin, first_pin)
+        self.press(leading, bounces)
+        self.press(trailing, bounces)
+        self.release(leading, bounces)
+        self.release(trailing, bounces)
+
+
+class EventKind(Enum):
+    PRESSED = "pressed"
+    RELEASED = "released"
+    TURNED_LEFT = "turned-left"
+    TURNED_RIGHT = "turned-right"
+
+
+@dataclass(frozen=True)
+class InputEvent:
+    source: str
+    kind: EventKind
+    timestamp_ns: int
+
+
+# Quadrature steps indexed by (previous state << 2) | state, where a state is (first << 1) | second.
+# Turning right goes 11 -> 01 -> 00 -> 10 -> 11, so the first pin falls while the second is released,
+# which is what `Encoder` reports as a right turn. Bounces step back and forth and cancel out.
+_QUADRATURE_STEPS = [0] * 16
+for _states in ((0b11, 0b01), (0b01, 0b00), (0b00, 0b10), (0b10, 0b11)):
+    _QUADRATURE_STEPS[(_states[0] << 2) | _states[1]] = 1
+    _QUADRATURE_STEPS[(_states[1] << 2) | _states[0]] = -1
+_QUADRATURE_REST = 0b11
+_STEPS_PER_DETENT = 4
+
+
+class _DebouncedButton:
+    def __init__(self, name: str, pin: int, gpio: GpioBackend, events: Queue) -> None:
+        self._name = name
+        self._pin = pin
+        self._gpio = gpio
+        self._events = events
+        self._lock = Lock()
+        self._level = gpio.read(pin)
+        self._settling = False
+
+    def on_edge(self, _pin: int) -> None:
+        """
+        Reports a level change right away, then ignores the pin for the settling period while the
+        contacts bounce. The pin is read again once the period is over, so a change that happened
+        during it, like a quick release, is still reported and the level stays right.
+        """
+
+        self._sample(settled=False)
+
+    def _sample(self, settled: bool = True) -> None:
+        with self._lock:
+            if self._settling and not settled:
+                return
+            level = self._gpio.read(self._pin)
+            self._settling = level != self._level
+            if not self._settling:
+                return
+            self._level = level
+            now_ns = self._gpio.now_ns()
+        self._gpio.call_later(SETTLE_PERIOD_NS, self._sample)
+        self._events.put(InputEvent(self._name, EventKind.PRESSED if level == LOW else EventKind.RELEASED, now_ns))
+
+
+class _QuadratureDecoder:
+    def __init__(self, name: str, first_pin: int, second_pin: int, gpio: GpioBackend, events: Queue) -> None:
+        self._name = name
+        self._first_pin = first_pin
+        self._second_pin = second_pin
+        self._gpio = gpio
+        self._events = events
+        self._lock = Lock()
+        self._state = _QUADRATURE_REST
+        self._steps = 0
+
+    def on_edge(self, _pin: int) -> None:
+        with self._lock:
+            state = (self._gpio.read(self._first_pin) << 1) | self._gpio.read(self._second_pin)
+            self._steps += _QUADRATURE_STEPS[(self._state << 2) | state]
+            self._state = state
+            if state != _QUADRATURE_REST:
+                return
+            steps = self._steps
+            self._steps = 0
+        if abs(steps) >= _STEPS_PER_DETENT:
+            kind = EventKind.TURNED_RIGHT if steps > 0 else EventKind.TURNED_LEFT
+            self._events.put(InputEvent(self._name, kind, self._gpio.now_ns()))
+
+
+class InputEvents:
+    """
+    Edge-triggered replacement for polling `Button.update` and `Encoder.update` in a loop.
+    Debouncing and quadrature decoding happen in the GPIO callbacks, and the resulting events
+    are put on a queue, so a reader blocked in `get` uses no CPU time until something happens.
+    """
+
+    def __init__(self, gpio: GpioBackend) -> None:
+        self._gpio = gpio
+        self._queue: Queue[InputEvent] = Queue()
+        self._pins: list[int] = []
+
+    def add_button(self, name: str, pin: int) -> None:
+        self._register(pin, _DebouncedButton(name, pin, self._gpio, self._queue).on_edge)
+
+    def add_encoder(self, name: str, first_pin: int, second_pin: int) -> None:
+        decoder = _QuadratureDecoder(name, first_pin, second_pin, self._gpio, self._queue)
+        self._register(first_pin, decoder.on_edge)
+        self._register(second_pin, decoder.on_edge)
+
+    def _register(self, pin: int, callback: Callable[[int], None]) -> None:
+        self._gpio.add_edge_callback(pin, callback)
+        self._pins.append(pin)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[InputEvent]:
+        """
+        Block until the next event, or return None after `timeout` seconds.
+        """
+
+        try:
+            return self._queue.get(timeout=timeout)
+        except Empty:
+            return None
+
+    def clear(self) -> None:
+        """
+        Drop events that nobody was waiting for.
+        """
+
+        while True:
+            try:
+                self._queue.get_nowait()
+            except Empty:
+                return
+
+    def close(self) -> None:
+        for pin in self._pins:
+            self._gpio.remove_edge_callback(pin)
+        self._pins = []
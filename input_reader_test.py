@@ -0,0 +1,80 @@
+import time
+from threading import Thread
+from input_reader import SETTLE_PERIOD_NS, EventKind, InputEvents, SimulatedGpio
+
+BUTTON_PIN = 5
+FIRST_PIN = 17
+SECOND_PIN = 27
+
+
+def make_inputs(virtual_time: bool = False) -> tuple[SimulatedGpio, InputEvents]:
+    gpio = SimulatedGpio(virtual_time)
+    inputs = InputEvents(gpio)
+    inputs.add_button("red", BUTTON_PIN)
+    inputs.add_encoder("encoder", FIRST_PIN, SECOND_PIN)
+    return gpio, inputs
+
+
+def drain(inputs: InputEvents) -> list[EventKind]:
+    kinds = []
+    while (event := inputs.get(timeout=0)) is not None:
+        kinds.append(event.kind)
+    return kinds
+
+
+def test_button_bounces_are_debounced():
+    gpio, inputs = make_inputs(virtual_time=True)
+    gpio.press(BUTTON_PIN, bounces=3)
+    gpio.advance(SETTLE_PERIOD_NS // 2)
+    gpio.release(BUTTON_PIN)  # a late bounce
+    gpio.press(BUTTON_PIN)
+    gpio.advance(SETTLE_PERIOD_NS)
+    gpio.release(BUTTON_PIN, bounces=3)
+    gpio.advance(SETTLE_PERIOD_NS)
+    assert drain(inputs) == [EventKind.PRESSED, EventKind.RELEASED], 'test_button_bounces_are_debounced(): wrong events'
+
+
+def test_change_while_settling_is_reported():
+    gpio, inputs = make_inputs(virtual_time=True)
+    gpio.press(BUTTON_PIN)
+    gpio.advance(SETTLE_PERIOD_NS // 2)
+    gpio.release(BUTTON_PIN, bounces=2)
+    assert drain(inputs) == [EventKind.PRESSED], 'test_change_while_settling_is_reported(): bounce reported'
+
+    gpio.advance(SETTLE_PERIOD_NS)
+    event = inputs.get(timeout=0)
+    assert event is not None and event.kind == EventKind.RELEASED and event.timestamp_ns == SETTLE_PERIOD_NS, \
+        'test_change_while_settling_is_reported(): release lost'
+    gpio.advance(SETTLE_PERIOD_NS)
+    gpio.press(BUTTON_PIN)
+    assert drain(inputs) == [EventKind.PRESSED], 'test_change_while_settling_is_reported(): level is wrong'
+
+
+def test_encoder_is_decoded_in_both_directions():
+    gpio, inputs = make_inputs()
+    gpio.turn(FIRST_PIN, SECOND_PIN, right=True)
+    gpio.turn(FIRST_PIN, SECOND_PIN, right=True, bounces=2)
+    gpio.turn(FIRST_PIN, SECOND_PIN, right=False, bounces=1)
+    assert drain(inputs) == [EventKind.TURNED_RIGHT, EventKind.TURNED_RIGHT, EventKind.TURNED_LEFT], \
+        'test_encoder_is_decoded_in_both_directions(): wrong events'
+
+    gpio.press(FIRST_PIN)
+    gpio.release(FIRST_PIN)
+    assert drain(inputs) == [], 'test_encoder_is_decoded_in_both_directions(): partial turn reported'
+
+
+def test_get_blocks_until_an_event_arrives():
+    gpio, inputs = make_inputs()
+    assert inputs.get(timeout=0.01) is None, 'test_get_blocks_until_an_event_arrives(): expected a timeout'
+
+    Thread(target=lambda: (time.sleep(0.05), gpio.press(BUTTON_PIN)), daemon=True).start()
+    event = inputs.get(timeout=1.0)
+    assert event is not None and event.source == "red", 'test_get_blocks_until_an_event_arrives(): event not delivered'
+
+
+if __name__ == '__main__':
+    test_button_bounces_are_debounced()
+    test_change_while_settling_is_reported()
+    test_encoder_is_decoded_in_both_directions()
+    test_get_blocks_until_an_event_arrives()
+    print("Input reader tested successful, all tests passed")
@@ -1,2 +1,3 @@
 sudo systemctl stop ip-oled.service
-sudo pip install -r ./requirements.txt
\ No newline at end of file
+sudo pip install -r ./requirements.txt
+python3 ./assets.py
\ No newline at end of file
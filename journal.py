@@ -0,0 +1,362 @@
+"""
+Append-only binary journal of every game played on the server, used to recover the games
+in progress after a crash and to replay finished ones.
+
+    python journal.py games.journal           # summary of the journal
+    python journal.py games.journal 42        # moves of game 42
+
+The file starts with a header followed by records, each protected by a CRC32, so a record torn
+by a crash is detected and cut off when the journal is opened again. Every record is handed to the
+OS as soon as it is appended, which is enough to survive the server process crashing, while the
+fsyncs that protect against power loss are batched: by record count, or by a background thread
+once `SYNC_INTERVAL` has passed.
+
+Each record points back to the previous record of its game, and every `CHECKPOINT_EVERY` records
+a checkpoint lists the games still open, with the header pointing to the latest one. Recovery
+therefore reads the checkpoint, the records after it and the chains of the open games, however
+long the journal has grown.
+"""
+
+from __future__ import annotations
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from dataclasses import dataclass, field
+from threading import Event, Lock, Thread
+from typing import Optional
+from board import BOARD_SIZE, Board, Tile
+
+JOURNAL_PATH = "./games.journal"
+MAGIC = b"OTHJ"
+VERSION = 1
+HEADER = struct.Struct("!4sHQ")  # magic, version, offset of the latest checkpoint or 0
+CHECKPOINT_FIELD = 6  # position of the checkpoint offset in the header
+RECORD = struct.Struct("!IBIdQH")  # CRC32 of the rest, kind, game id, timestamp, previous record of the game, length
+MOVE = struct.Struct("!BB")  # square, colour
+OPEN_GAME = struct.Struct("!IQ")  # game id, offset of its latest record
+
+GAME_STARTED = 1  # payload: black uid, white uid and their protocol versions
+MOVE_PLAYED = 2  # payload: MOVE
+GAME_FINISHED = 3  # payload: the winner's tile value
+CHECKPOINT = 4  # game id field: next game id, payload: OPEN_GAME for every game in progress
+
+SYNC_INTERVAL = 0.05  # seconds a written record may wait for its fsync
+SYNC_EVERY = 64  # records written before an fsync is forced
+CHECKPOINT_EVERY = 4096  # records written between checkpoints
+
+_COLORS = {Tile.BLACK: 1, Tile.WHITE: 2}
+_COLOR_TILES = {code: tile for tile, code in _COLORS.items()}
+
+
+@dataclass
+class GameRecord:
+    game_id: int
+    players: dict[Tile, str]
+    protocols: dict[str, int]
+    started: float
+    moves: list[tuple[int, int, Tile, float]] = field(default_factory=list)  # row, col, colour, timestamp
+    winner: Optional[Tile] = None
+    finished: Optional[float] = None
+
+    @property
+    def in_progress(self) -> bool:
+        return self.winner is None
+
+    @property
+    def turn(self) -> Tile:
+        return self.moves[-1][2].opposite() if self.moves else Tile.BLACK
+
+    def board_at(self, ply: Optional[int] = None) -> Board:
+        """
+        The position after the first `ply` moves, or after all of them.
+        """
+
+        board = Board()
+        for row, col, color, _ in self.moves[:ply]:
+            board.place(row, col, color)
+        return board
+
+
+def _encode_players(players: dict[Tile, str], protocols: dict[str, int]) -> bytes:
+    fields = []
+    for color in (Tile.BLACK, Tile.WHITE):
+        uid = players[color]
+        fields += [uid, str(protocols.get(uid, 0))]
+    return "\0".join(fields).encode("utf-8")
+
+
+def _decode_players(payload: bytes) -> tuple[dict[Tile, str], dict[str, int]]:
+    black, black_protocol, white, white_protocol = payload.decode("utf-8").split("\0")
+    protocols = {uid: int(protocol) for uid, protocol in ((black, black_protocol), (white, white_protocol))
+                 if int(protocol)}
+    return {Tile.BLACK: black, Tile.WHITE: white}, protocols
+
+
+class JournalReader:
+    """
+    Read-only view of a journal file mapped into memory. Opening it finds the valid end of the file
+    and the games in progress from the latest checkpoint; the full index of games is only built when
+    a finished game is looked up.
+    """
+
+    def __init__(self, path: str = JOURNAL_PATH) -> None:
+        self._path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._view = memoryview(self._data)
+        self._index: Optional[dict[int, int]] = None  # game id -> offset of its latest record
+
+        self.valid_length = 0
+        self.next_game_id = 1
+        self.open_games: dict[int, int] = {}  # game id -> offset of its latest record
+        if size >= HEADER.size:
+            magic, version, checkpoint = HEADER.unpack_from(self._data, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Unsupported journal: {path}")
+            self._recover(checkpoint)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._view.release()
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def _record_at(self, offset: int) -> Optional[tuple[int, int, float, int, int]]:
+        """
+        Header fields of the record at `offset` and the offset right after it, or None if it is torn.
+        """
+
+        if offset + RECORD.size > len(self._data):
+            return None
+        crc, kind, game_id, timestamp, previous, length = RECORD.unpack_from(self._data, offset)
+        end = offset + RECORD.size + length
+        if end > len(self._data) or zlib.crc32(self._view[offset + 4:end]) != crc:
+            return None
+        return kind, game_id, timestamp, previous, end
+
+    def _payload(self, offset: int, end: int) -> bytes:
+        return self._data[offset + RECORD.size:end]
+
+    def _recover(self, checkpoint: int) -> None:
+        offset = HEADER.size
+        record = self._record_at(checkpoint) if checkpoint else None
+        if record is not None and record[0] == CHECKPOINT:
+            _, self.next_game_id, _, _, offset = record
+            payload = self._payload(checkpoint, offset)
+            self.open_games = dict(OPEN_GAME.iter_unpack(payload))
+        self.valid_length = self._scan(offset, self.open_games, closed_too=False)
+
+    def _scan(self, offset: int, games: dict[int, int], closed_too: bool) -> int:
+        """
+        Follow the records from `offset` to the valid end of the file, tracking the latest record
+        of every game in `games`. Returns the valid end.
+        """
+
+        while (record := self._record_at(offset)) is not None:
+            kind, game_id, _, _, end = record
+            if kind == GAME_STARTED or kind == MOVE_PLAYED:
+                games[game_id] = offset
+                self.next_game_id = max(self.next_game_id, game_id + 1)
+            elif kind == GAME_FINISHED:
+                if closed_too:
+                    games[game_id] = offset
+                else:
+                    games.pop(game_id, None)
+            offset = end
+        return offset
+
+    def game(self, game_id: int) -> GameRecord:
+        """
+        Rebuild a single game by following its records backwards.
+        """
+
+        offset = self.open_games.get(game_id)
+        if offset is None:
+            if self._index is None:
+                self._index = {}
+                self._scan(HEADER.size, self._index, closed_too=True)
+            offset = self._index[game_id]
+
+        records = []
+        while offset:
+            kind, _, timestamp, previous, end = self._record_at(offset)
+            records.append((kind, timestamp, self._payload(offset, end)))
+            offset = previous
+
+        game = None
+        for kind, timestamp, payload in reversed(records):
+            if kind == GAME_STARTED:
+                players, protocols = _decode_players(payload)
+                game = GameRecord(game_id, players, protocols, timestamp)
+            elif kind == MOVE_PLAYED:
+                square, color = MOVE.unpack(payload)
+                row, col = divmod(square, BOARD_SIZE)
+                game.moves.append((row, col, _COLOR_TILES[color], timestamp))
+            elif kind == GAME_FINISHED:
+                game.winner = Tile(payload.decode("utf-8"))
+                game.finished = timestamp
+        return game
+
+    def game_ids(self) -> list[int]:
+        if self._index is None:
+            self._index = {}
+            self._scan(HEADER.size, self._index, closed_too=True)
+        return sorted(self._index)
+
+    def in_progress(self) -> list[GameRecord]:
+        return [self.game(game_id) for game_id in sorted(self.open_games)]
+
+
+class JournalGame:
+    """
+    Handle used by `server.game_loop` to record the events of a single game.
+    """
+
+    def __init__(self, journal: Journal, game_id: int) -> None:
+        self._journal = journal
+        self.game_id = game_id
+
+    def move(self, row: int, col: int, color: Tile) -> None:
+        self._journal.append(MOVE_PLAYED, self.game_id, MOVE.pack(row * BOARD_SIZE + col, _COLORS[color]))
+
+    def finish(self, winner: Tile) -> None:
+        self._journal.append(GAME_FINISHED, self.game_id, winner.value.encode("utf-8"))
+        self._journal.sync()
+
+
+class Journal:
+    """
+    Writer side of the journal. Opening an existing journal recovers it with JournalReader,
+    cuts off a torn tail and continues appending after it. `recovered` lists the games that were
+    in progress, ready to be resumed.
+    """
+
+    def __init__(self, path: str = JOURNAL_PATH, sync_interval: float = SYNC_INTERVAL,
+                 sync_every: int = SYNC_EVERY, checkpoint_every: int = CHECKPOINT_EVERY) -> None:
+        if not os.path.exists(path):
+            open(path, "wb").close()
+        with JournalReader(path) as reader:
+            self.recovered = reader.in_progress()
+            valid_length = reader.valid_length
+            self._next_game_id = reader.next_game_id
+            self._open_games = dict(reader.open_games)
+
+        self._file = open(path, "r+b")
+        if valid_length == 0:
+            self._file.truncate(0)
+            self._file.write(HEADER.pack(MAGIC, VERSION, 0))
+            self._file.flush()
+            valid_length = HEADER.size
+        else:
+            self._file.truncate(valid_length)
+            self._file.seek(valid_length)
+        self._offset = valid_length
+
+        self._sync_every = sync_every
+        self._checkpoint_every = checkpoint_every
+        self._unsynced = 0
+        self._since_checkpoint = 0
+        self._lock = Lock()
+        self._closed = Event()
+        self._syncer = Thread(target=self._sync_periodically, args=(sync_interval,), daemon=True)
+        self._syncer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def start_game(self, players: dict[Tile, str], protocols: Optional[dict[str, int]] = None) -> JournalGame:
+        with self._lock:
+            game_id = self._next_game_id
+            self._next_game_id += 1
+        self.append(GAME_STARTED, game_id, _encode_players(players, protocols or {}))
+        return JournalGame(self, game_id)
+
+    def resume(self, game_id: int) -> JournalGame:
+        return JournalGame(self, game_id)
+
+    def append(self, kind: int, game_id: int, payload: bytes) -> None:
+        with self._lock:
+            self._append_locked(kind, game_id, payload)
+            if kind == GAME_FINISHED:
+                self._open_games.pop(game_id, None)
+            self._since_checkpoint += 1
+            if self._since_checkpoint >= self._checkpoint_every:
+                self._checkpoint_locked()
+            elif self._unsynced >= self._sync_every:
+                self._sync_locked()
+
+    def _append_locked(self, kind: int, game_id: int, payload: bytes) -> None:
+        previous = self._open_games.get(game_id, 0) if kind != CHECKPOINT else 0
+        body = RECORD.pack(0, kind, game_id, time.time(), previous, len(payload))[4:] + payload
+        self._file.write(struct.pack("!I", zlib.crc32(body)) + body)
+        self._file.flush()
+        if kind != CHECKPOINT:
+            self._open_games[game_id] = self._offset
+        self._offset += 4 + len(body)
+        self._unsynced += 1
+
+    def _checkpoint_locked(self) -> None:
+        """
+        Write the open games, and point the header at them once they are safely on disk.
+        """
+
+        offset = self._offset
+        payload = b"".join(OPEN_GAME.pack(game_id, last) for game_id, last in sorted(self._open_games.items()))
+        self._append_locked(CHECKPOINT, self._next_game_id, payload)
+        self._sync_locked()
+        os.pwrite(self._file.fileno(), struct.pack("!Q", offset), CHECKPOINT_FIELD)
+        os.fsync(self._file.fileno())
+        self._since_checkpoint = 0
+
+    def sync(self) -> None:
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self) -> None:
+        if self._unsynced == 0:
+            return
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def _sync_periodically(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            self.sync()
+
+    def close(self) -> None:
+        self._closed.set()
+        self._syncer.join()
+        with self._lock:
+            self._checkpoint_locked()
+        self._file.close()
+
+
+def main():
+    with JournalReader(sys.argv[1] if len(sys.argv) > 1 else JOURNAL_PATH) as reader:
+        if len(sys.argv) > 2:
+            game = reader.game(int(sys.argv[2]))
+            print(f"[INFO] Game {game.game_id}: {game.players[Tile.BLACK]} vs {game.players[Tile.WHITE]}")
+            for ply, (row, col, color, timestamp) in enumerate(game.moves, 1):
+                print(f"[INFO] {ply:2}. {color} {row},{col} at {time.ctime(timestamp)}")
+            print(f"[INFO] Winner: {game.winner}" if game.winner is not None else "[INFO] Game in progress")
+            print(game.board_at().serialize())
+            return
+
+        print(f"[INFO] {len(reader.game_ids())} games, {len(reader.open_games)} in progress, "
+              f"{reader.valid_length} valid bytes")
+
+
+if __name__ == "__main__":
+    main()
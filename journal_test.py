@@ -0,0 +1,105 @@
+import os
+import pathlib
+import tempfile
+from board import Tile
+from journal import Journal, JournalReader
+from netcode import Message, SERVER_UID
+from server import RoomManager
+from server_test import RecordingChannel, wait_until
+
+PLAYERS = {Tile.BLACK: "a", Tile.WHITE: "b"}
+
+
+def test_journal_replays_games_and_cuts_torn_tail(tmp_path):
+    path = str(tmp_path / "games.journal")
+    with Journal(path) as journal:
+        finished = journal.start_game(PLAYERS, {"a": 3})
+        finished.move(2, 3, Tile.BLACK)
+        finished.finish(Tile.BLACK)
+        running = journal.start_game(PLAYERS)
+        running.move(2, 3, Tile.BLACK)
+        running.move(2, 2, Tile.WHITE)
+
+    with open(path, "ab") as file:
+        file.write(b"\x00\x01\x02")  # record torn by a crash
+    with JournalReader(path) as reader:
+        assert reader.valid_length == os.path.getsize(path) - 3, \
+            'test_journal_replays_games_and_cuts_torn_tail(): torn tail kept'
+        game = reader.game(1)
+        assert game.winner == Tile.BLACK and game.protocols == {"a": 3}, \
+            'test_journal_replays_games_and_cuts_torn_tail(): finished game changed'
+        (game,) = reader.in_progress()
+        assert game.game_id == 2 and game.turn == Tile.BLACK, 'test_journal_replays_games_and_cuts_torn_tail(): wrong game'
+        assert game.board_at(1).scores() == {Tile.BLACK: 4, Tile.WHITE: 1}, \
+            'test_journal_replays_games_and_cuts_torn_tail(): seek into the game failed'
+
+    with Journal(path) as journal:
+        assert journal.start_game(PLAYERS).game_id == 3, 'test_journal_replays_games_and_cuts_torn_tail(): id reused'
+    with JournalReader(path) as reader:
+        assert reader.game_ids() == [1, 2, 3], 'test_journal_replays_games_and_cuts_torn_tail(): append after tail lost'
+
+
+def test_recovery_starts_from_the_latest_checkpoint(tmp_path):
+    path = str(tmp_path / "games.journal")
+    with Journal(path, checkpoint_every=16) as journal:
+        records = [journal.start_game({Tile.BLACK: f"p{i}", Tile.WHITE: f"q{i}"}) for i in range(20)]
+        for i, record in enumerate(records):
+            record.move(2, 3, Tile.BLACK)
+            if i % 5:
+                record.finish(Tile.WHITE)
+        journal.start_game(PLAYERS)
+
+    with Journal(path) as journal:
+        assert [game.game_id for game in journal.recovered] == [1, 6, 11, 16, 21], \
+            'test_recovery_starts_from_the_latest_checkpoint(): wrong games in progress'
+        assert [len(game.moves) for game in journal.recovered] == [1, 1, 1, 1, 0], \
+            'test_recovery_starts_from_the_latest_checkpoint(): moves lost'
+
+
+def test_server_recovers_games_in_progress(tmp_path):
+    path = str(tmp_path / "games.journal")
+    with Journal(path) as journal:
+        game = journal.start_game(PLAYERS, {"a": 3, "b": 3})
+        game.move(2, 3, Tile.BLACK)
+
+    channel = RecordingChannel()
+    with Journal(path) as journal:
+        manager = RoomManager(channel, journal=journal)
+        manager.recover()
+        assert manager.active_rooms == 1, 'test_server_recovers_games_in_progress(): room not reopened'
+        assert not wait_until(lambda: channel.sent, 0.1), 'test_server_recovers_games_in_progress(): did not wait'
+
+        manager.dispatch(Message("a", SERVER_UID, "connected", "1,2,3"))
+        manager.dispatch(Message("b", SERVER_UID, "connected", "1,2,3"))
+        assert wait_until(lambda: channel.sent_to("b") == ["protocol", "board-bin", "your-turn"]), \
+            'test_server_recovers_games_in_progress(): game did not continue with white'
+        assert ("b", "your-turn", "W,1") in channel.sent, 'test_server_recovers_games_in_progress(): wrong sequence'
+
+        manager.dispatch(Message("b", SERVER_UID, "disconnected", ""))
+        assert wait_until(lambda: manager.active_rooms == 0), 'test_server_recovers_games_in_progress(): game not over'
+    with JournalReader(path) as reader:
+        assert reader.game(1).winner == Tile.BLACK, 'test_server_recovers_games_in_progress(): outcome lost'
+
+
+def test_recovered_player_not_rejoining_loses(tmp_path):
+    path = str(tmp_path / "games.journal")
+    with Journal(path) as journal:
+        journal.start_game(PLAYERS)
+
+    channel = RecordingChannel()
+    with Journal(path) as journal:
+        manager = RoomManager(channel, journal=journal, rejoin_timeout=0.1)
+        manager.recover()
+        manager.dispatch(Message("b", SERVER_UID, "connected", ""))
+        assert wait_until(lambda: manager.active_rooms == 0), 'test_recovered_player_not_rejoining_loses(): room kept'
+        assert channel.sent_to("b") == ["winner"], 'test_recovered_player_not_rejoining_loses(): game continued'
+    with JournalReader(path) as reader:
+        assert reader.game(1).winner == Tile.WHITE, 'test_recovered_player_not_rejoining_loses(): wrong winner'
+
+
+if __name__ == '__main__':
+    for test in (test_journal_replays_games_and_cuts_torn_tail, test_recovery_starts_from_the_latest_checkpoint,
+                 test_server_recovers_games_in_progress, test_recovered_player_not_rejoining_loses):
+        with tempfile.TemporaryDirectory() as directory:
+            test(pathlib.Path(directory))
+    print("Journal tested successful, all tests passed")
@@ -1,8 +1,6 @@
 #!/usr/bin/env python3
 # -*- coding:utf-8 -*-
-import RPi.GPIO as GPIO
-from . import config
-import time
+from .backend import HardwareBackend
 import numpy as np
 
 DRAW_LINE = 0x21
@@ -54,26 +52,26 @@ OLED_HEIGHT = 64
 
 
 class SSD1331(object):
-    def __init__(self):
+    def __init__(self, backend=None):
         self.width = OLED_WIDTH
         self.height = OLED_HEIGHT
-        # Initialize DC RST pin
-        self._dc = config.DC_PIN
-        self._rst = config.RST_PIN
-        self._bl = config.BL_PIN
+        # SPI transport, the real panel unless a fake one is passed in
+        self._backend = backend if backend is not None else HardwareBackend()
+        # Preallocated RGB565 frame, two bytes per pixel, high byte first
+        self._frame = np.empty((self.height, self.width, 2), dtype=np.uint8)
+        self._clear_frame = np.full((self.height, self.width, 2), 0xFF, dtype=np.uint8)
 
     """    Write register address and data     """
 
     def command(self, cmd):
-        GPIO.output(self._dc, GPIO.LOW)  # pylint: disable=no-member
-        config.spi_writebyte([cmd])
+        self._backend.command(cmd)
 
     # def data(self, val):
         # GPIO.output(self._dc, GPIO.HIGH)
         # config.spi_writebyte([val])
 
     def Init(self):
-        if (config.module_init() != 0):
+        if (self._backend.init() != 0):
             return -1
         """Initialize dispaly"""
         self.reset()
@@ -124,20 +122,16 @@ class SSD1331(object):
 
     def reset(self):
         """Reset the display"""
-        GPIO.output(self._rst, GPIO.HIGH)  # pylint: disable=no-member
-        time.sleep(0.1)
-        GPIO.output(self._rst, GPIO.LOW)  # pylint: disable=no-member
-        time.sleep(0.1)
-        GPIO.output(self._rst, GPIO.HIGH)  # pylint: disable=no-member
-        time.sleep(0.1)
+        self._backend.reset()
 
     def SetWindows(self, Xstart, Ystart, Xend, Yend):
+        """Address the window [Xstart, Xend) x [Ystart, Yend) for the following pixel data."""
         self.command(SET_COLUMN_ADDRESS)
-        self.command(0)  # cloumn start address
-        self.command(OLED_WIDTH - 1)  # cloumn end address
+        self.command(Xstart)  # column start address
+        self.command(Xend - 1)  # column end address
         self.command(SET_ROW_ADDRESS)
-        self.command(0)  # page atart address
-        self.command(OLED_HEIGHT - 1)  # page end address
+        self.command(Ystart)  # row start address
+        self.command(Yend - 1)  # row end address
 
     def ShowImage(self, Image, Xstart, Ystart):
         """Set buffer to value of Python Imaging Library image."""
@@ -146,23 +140,30 @@ class SSD1331(object):
         if imwidth != self.width or imheight != self.height:
             raise ValueError('Image must be same dimensions as display \
                 ({0}x{1}).' .format(self.width, self.height))
+        self.ShowFrame(self.ToRGB565(Image))
+
+    def ToRGB565(self, Image):
+        """Convert an RGB image into the preallocated RGB565 frame and return it."""
         img = np.asarray(Image)
-        pix = np.zeros((self.height, self.width, 2), dtype=np.uint8)
-        pix[..., [0]] = np.add(np.bitwise_and(
-            img[..., [0]], 0xF8), np.right_shift(img[..., [1]], 5))
-        pix[..., [1]] = np.add(np.bitwise_and(np.left_shift(
-            img[..., [1]], 3), 0xE0), np.right_shift(img[..., [2]], 3))
-        pix = pix.flatten().tolist()
+        high = self._frame[..., 0]
+        low = self._frame[..., 1]
+        np.bitwise_and(img[..., 0], 0xF8, out=high)
+        np.bitwise_or(high, np.right_shift(img[..., 1], 5), out=high)
+        np.left_shift(img[..., 1], 3, out=low)
+        np.bitwise_and(low, 0xE0, out=low)
+        np.bitwise_or(low, np.right_shift(img[..., 2], 3), out=low)
+        return self._frame
+
+    def ShowFrame(self, frame):
+        """Send a full (height, width, 2) RGB565 frame in bulk transfers."""
         self.SetWindows(0, 0, self.width, self.height)
-        GPIO.output(self._dc, GPIO.HIGH)  # pylint: disable=no-member
-        for i in range(0, len(pix), 1):
-            config.spi_writebyte(pix[i:i+1])
+        self._backend.data(frame)
+
+    def ShowWindow(self, frame, Xstart, Ystart, Xend, Yend):
+        """Send only the [Xstart, Xend) x [Ystart, Yend) part of a full RGB565 frame."""
+        self.SetWindows(Xstart, Ystart, Xend, Yend)
+        self._backend.data(np.ascontiguousarray(frame[Ystart:Yend, Xstart:Xend]))
 
     def clear(self):
         """Clear contents of image buffer"""
-        _buffer = [0xff]*(self.width * self.height * 2)
-        self.SetWindows(0, 0, self.width, self.height)
-        GPIO.output(self._dc, GPIO.HIGH)  # pylint: disable=no-member
-        for i in range(0, len(_buffer), 1):
-            config.spi_writebyte(_buffer[i:i+1])
-            # print "%d",_buffer[i:i+4096]
+        self.ShowFrame(self._clear_frame)
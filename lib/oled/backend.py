@@ -0,0 +1,150 @@
+# -*- coding:utf-8 -*-
+from abc import ABC, abstractmethod
+import numpy as np
+
+DEFAULT_CHUNK_SIZE = 4096  # spidev's default `bufsiz`
+SPIDEV_BUFSIZ_PATH = "/sys/module/spidev/parameters/bufsiz"
+
+
+class SpiBackend(ABC):
+    """
+    Transport used by SSD1331 to talk to the panel: command bytes are sent with the
+    D/C line low, pixel data with the D/C line high.
+    """
+
+    def init(self):
+        return 0
+
+    def reset(self):
+        pass
+
+    @abstractmethod
+    def command(self, cmd):
+        pass
+
+    @abstractmethod
+    def data(self, buffer):
+        """Send a whole buffer (bytes, bytearray, memoryview or uint8 ndarray) as pixel data."""
+
+
+def _read_spidev_bufsiz():
+    try:
+        with open(SPIDEV_BUFSIZ_PATH) as file:
+            return int(file.read().strip())
+    except (OSError, ValueError):
+        return DEFAULT_CHUNK_SIZE
+
+
+class HardwareBackend(SpiBackend):
+    """
+    The real panel on the Raspberry Pi. Hardware modules are imported here rather than at the top
+    of the package, so the driver can be used with FakeSpiBackend on machines without them.
+    """
+
+    def __init__(self):
+        import RPi.GPIO as GPIO
+        from . import config
+        self._gpio = GPIO
+        self._config = config
+        self._dc = config.DC_PIN
+        self._rst = config.RST_PIN
+        self.chunk_size = _read_spidev_bufsiz()
+
+    def init(self):
+        return self._config.module_init()
+
+    def reset(self):
+        self._config.digital_write(self._rst, self._gpio.HIGH)
+        self._config.delay_ms(100)
+        self._config.digital_write(self._rst, self._gpio.LOW)
+        self._config.delay_ms(100)
+        self._config.digital_write(self._rst, self._gpio.HIGH)
+        self._config.delay_ms(100)
+
+    def command(self, cmd):
+        self._gpio.output(self._dc, self._gpio.LOW)  # pylint: disable=no-member
+        self._config.spi_writebyte([cmd])
+
+    def data(self, buffer):
+        self._gpio.output(self._dc, self._gpio.HIGH)  # pylint: disable=no-member
+        view = memoryview(buffer).cast("B")
+        for start in range(0, len(view), self.chunk_size):
+            self._config.spi_writebytes(view[start:start + self.chunk_size])
+
+
+class FakeSpiBackend(SpiBackend):
+    """
+    In-memory stand-in for the panel, used by tests and benchmarks. It emulates the
+    controller's address window and RGB565 frame memory and counts the bus traffic.
+    """
+
+    # Number of argument bytes following the commands SSD1331 sends
+    ARGUMENT_COUNTS = {
+        0x15: 2, 0x75: 2, 0x81: 1, 0x82: 1, 0x83: 1, 0x87: 1, 0x8A: 1, 0x8B: 1, 0x8C: 1,
+        0xA0: 1, 0xA1: 1, 0xA2: 1, 0xA8: 1, 0xAD: 1, 0xB0: 1, 0xB1: 1, 0xB3: 1, 0xBB: 1, 0xBE: 1,
+    }
+
+    def __init__(self, width=96, height=64):
+        self.width = width
+        self.height = height
+        self.ram = np.zeros((height, width, 2), dtype=np.uint8)
+        self.commands = []
+        self.command_bytes = 0
+        self.data_bytes = 0
+        self.transfers = 0
+        self._pending = []  # current command and the arguments received so far
+        self._window = (0, width - 1, 0, height - 1)
+        self._position = 0  # pixels written into the current window
+        self._half_pixel = None
+
+    def command(self, cmd):
+        self.command_bytes += 1
+        self.transfers += 1
+        if not self._pending:
+            self.commands.append(cmd)
+            if self.ARGUMENT_COUNTS.get(cmd, 0) == 0:
+                return
+        self._pending.append(cmd)
+        if len(self._pending) - 1 < self.ARGUMENT_COUNTS[self._pending[0]]:
+            return
+
+        opcode, *arguments = self._pending
+        self._pending = []
+        column_start, column_end, row_start, row_end = self._window
+        if opcode == 0x15:
+            column_start, column_end = arguments
+        elif opcode == 0x75:
+            row_start, row_end = arguments
+        else:
+            return
+        self._window = (column_start, column_end, row_start, row_end)
+        self._position = 0
+        self._half_pixel = None
+
+    def data(self, buffer):
+        raw = np.frombuffer(memoryview(buffer).cast("B"), dtype=np.uint8)
+        self.data_bytes += len(raw)
+        self.transfers += 1
+        if self._half_pixel is not None:
+            raw = np.concatenate(([self._half_pixel], raw))
+            self._half_pixel = None
+        if len(raw) % 2:
+            self._half_pixel = raw[-1]
+            raw = raw[:-1]
+        if len(raw) == 0:
+            return
+
+        column_start, column_end, row_start, row_end = self._window
+        columns = column_end - column_start + 1
+        pixels = columns * (row_end - row_start + 1)
+        indices = (self._position + np.arange(len(raw) // 2)) % pixels
+        rows = row_start + indices // columns
+        cols = column_start + indices % columns
+        self.ram[rows, cols] = raw.reshape(-1, 2)
+        self._position = (self._position + len(raw) // 2) % pixels
+
+    def reset_counters(self):
+        self.commands = []
+        self.command_bytes = 0
+        self.data_bytes = 0
+        self.transfers = 0
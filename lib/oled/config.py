@@ -63,6 +63,11 @@ def spi_writebyte(data):
     spi.writebytes([data[0]])
 
 
+def spi_writebytes(data):
+    # Bulk transfer of any buffer object, at most `bufsiz` bytes per call
+    spi.writebytes2(data)
+
+
 def module_init():
     # print("module_init")
     GPIO.setmode(GPIO.BCM)
@@ -0,0 +1,115 @@
+"""
+Load generator playing many headless bots against a server, used to size the server before an event.
+
+    python loadgen.py --bots 200 --duration 30             # in-process server over the loopback broker
+    python loadgen.py --bots 200 --broker 192.168.1.10     # a real server through its MQTT broker
+
+Pairs of bots keep playing random games until the duration is over, then the completed games
+per minute, the time from a `place` to the next board update and the message rates are reported.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import statistics
+import time
+from threading import Event, Thread
+from typing import Optional
+import log
+from bot import Bot, BotChannel
+from netcode import LoopbackBroker, LoopbackTransport, ServerChannel
+from server import RoomManager
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_load(bots: int, duration: float, broker_address: Optional[str] = None, protocols: tuple[int, ...] = (3,),
+             think_time: float = 0.0, seed: int = 0) -> dict:
+    """
+    Without `broker_address`, the server runs in this process and everything goes through a LoopbackBroker.
+    """
+
+    broker = LoopbackBroker() if broker_address is None else None
+
+    def transport():
+        return LoopbackTransport(broker) if broker is not None else None
+
+    stop = Event()
+    channels = [BotChannel(broker_address or "loopback", f"bot-{seed}-{i}", transport(), protocols) for i in range(bots)]
+    players = [Bot(channel, seed + i, think_time, stop) for i, channel in enumerate(channels)]
+
+    level = log.get_level()
+    log.set_level(log.WARNING)  # a line per turn and connection would swamp the output
+    try:
+        server = None
+        if broker is not None:
+            server = ServerChannel(transport()).__enter__()
+            manager = Thread(target=RoomManager(server).run, daemon=True)
+            manager.start()
+
+        threads = []
+        started = time.perf_counter()
+        for channel, player in zip(channels, players):
+            channel.__enter__()
+            thread = Thread(target=player.play, daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        time.sleep(duration)
+        stop.set()
+        elapsed = time.perf_counter() - started
+        for thread in threads:
+            thread.join()
+        for channel in channels:
+            channel.__exit__()
+        if server is not None:
+            server.__exit__()
+            manager.join()
+    finally:
+        log.set_level(level)
+
+    latencies = [latency for player in players for latency in player.turn_latencies]
+    games = sum(player.games for player in players) / 2
+    messages = sum(channel.sent + channel.received for channel in channels)
+    return {
+        "bots": bots,
+        "seconds": elapsed,
+        "games": games,
+        "games_per_minute": games / elapsed * 60,
+        "turns": len(latencies),
+        "turn_latency_p50_ms": percentile(latencies, 0.5) * 1e3,
+        "turn_latency_p95_ms": percentile(latencies, 0.95) * 1e3,
+        "turn_latency_p99_ms": percentile(latencies, 0.99) * 1e3,
+        "turn_latency_mean_ms": statistics.fmean(latencies) * 1e3 if latencies else 0.0,
+        "bot_messages_per_second": messages / elapsed,
+        "broker_deliveries_per_second": broker.delivered / elapsed if broker is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many bots against a server and report its throughput.")
+    parser.add_argument("--bots", type=int, default=100, help="number of bots, two per game")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to keep starting games")
+    parser.add_argument("--broker", default=None, help="MQTT broker of a running server, in-process server if omitted")
+    parser.add_argument("--protocols", default="3", help="comma-separated protocol versions offered by the bots")
+    parser.add_argument("--think-time", type=float, default=0.0, help="seconds each bot waits before moving")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    summary = run_load(args.bots, args.duration, args.broker, tuple(int(p) for p in args.protocols.split(",")),
+                       args.think_time, args.seed)
+    print(f"[INFO] {summary['games']:.0f} games in {summary['seconds']:.1f}s "
+          f"({summary['games_per_minute']:.0f} games/min) with {summary['bots']} bots")
+    print(f"[INFO] Turn latency p50 {summary['turn_latency_p50_ms']:.2f} ms, "
+          f"p95 {summary['turn_latency_p95_ms']:.2f} ms, p99 {summary['turn_latency_p99_ms']:.2f} ms")
+    print(f"[INFO] {summary['bot_messages_per_second']:.0f} messages/s sent and received by the bots")
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
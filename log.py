@@ -0,0 +1,134 @@
+"""
+Leveled logging written by a background thread, so a slow stdout (an SSH terminal, a journald pipe)
+never stalls the threads that log, like the MQTT network thread delivering messages.
+
+    import log
+    log.info("Starting {}'s turn!", turn)
+    log.warning("Dropping invalid topic", topic=topic)
+    if log.DEBUG_ENABLED:
+        log.debug("{}", message)
+
+Lines keep the "[LEVEL] message" form. Messages are `str.format` templates formatted on the writer
+thread, keyword fields are appended as key=value. The level comes from the OTHELLO_LOG_LEVEL
+environment variable (INFO by default) or `set_level`. Debug calls on hot paths are guarded by
+`DEBUG_ENABLED`, so that while debugging is off not even their arguments are evaluated.
+When the writer falls `MAX_PENDING` lines behind, new lines are dropped and counted instead.
+"""
+
+from __future__ import annotations
+import atexit
+import os
+import sys
+from queue import Empty, Full, Queue
+from threading import Lock, Thread
+from typing import Any
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+_LEVELS = {name: level for level, name in LEVEL_NAMES.items()}
+
+MAX_PENDING = 10_000  # lines waiting for the writer before new ones are dropped
+MAX_BATCH = 256  # lines written to the stream at once
+
+_level = _LEVELS.get(os.environ.get("OTHELLO_LOG_LEVEL", "INFO").upper(), INFO)
+DEBUG_ENABLED = _level <= DEBUG
+
+
+def get_level() -> int:
+    return _level
+
+
+def set_level(level: int) -> None:
+    global _level, DEBUG_ENABLED
+    _level = level
+    DEBUG_ENABLED = level <= DEBUG
+
+
+def _format(record: tuple[int, str, tuple[Any, ...], dict[str, Any]]) -> str:
+    level, message, args, fields = record
+    if args:
+        message = message.format(*args)
+    if fields:
+        message += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+    return f"[{LEVEL_NAMES[level]}] {message}\n"
+
+
+class _Writer:
+    def __init__(self) -> None:
+        self._queue: Queue = Queue(MAX_PENDING)
+        self._dropped = 0
+        self._lock = Lock()
+        self._thread = Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, record: tuple[int, str, tuple[Any, ...], dict[str, Any]]) -> None:
+        try:
+            self._queue.put_nowait(record)
+        except Full:
+            with self._lock:
+                self._dropped += 1
+
+    def flush(self) -> None:
+        """
+        Wait until everything logged so far has been written.
+        """
+
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < MAX_BATCH:
+                    batch.append(self._queue.get_nowait())
+            except Empty:
+                pass
+
+            lines = []
+            with self._lock:
+                dropped, self._dropped = self._dropped, 0
+            if dropped:
+                lines.append(f"[WARNING] {dropped} log lines dropped, the output is too slow\n")
+            for record in batch:
+                try:
+                    lines.append(_format(record))
+                except Exception as error:  # a bad template must not kill the writer
+                    lines.append(f"[ERROR] Could not format log line {record[1]!r}: {error}\n")
+            try:
+                sys.stdout.write("".join(lines))
+                sys.stdout.flush()
+            except (OSError, ValueError):
+                pass  # stdout is gone, e.g. a closed pipe, nothing left to report to
+            for _ in batch:
+                self._queue.task_done()
+
+
+_writer = _Writer()
+atexit.register(_writer.flush)
+
+
+def debug(message: str, *args: Any, **fields: Any) -> None:
+    if _level <= DEBUG:
+        _writer.put((DEBUG, message, args, fields))
+
+
+def info(message: str, *args: Any, **fields: Any) -> None:
+    if _level <= INFO:
+        _writer.put((INFO, message, args, fields))
+
+
+def warning(message: str, *args: Any, **fields: Any) -> None:
+    if _level <= WARNING:
+        _writer.put((WARNING, message, args, fields))
+
+
+def error(message: str, *args: Any, **fields: Any) -> None:
+    if _level <= ERROR:
+        _writer.put((ERROR, message, args, fields))
+
+
+def flush() -> None:
+    _writer.flush()
@@ -0,0 +1,48 @@
+import contextlib
+import io
+import log
+
+
+def capture(*calls) -> list[str]:
+    stream = io.StringIO()
+    with contextlib.redirect_stdout(stream):
+        for call in calls:
+            call()
+        log.flush()
+    return stream.getvalue().splitlines()
+
+
+def test_level_filters_lines():
+    level = log.get_level()
+    try:
+        log.set_level(log.INFO)
+        assert not log.DEBUG_ENABLED, 'test_level_filters_lines(): debug enabled at INFO'
+        lines = capture(lambda: log.debug("hidden"), lambda: log.info("shown"))
+        assert lines == ["[INFO] shown"], f'test_level_filters_lines(): got {lines}'
+
+        log.set_level(log.DEBUG)
+        assert log.DEBUG_ENABLED, 'test_level_filters_lines(): debug disabled at DEBUG'
+        lines = capture(lambda: log.debug("shown"))
+        assert lines == ["[DEBUG] shown"], f'test_level_filters_lines(): got {lines}'
+    finally:
+        log.set_level(level)
+
+
+def test_lines_are_formatted_on_the_writer():
+    level = log.get_level()
+    try:
+        log.set_level(log.INFO)
+        lines = capture(lambda: log.warning("Dropping {}'s move {}", "player-1", (3, 4), topic="game/move"),
+                        lambda: log.error("Bad template {} {}", "one"),
+                        lambda: log.info("Still {}", "running"))
+        assert lines[0] == "[WARNING] Dropping player-1's move (3, 4) topic=game/move", f'test_lines_are_formatted_on_the_writer(): got {lines[0]}'
+        assert lines[1].startswith("[ERROR] Could not format log line"), f'test_lines_are_formatted_on_the_writer(): got {lines[1]}'
+        assert lines[2] == "[INFO] Still running", 'test_lines_are_formatted_on_the_writer(): writer stopped after a bad template'
+    finally:
+        log.set_level(level)
+
+
+if __name__ == "__main__":
+    test_level_filters_lines()
+    test_lines_are_formatted_on_the_writer()
+    print("log_test.py tested successful, all tests passed")
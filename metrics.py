@@ -0,0 +1,185 @@
+"""
+Process-wide counters and histograms, exported in the Prometheus text format either over a local
+HTTP endpoint or as a file rewritten periodically (for node_exporter's textfile collector).
+
+    curl http://127.0.0.1:9464/metrics             # on the server, see `server.py --metrics-port`
+    cat client.prom                                # on a client
+
+Metrics are created once at import time by the modules recording them. Recording is a bucket
+lookup and a few additions under an uncontended lock, cheap enough to stay on in production,
+while rendering the text only happens when the metrics are read.
+"""
+
+from __future__ import annotations
+import os
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Lock, Thread
+from typing import Union
+
+METRICS_PORT = 9464
+METRICS_INTERVAL = 15.0  # seconds between two rewrites of a metrics file
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """
+    Monotonic count, split by the values of its labels.
+    """
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self._label_names = labels
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_labels(self._label_names, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """
+    Distribution of observed values over fixed buckets, given by their upper bounds.
+    """
+
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self._bounds = buckets
+        self._counts = [0] * (len(buckets) + 1)  # the last one counts values above every bound
+        self._sum = 0.0
+        self._lock = Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        for bound, count in zip(self._bounds, counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound:g}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f"{self.name}_sum {total:g}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Union[Counter, Histogram]] = {}
+        self._lock = Lock()
+
+    def counter(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> Counter:
+        with self._lock:
+            return self._metrics.setdefault(name, Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        with self._lock:
+            return self._metrics.setdefault(name, Histogram(name, help_text, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def serve_http(port: int = METRICS_PORT, address: str = "127.0.0.1",
+               registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """
+    Serve the metrics on http://address:port/metrics from a background thread. Call `shutdown()`
+    on the returned server to stop it.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *_) -> None:
+            pass  # scrapes are not worth a line each
+
+    server = ThreadingHTTPServer((address, port), Handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class MetricsFile:
+    """
+    Rewrites `path` with the current metrics every `interval` seconds, and once more when closed.
+    Each rewrite replaces the file atomically, so readers never see half of it.
+    """
+
+    def __init__(self, path: str, interval: float = METRICS_INTERVAL, registry: Registry = REGISTRY) -> None:
+        self._path = path
+        self._registry = registry
+        self._stop = Event()
+        self._thread = Thread(target=self._run, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def write(self) -> None:
+        temporary = self._path + ".tmp"
+        with open(temporary, "w") as file:
+            file.write(self._registry.render())
+        os.replace(temporary, self._path)
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.write()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.write()
@@ -0,0 +1,45 @@
+import urllib.request
+from metrics import MetricsFile, Registry, serve_http
+
+
+def test_histogram_and_counter_render():
+    registry = Registry()
+    latency = registry.histogram("test_seconds", "Latency.", (0.01, 0.1))
+    for value in (0.005, 0.05, 0.05, 3.0):
+        latency.observe(value)
+    messages = registry.counter("test_messages_total", "Messages.", ("direction", "tag"))
+    messages.inc("sent", "board")
+    messages.inc("sent", "board")
+    assert registry.histogram("test_seconds", "Latency.") is latency, 'test_histogram_and_counter_render(): metric created twice'
+
+    lines = registry.render().splitlines()
+    for expected in ('test_seconds_bucket{le="0.01"} 1', 'test_seconds_bucket{le="0.1"} 3',
+                     'test_seconds_bucket{le="+Inf"} 4', 'test_seconds_count 4', 'test_seconds_sum 3.105',
+                     '# TYPE test_messages_total counter', 'test_messages_total{direction="sent",tag="board"} 2'):
+        assert expected in lines, f'test_histogram_and_counter_render(): missing {expected}'
+
+
+def test_metrics_are_exported(tmp_path):
+    registry = Registry()
+    registry.counter("test_total", "Test.").inc()
+
+    server = serve_http(0, registry=registry)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            assert "test_total 1" in response.read().decode("utf-8"), 'test_metrics_are_exported(): not served'
+    finally:
+        server.shutdown()
+
+    path = tmp_path / "test.prom"
+    with MetricsFile(str(path), interval=60, registry=registry):
+        registry.counter("test_total", "Test.").inc()
+    assert "test_total 2" in path.read_text(), 'test_metrics_are_exported(): file not written on close'
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+    test_histogram_and_counter_render()
+    with tempfile.TemporaryDirectory() as directory:
+        test_metrics_are_exported(pathlib.Path(directory))
+    print("metrics_test.py tested successful, all tests passed")
@@ -1,29 +1,388 @@
+from __future__ import annotations
+import asyncio
+import time
 from dataclasses import dataclass
-from typing import Any, Optional, Callable
-from abc import ABC
+from typing import Optional, Callable, Union
+from abc import ABC, abstractmethod
 from collections import deque
+from itertools import product
 import paho.mqtt.client as mqtt
-from threading import Lock
+from threading import Condition, Lock
+import log
+from metrics import DEPTH_BUCKETS, REGISTRY
 
 SCOPE_NAME = "othello"
 SERVER_UID = "server"
 BROADCAST = "*"
 LOCALHOST = "localhost"
 
+TEXT_PROTOCOL = 1  # boards as "BW.|..." strings, moves as "r,c"
+BINARY_PROTOCOL = 2  # boards and moves packed with `Board.pack` and `pack_place`
+DELTA_PROTOCOL = 3  # as BINARY_PROTOCOL, but after the first snapshot only the moves played are sent
+SUPPORTED_PROTOCOLS = (TEXT_PROTOCOL, BINARY_PROTOCOL, DELTA_PROTOCOL)
+BINARY_TAGS = frozenset({"board-bin", "place-bin", "move-bin"})  # payloads delivered as bytes instead of text
+
+MESSAGES = REGISTRY.counter("othello_messages_total", "Messages sent and received, by tag.", ("direction", "tag"))
+MAILBOX_DEPTH = REGISTRY.histogram("othello_mailbox_depth", "Unprocessed messages in a channel's mailbox when one arrives.",
+                                   DEPTH_BUCKETS)
+
+
+def offer_protocols() -> str:
+    """
+    Content of the `connected` message, listing the protocol versions this side understands.
+    """
+
+    return ",".join(map(str, SUPPORTED_PROTOCOLS))
+
+
+def negotiate_protocol(offer: str) -> int:
+    """
+    Highest protocol version in a peer's `connected` offer that is supported here as well.
+    Peers predating versioning send an empty offer and get TEXT_PROTOCOL.
+    """
+
+    offered = {int(version) for version in offer.split(",") if version.isdigit()}
+    common = offered.intersection(SUPPORTED_PROTOCOLS)
+    return max(common) if common else TEXT_PROTOCOL
+
 
 @dataclass
 class Message:
     sender: str
     receiver: str
     tag: str
-    content: str
+    content: Union[str, bytes]  # bytes for BINARY_TAGS
 
     @property
     def topic(self) -> str:
         return "/".join([SCOPE_NAME, self.sender, self.receiver, self.tag])
 
     def __str__(self) -> str:
-        return f"({self.sender})->({self.receiver}) [{self.tag}]: \"{self.content}\""
+        content = self.content.hex() if isinstance(self.content, bytes) else self.content
+        return f"({self.sender})->({self.receiver}) [{self.tag}]: \"{content}\""
+
+
+@dataclass(frozen=True)
+class Match:
+    """
+    Declarative message filter for `receive_matching`, fields left as None match anything.
+    Unlike an arbitrary predicate, it is answered from the mailbox index without scanning messages.
+    """
+
+    sender: Optional[str] = None
+    tag: Optional[str] = None
+
+    def __call__(self, message: Message) -> bool:
+        return (self.sender is None or message.sender == self.sender) and (self.tag is None or message.tag == self.tag)
+
+
+ANY = Match()
+Matcher = Union[Match, tuple[Match, ...], Callable[[Message], bool]]  # a tuple matches any of its Matches
+
+
+class ReceiveCancelled(Exception):
+    """
+    Raised in every receive blocked on a Mailbox when `Mailbox.cancel` is called.
+    """
+
+
+class Mailbox:
+    """
+    Thread-safe store of unprocessed incoming messages. Receivers sleep on a condition variable
+    (or an asyncio event, for coroutines) and are woken by `put`, so waiting costs no CPU time.
+
+    Messages are indexed by (sender, tag), each key keeping its own FIFO queue of sequence numbers,
+    while `_messages` keeps the global arrival order. The oldest message of a key, a sender or a tag
+    is always at the head of one of these queues, so receiving with a Match, or a tuple of them,
+    never scans the backlog.
+    """
+
+    def __init__(self) -> None:
+        self._messages: dict[int, Message] = {}  # sequence number -> message, in arrival order
+        self._queues: dict[tuple[str, str], deque[int]] = {}
+        self._keys_by_sender: dict[str, set[tuple[str, str]]] = {}
+        self._keys_by_tag: dict[str, set[tuple[str, str]]] = {}
+        self._sequence = 0
+        self._condition = Condition()
+        self._async_waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._cancellations = 0
+        self._closed = False
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._messages)
+
+    def put(self, message: Message) -> None:
+        with self._condition:
+            key = (message.sender, message.tag)
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = self._queues[key] = deque()
+                self._keys_by_sender.setdefault(message.sender, set()).add(key)
+                self._keys_by_tag.setdefault(message.tag, set()).add(key)
+            queue.append(self._sequence)
+            self._messages[self._sequence] = message
+            self._sequence += 1
+            self._wake_all()
+
+    def cancel(self) -> None:
+        """
+        Make every receive currently blocked on this mailbox raise ReceiveCancelled.
+        """
+
+        with self._condition:
+            self._cancellations += 1
+            self._wake_all()
+
+    def close(self) -> None:
+        """
+        Like `cancel`, but receives started later raise ReceiveCancelled as well once nothing matches.
+        """
+
+        with self._condition:
+            self._closed = True
+            self._wake_all()
+
+    def _wake_all(self) -> None:
+        self._condition.notify_all()
+        for loop, event in self._async_waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _take(self, condition: Matcher) -> Optional[Message]:
+        if not self._messages:
+            return None
+        if isinstance(condition, Match):
+            key = self._oldest_key(condition)
+        elif isinstance(condition, tuple):
+            keys = [key for key in map(self._oldest_key, condition) if key is not None]
+            key = min(keys, key=lambda key: self._queues[key][0], default=None)
+        else:
+            return self._take_scanning(condition)
+        return self._pop(key) if key is not None else None
+
+    def _oldest_key(self, condition: Match) -> Optional[tuple[str, str]]:
+        """
+        Key of the queue holding the oldest message matching `condition`, if there is one.
+        """
+
+        if condition.sender is not None and condition.tag is not None:
+            key = (condition.sender, condition.tag)
+            return key if key in self._queues else None
+        if condition.sender is not None:
+            keys = self._keys_by_sender.get(condition.sender)
+        elif condition.tag is not None:
+            keys = self._keys_by_tag.get(condition.tag)
+        else:
+            oldest = self._messages[next(iter(self._messages))]
+            return oldest.sender, oldest.tag
+
+        if not keys:
+            return None
+        return min(keys, key=lambda key: self._queues[key][0])
+
+    def _take_scanning(self, condition: Callable[[Message], bool]) -> Optional[Message]:
+        """
+        Fallback for arbitrary predicates, which have to be tried on every message in order.
+        """
+
+        for sequence, message in self._messages.items():
+            if condition(message):
+                key = (message.sender, message.tag)
+                self._queues[key].remove(sequence)
+                del self._messages[sequence]
+                self._drop_if_empty(key)
+                return message
+        return None
+
+    def _pop(self, key: tuple[str, str]) -> Message:
+        message = self._messages.pop(self._queues[key].popleft())
+        self._drop_if_empty(key)
+        return message
+
+    def _drop_if_empty(self, key: tuple[str, str]) -> None:
+        if self._queues[key]:
+            return
+        del self._queues[key]
+        sender, tag = key
+        for index, value in ((self._keys_by_sender, sender), (self._keys_by_tag, tag)):
+            keys = index[value]
+            keys.discard(key)
+            if not keys:
+                del index[value]
+
+    def receive_matching(self, condition: Matcher, timeout: Optional[float] = None) -> Message:
+        """
+        Take the first message matching `condition` (preferably a Match or a tuple of them), sleeping
+        until one arrives. Raises TimeoutError after `timeout` seconds, or ReceiveCancelled if the
+        mailbox gets cancelled in the meantime.
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            cancellations = self._cancellations
+            while True:
+                message = self._take(condition)
+                if message is not None:
+                    return message
+                if self._closed or self._cancellations != cancellations:
+                    raise ReceiveCancelled()
+
+                if deadline is None:
+                    self._condition.wait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError()
+                    self._condition.wait(remaining)
+
+    async def receive_matching_async(self, condition: Matcher, timeout: Optional[float] = None) -> Message:
+        """
+        Coroutine version of `receive_matching`, it can also be cancelled like any other task.
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._condition:
+            cancellations = self._cancellations
+        try:
+            while True:
+                with self._condition:
+                    message = self._take(condition)
+                    if message is not None:
+                        return message
+                    if self._closed or self._cancellations != cancellations:
+                        raise ReceiveCancelled()
+                    waiter[1].clear()
+                    self._async_waiters.add(waiter)
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError()
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), remaining)
+                except asyncio.TimeoutError:
+                    raise TimeoutError() from None
+        finally:
+            with self._condition:
+                self._async_waiters.discard(waiter)
+
+    def flush(self) -> list[Message]:
+        with self._condition:
+            result = list(self._messages.values())
+            self._messages.clear()
+            self._queues.clear()
+            self._keys_by_sender.clear()
+            self._keys_by_tag.clear()
+            return result
+
+
+class Transport(ABC):
+    """
+    Publish/subscribe connection used by a channel. Incoming publications are passed
+    to `on_message(topic, payload)`, possibly from another thread.
+    """
+
+    on_message: Callable[[str, bytes], None]
+
+    @abstractmethod
+    def connect(self) -> None:
+        pass
+
+    @abstractmethod
+    def subscribe(self, pattern: str) -> None:
+        pass
+
+    @abstractmethod
+    def publish(self, topic: str, payload: Union[str, bytes]) -> None:
+        pass
+
+    @abstractmethod
+    def disconnect(self) -> None:
+        pass
+
+
+class MqttTransport(Transport):
+    """
+    A paho MQTT client connected to a real broker, with its network loop in a background thread.
+    """
+
+    def __init__(self, broker_address: str, uid: str) -> None:
+        self._broker_address = broker_address
+        self._client = mqtt.Client(uid)
+
+    def connect(self) -> None:
+        self._client.on_message = lambda _client, _userdata, data: self.on_message(data.topic, data.payload)
+        self._client.connect(self._broker_address)
+        self._client.loop_start()
+
+    def subscribe(self, pattern: str) -> None:
+        self._client.subscribe(pattern)
+
+    def publish(self, topic: str, payload: Union[str, bytes]) -> None:
+        self._client.publish(topic, payload)
+
+    def disconnect(self) -> None:
+        self._client.loop_stop()
+        self._client.disconnect()
+
+
+class LoopbackBroker:
+    """
+    In-memory broker for channels living in the same process, so games can run without mosquitto.
+    Subscriptions may use `+` for a whole topic level. Publications are delivered synchronously on
+    the publishing thread, which only puts them into the receivers' mailboxes, so any mix of threads
+    and asyncio tasks can use it.
+    """
+
+    def __init__(self) -> None:
+        self._subscriptions: dict[tuple[str, ...], set[LoopbackTransport]] = {}
+        self._lock = Lock()
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, transport: LoopbackTransport, pattern: str) -> None:
+        with self._lock:
+            self._subscriptions.setdefault(tuple(pattern.split("/")), set()).add(transport)
+
+    def unsubscribe_all(self, transport: LoopbackTransport) -> None:
+        with self._lock:
+            for levels in [levels for levels, transports in self._subscriptions.items() if transport in transports]:
+                self._subscriptions[levels].discard(transport)
+                if not self._subscriptions[levels]:
+                    del self._subscriptions[levels]
+
+    def publish(self, topic: str, payload: bytes) -> None:
+        """
+        Deliver to every transport subscribed to a pattern matching `topic`. Patterns are found by
+        looking up each combination of the topic's levels and `+`, without scanning subscriptions.
+        """
+
+        levels = topic.split("/")
+        receivers = set()
+        with self._lock:
+            self.published += 1
+            for pattern in product(*((level, "+") for level in levels)):
+                receivers.update(self._subscriptions.get(pattern, ()))
+            self.delivered += len(receivers)
+        for transport in receivers:
+            transport.on_message(topic, payload)
+
+
+class LoopbackTransport(Transport):
+    def __init__(self, broker: LoopbackBroker) -> None:
+        self._broker = broker
+
+    def connect(self) -> None:
+        pass
+
+    def subscribe(self, pattern: str) -> None:
+        self._broker.subscribe(self, pattern)
+
+    def publish(self, topic: str, payload: Union[str, bytes]) -> None:
+        self._broker.publish(topic, payload.encode("utf-8") if isinstance(payload, str) else bytes(payload))
+
+    def disconnect(self) -> None:
+        self._broker.unsubscribe_all(self)
 
 
 class AbstractChannel(ABC):
@@ -33,28 +392,26 @@ class AbstractChannel(ABC):
     of the networking logic synchronously.
     """
 
-    def __init__(self, broker_address: str, uid: str) -> None:
+    def __init__(self, broker_address: str, uid: str, transport: Optional[Transport] = None) -> None:
         self._broker_address = broker_address
-        self._client = mqtt.Client(uid)
+        self._transport = transport if transport is not None else MqttTransport(broker_address, uid)
         self._uid = uid
-        self._mailbox: deque[Message] = deque()  # stores unprocessed incoming messages
-        self._lock = Lock()
+        self._mailbox = Mailbox()  # stores unprocessed incoming messages
 
     def __enter__(self):
-        self._client.on_message = self._on_message
-        self._client.connect(self._broker_address)
-        print(f"[INFO] Connection ({self._uid}) to \"{self._broker_address}\" opened!")
-        self._client.loop_start()
-        self._client.subscribe(f"{SCOPE_NAME}/+/{self._uid}/+")
-        self._client.subscribe(f"{SCOPE_NAME}/+/{BROADCAST}/+")
+        self._transport.on_message = self._on_message
+        self._transport.connect()
+        log.info("Connection ({}) to \"{}\" opened!", self._uid, self._broker_address)
+        self._transport.subscribe(f"{SCOPE_NAME}/+/{self._uid}/+")
+        self._transport.subscribe(f"{SCOPE_NAME}/+/{BROADCAST}/+")
         self._on_connect()
         return self
 
     def __exit__(self, *_) -> None:
-        self._client.loop_stop()
+        self._mailbox.close()
         self._on_disconnect()
-        self._client.disconnect()
-        print(f"[INFO] Connection ({self._uid}) closed!")
+        self._transport.disconnect()
+        log.info("Connection ({}) closed!", self._uid)
 
     def _on_connect(self) -> None:
         pass
@@ -65,48 +422,56 @@ class AbstractChannel(ABC):
     def _is_message_invalid(self, _message: Message) -> bool:
         return False
 
-    def _on_message(self, _client: mqtt.Client, _userdata: Any, data: Any) -> None:
-        (scope, sender, receiver, tag) = data.topic.split("/")
-        content = str(data.payload.decode("utf-8"))
+    def _on_message(self, topic: str, payload: bytes) -> None:
+        (scope, sender, receiver, tag) = topic.split("/")
+        content = bytes(payload) if tag in BINARY_TAGS else str(payload.decode("utf-8"))
 
         if scope == SCOPE_NAME and sender == self._uid and receiver == BROADCAST:
             return  # Silently drop valid broadcasts from self
 
         if scope != SCOPE_NAME or sender == self._uid or (receiver != self._uid and receiver != BROADCAST):
-            print(f"[WARNING] Dropping invalid topic: {data.topic}")
+            log.warning("Dropping invalid topic: {}", topic)
             return
 
         message = Message(sender, receiver, tag, content)
 
         if self._is_message_invalid(message):
-            print(f"[WARNING] Dropping invalid message: {message}")
+            log.warning("Dropping invalid message: {}", message)
             return
 
-        print(f"[DEBUG] {message}")
+        if log.DEBUG_ENABLED:
+            log.debug("{}", message)
 
-        with self._lock:
-            self._mailbox.append(message)
+        MESSAGES.inc("received", tag)
+        MAILBOX_DEPTH.observe(len(self._mailbox))
+        self._mailbox.put(message)
 
-    def _send_message(self, receiver: str, tag: str, content: Optional[str] = None) -> None:
+    def _send_message(self, receiver: str, tag: str, content: Union[str, bytes, None] = None) -> None:
         message = Message(self._uid, receiver, tag, content or '')
-        print(f"[DEBUG] {message}")
-        self._client.publish(message.topic, message.content)
+        if log.DEBUG_ENABLED:
+            log.debug("{}", message)
+        MESSAGES.inc("sent", tag)
+        self._transport.publish(message.topic, message.content)
 
-    def receive_matching(self, condition: Callable[[Message], bool]) -> Message:
+    def receive_matching(self, condition: Matcher, timeout: Optional[float] = None) -> Message:
         """
-        Take the first message matching `condition` from the mailbox. If no messages satisfy
-        the condition or the mailbox is empty, this method blocks the current thread until
-        a matching message arrives.
+        Take the first message matching `condition` from the mailbox. Prefer passing a Match
+        over a lambda, it is looked up in the mailbox index instead of being tried on every
+        message. If no messages satisfy the condition or the mailbox is empty, this method
+        blocks the current thread until a matching message arrives, raising TimeoutError
+        if none does within `timeout` seconds.
         """
 
-        while True:
-            with self._lock:
-                for message in self._mailbox:
-                    if condition(message):
-                        self._mailbox.remove(message)
-                        return message
+        return self._mailbox.receive_matching(condition, timeout)
 
-    def receive_any(self) -> Message:
+    async def receive_matching_async(self, condition: Matcher, timeout: Optional[float] = None) -> Message:
+        """
+        Same as `receive_matching`, but awaits the message instead of blocking the thread.
+        """
+
+        return await self._mailbox.receive_matching_async(condition, timeout)
+
+    def receive_any(self, timeout: Optional[float] = None) -> Message:
         """
         Take the first message from the mailbox. If the mailbox is empty, block the current thread
         until a message arrives. You should avoid using this method and use `receive_matching`
@@ -114,17 +479,17 @@ class AbstractChannel(ABC):
         drop any irrelevant packets.
         """
 
-        return self.receive_matching(lambda _message: True)
+        return self.receive_matching(ANY, timeout)
+
+    async def receive_any_async(self, timeout: Optional[float] = None) -> Message:
+        return await self.receive_matching_async(ANY, timeout)
 
     def flush_mailbox(self) -> list[Message]:
         """
         Remove all messages from the mailbox and return them.
         """
 
-        with self._lock:
-            result = list(self._mailbox.copy())
-            self._mailbox.clear()
-            return result
+        return self._mailbox.flush()
 
 
 class ClientChannel(AbstractChannel):
@@ -135,7 +500,7 @@ class ClientChannel(AbstractChannel):
     """
 
     def _on_connect(self) -> None:
-        self.send_to_server("connected")
+        self.send_to_server("connected", offer_protocols())
 
     def _on_disconnect(self) -> None:
         self.send_to_server("disconnected")
@@ -143,7 +508,7 @@ class ClientChannel(AbstractChannel):
     def _is_message_invalid(self, message: Message) -> bool:
         return message.sender != SERVER_UID
 
-    def send_to_server(self, tag: str, content: Optional[str] = None) -> None:
+    def send_to_server(self, tag: str, content: Union[str, bytes, None] = None) -> None:
         """
         Send a message to the MQTT client with uid SERVER_UID.
         """
@@ -157,17 +522,17 @@ class ServerChannel(AbstractChannel):
     It is assumed the MQTT broker is running on the device using this class.
     """
 
-    def __init__(self) -> None:
-        super().__init__(LOCALHOST, SERVER_UID)
+    def __init__(self, transport: Optional[Transport] = None) -> None:
+        super().__init__(LOCALHOST, SERVER_UID, transport)
 
-    def send_to_client(self, client_uid: str, tag: str, content: Optional[str] = None) -> None:
+    def send_to_client(self, client_uid: str, tag: str, content: Union[str, bytes, None] = None) -> None:
         """
         Send a message to the MQTT client with uid `client_uid`.
         """
 
         self._send_message(client_uid, tag, content)
 
-    def broadcast(self, tag: str, content: Optional[str] = None) -> None:
+    def broadcast(self, tag: str, content: Union[str, bytes, None] = None) -> None:
         """
         Send a message to all other connected MQTT clients.
         """
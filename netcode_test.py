@@ -0,0 +1,117 @@
+import asyncio
+import time
+from threading import Thread
+from netcode import (ANY, ClientChannel, LoopbackBroker, LoopbackTransport, Mailbox, Match, Message,
+                     ReceiveCancelled, ServerChannel)
+
+
+def message(sender: str, tag: str) -> Message:
+    return Message(sender, "server", tag, "")
+
+
+def put_later(mailbox: Mailbox, item: Message, delay: float = 0.05) -> None:
+    def put() -> None:
+        time.sleep(delay)
+        mailbox.put(item)
+    Thread(target=put, daemon=True).start()
+
+
+def test_receive_matching_wakes_up_and_skips_other_messages():
+    mailbox = Mailbox()
+    mailbox.put(message("a", "board-ack"))
+    put_later(mailbox, message("b", "place"))
+
+    received = mailbox.receive_matching(lambda m: m.sender == "b", timeout=1.0)
+    assert received.tag == "place", 'test_receive_matching_wakes_up_and_skips_other_messages(): wrong message'
+    assert len(mailbox) == 1, 'test_receive_matching_wakes_up_and_skips_other_messages(): other message was dropped'
+
+
+def test_receive_matching_timeout_and_cancel():
+    mailbox = Mailbox()
+    try:
+        mailbox.receive_matching(lambda m: True, timeout=0.05)
+        assert False, 'test_receive_matching_timeout_and_cancel(): expected a timeout'
+    except TimeoutError:
+        pass
+
+    Thread(target=lambda: (time.sleep(0.05), mailbox.cancel()), daemon=True).start()
+    try:
+        mailbox.receive_matching(lambda m: True, timeout=1.0)
+        assert False, 'test_receive_matching_timeout_and_cancel(): expected a cancellation'
+    except ReceiveCancelled:
+        pass
+
+
+def test_receive_matching_async():
+    mailbox = Mailbox()
+
+    async def receive() -> Message:
+        put_later(mailbox, message("a", "place"))
+        return await mailbox.receive_matching_async(lambda m: m.tag == "place", timeout=1.0)
+
+    assert asyncio.run(receive()).sender == "a", 'test_receive_matching_async(): wrong message'
+
+
+def test_indexed_receive_keeps_arrival_order():
+    mailbox = Mailbox()
+    for sender, tag in [("a", "place"), ("b", "place"), ("a", "board-ack"), ("a", "place"), ("b", "board-ack")]:
+        mailbox.put(message(sender, tag))
+
+    assert mailbox.receive_matching(Match("a", "place")) is not None
+    assert mailbox.receive_matching(Match(tag="board-ack")).sender == "a", \
+        'test_indexed_receive_keeps_arrival_order(): tag match is not the oldest'
+    assert mailbox.receive_matching(Match(sender="b")).tag == "place", \
+        'test_indexed_receive_keeps_arrival_order(): sender match is not the oldest'
+    assert mailbox.receive_matching(lambda m: m.tag == "board-ack").sender == "b", \
+        'test_indexed_receive_keeps_arrival_order(): predicate fallback failed'
+    mailbox.put(message("c", "connect"))
+    assert mailbox.receive_matching(ANY).sender == "a", 'test_indexed_receive_keeps_arrival_order(): ANY is not FIFO'
+    assert [m.sender for m in mailbox.flush()] == ["c"], 'test_indexed_receive_keeps_arrival_order(): wrong leftovers'
+    assert len(mailbox) == 0, 'test_indexed_receive_keeps_arrival_order(): flush left messages behind'
+
+
+def test_receive_matching_any_of_several_matches():
+    mailbox = Mailbox()
+    for sender, tag in [("a", "board-ack"), ("b", "resync"), ("a", "place"), ("a", "resync")]:
+        mailbox.put(message(sender, tag))
+
+    either = (Match("a", "place"), Match(tag="resync"))
+    assert mailbox.receive_matching(either).sender == "b", 'test_receive_matching_any_of_several_matches(): not oldest'
+    assert mailbox.receive_matching(either).tag == "place", 'test_receive_matching_any_of_several_matches(): not oldest'
+    assert mailbox.receive_matching(either).tag == "resync", 'test_receive_matching_any_of_several_matches(): lost'
+    try:
+        mailbox.receive_matching(either, timeout=0.05)
+        assert False, 'test_receive_matching_any_of_several_matches(): expected a timeout'
+    except TimeoutError:
+        pass
+    assert [m.tag for m in mailbox.flush()] == ["board-ack"], 'test_receive_matching_any_of_several_matches(): leftovers'
+
+
+def test_loopback_transport_routes_topics():
+    broker = LoopbackBroker()
+    with ServerChannel(LoopbackTransport(broker)) as server, \
+            ClientChannel("loopback", "a", LoopbackTransport(broker)) as a, \
+            ClientChannel("loopback", "b", LoopbackTransport(broker)) as b:
+        assert {server.receive_matching(Match(tag="connected"), 1.0).sender for _ in range(2)} == {"a", "b"}, \
+            'test_loopback_transport_routes_topics(): connections were not seen by the server'
+
+        server.send_to_client("a", "your-turn", "B")
+        server.broadcast("winner", "W")
+        assert a.receive_any(1.0).tag == "your-turn", 'test_loopback_transport_routes_topics(): direct message lost'
+        assert a.receive_any(1.0).tag == "winner", 'test_loopback_transport_routes_topics(): broadcast lost'
+        assert b.receive_any(1.0).tag == "winner", 'test_loopback_transport_routes_topics(): broadcast lost'
+        assert len(b.flush_mailbox()) == 0, 'test_loopback_transport_routes_topics(): message for a reached b'
+
+        a.send_to_server("place-bin", bytes((19,)))
+        assert server.receive_matching(Match("a", "place-bin"), 1.0).content == bytes((19,)), \
+            'test_loopback_transport_routes_topics(): binary payload changed'
+
+
+if __name__ == '__main__':
+    test_receive_matching_wakes_up_and_skips_other_messages()
+    test_receive_matching_timeout_and_cancel()
+    test_receive_matching_async()
+    test_indexed_receive_keeps_arrival_order()
+    test_receive_matching_any_of_several_matches()
+    test_loopback_transport_routes_topics()
+    print("Netcode tested successful, all tests passed")
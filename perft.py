@@ -0,0 +1,171 @@
+"""
+Perft: counts the positions reached after exactly `depth` moves, the standard correctness check
+and throughput number for move generators.
+
+    python perft.py 9                              # from the starting position, all cores
+    python perft.py 6 --divide                     # count per root move
+    python perft.py 5 --verify                     # cross-check the Board methods against the bitboards
+    python perft.py 7 --board "........|...|..." --color W
+
+Counts follow standard Othello, where a player without a move passes and the pass uses up one
+ply, and a position where neither player can move is a single leaf however deep the count goes.
+From the starting position that gives 4, 12, 56, 244, 1396, 8200, 55092, 390216, 3005288, ...
+(the server's rules, which end the game at the first pass, only differ once passes occur).
+The root moves are split into tasks a few plies deep and counted on a process pool.
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import time
+from multiprocessing import Pool
+from typing import Optional
+from board import BOARD_SIZE, Board, Tile, flipped_tiles, legal_moves, popcount
+
+PASS = -1  # move recorded for a pass
+TASKS_PER_PROCESS = 8  # the root is split until there are this many tasks for every worker
+
+
+def perft(own: int, opp: int, depth: int) -> int:
+    """
+    Leaves at `depth` plies below the position with the owner of `own` to move.
+    """
+
+    if depth == 0:
+        return 1
+    moves = legal_moves(own, opp)
+    if depth == 1:
+        return popcount(moves) if moves else 1  # a pass or the end of the game
+    if not moves:
+        if not legal_moves(opp, own):
+            return 1
+        return perft(opp, own, depth - 1)
+
+    nodes = 0
+    while moves:
+        bit = moves & -moves
+        moves ^= bit
+        flipped = flipped_tiles(own, opp, bit)
+        nodes += perft(opp & ~flipped, own | bit | flipped, depth - 1)
+    return nodes
+
+
+def perft_board(board: Board, color: Tile, depth: int) -> int:
+    """
+    Same count as `perft`, but generating moves square by square with `Board._is_move_valid`
+    and playing them with `Board.place`, so the two implementations check each other.
+    """
+
+    if depth == 0:
+        return 1
+    moves = [(row, col) for row in range(BOARD_SIZE) for col in range(BOARD_SIZE)
+             if board._is_move_valid(color, row, col)]
+    if not moves:
+        if not any(board._is_move_valid(color.opposite(), row, col)
+                   for row in range(BOARD_SIZE) for col in range(BOARD_SIZE)):
+            return 1
+        return perft_board(board, color.opposite(), depth - 1)
+
+    nodes = 0
+    for row, col in moves:
+        child = Board.from_bitboards(*board._masks(Tile.BLACK))
+        child.place(row, col, color)
+        nodes += perft_board(child, color.opposite(), depth - 1)
+    return nodes
+
+
+def _split(own: int, opp: int, depth: int, tasks: int) -> list[tuple[tuple[int, ...], int, int, int]]:
+    """
+    (moves from the root, own, opp, remaining depth) of the subtrees to count, expanded breadth
+    first until there are at least `tasks` of them or they would be too shallow to be worth it.
+    The root itself is always expanded, so every count can be credited to its root move.
+    """
+
+    frontier = [((), own, opp, depth)]
+    while len(frontier) < tasks or not frontier[0][0]:
+        expanded = []
+        for path, own, opp, depth in frontier:
+            moves = legal_moves(own, opp)
+            if (path and depth <= 2) or (not moves and not legal_moves(opp, own)):
+                expanded.append((path, own, opp, depth))
+            elif not moves:
+                expanded.append((path + (PASS,), opp, own, depth - 1))
+            else:
+                while moves:
+                    bit = moves & -moves
+                    moves ^= bit
+                    flipped = flipped_tiles(own, opp, bit)
+                    expanded.append((path + (bit.bit_length() - 1,), opp & ~flipped, own | bit | flipped, depth - 1))
+        if len(expanded) == len(frontier):
+            break  # nothing left to expand
+        frontier = expanded
+    return frontier
+
+
+def _count(task: tuple[tuple[int, ...], int, int, int]) -> tuple[tuple[int, ...], int]:
+    path, own, opp, depth = task
+    return path, perft(own, opp, depth)
+
+
+def run_perft(board: Board, color: Tile, depth: int, processes: Optional[int] = None) -> dict[int, int]:
+    """
+    Counts the leaves below every root move (PASS if the side to move has to pass) on a process pool.
+    """
+
+    if depth == 0:
+        return {}
+    processes = processes or os.cpu_count() or 1
+    own, opp = board._masks(color)
+    tasks = _split(own, opp, depth, processes * TASKS_PER_PROCESS)
+    if processes == 1:
+        results = list(map(_count, tasks))
+    else:
+        with Pool(processes) as pool:
+            results = list(pool.imap_unordered(_count, tasks))
+
+    divided: dict[int, int] = {}
+    for path, nodes in results:
+        root = path[0] if path else PASS
+        divided[root] = divided.get(root, 0) + nodes
+    return divided
+
+
+def _square_name(square: int) -> str:
+    return "pass" if square == PASS else "{},{}".format(*divmod(square, BOARD_SIZE))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count the positions reached after `depth` moves.")
+    parser.add_argument("depth", type=int)
+    parser.add_argument("--board", default=None, help="serialized board, the starting position by default")
+    parser.add_argument("--color", default=Tile.BLACK.value, help="side to move, B or W")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes, all cores by default")
+    parser.add_argument("--divide", action="store_true", help="print the count below every root move")
+    parser.add_argument("--verify", action="store_true", help="also count with the Board methods and compare")
+    args = parser.parse_args()
+
+    board = Board.deserialize(args.board) if args.board else Board()
+    if board is None:
+        parser.error("invalid board")
+    color = Tile(args.color)
+
+    started = time.perf_counter()
+    divided = run_perft(board, color, args.depth, args.processes)
+    elapsed = time.perf_counter() - started
+    nodes = sum(divided.values()) if divided else 1
+    if args.divide:
+        for square, count in sorted(divided.items()):
+            print(f"{_square_name(square)}: {count}")
+    print(f"[INFO] perft({args.depth}) = {nodes} in {elapsed:.2f}s ({nodes / elapsed:,.0f} nodes/s)")
+
+    if args.verify:
+        started = time.perf_counter()
+        expected = perft_board(board, color, args.depth)
+        print(f"[INFO] Board methods: {expected} in {time.perf_counter() - started:.2f}s")
+        if expected != nodes:
+            print("[WARNING] Counts differ!")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
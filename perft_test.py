@@ -0,0 +1,44 @@
+from board import Board, Tile
+from perft import PASS, perft, perft_board, run_perft
+
+STARTING_COUNTS = [1, 4, 12, 56, 244, 1396, 8200, 55092]
+
+
+def test_perft_matches_known_counts():
+    own, opp = Board()._masks(Tile.BLACK)
+    for depth, expected in enumerate(STARTING_COUNTS):
+        assert perft(own, opp, depth) == expected, f'test_perft_matches_known_counts(): wrong count at depth {depth}'
+    assert sum(run_perft(Board(), Tile.BLACK, 7, processes=2).values()) == STARTING_COUNTS[7], \
+        'test_perft_matches_known_counts(): split count differs'
+
+
+def test_divide_credits_root_moves_at_shallow_depths():
+    for depth in (1, 2):
+        divided = run_perft(Board(), Tile.BLACK, depth, processes=1)
+        assert PASS not in divided and len(divided) == 4, \
+            f'test_divide_credits_root_moves_at_shallow_depths(): wrong root moves at depth {depth}: {divided}'
+        assert set(divided.values()) == {STARTING_COUNTS[depth] // 4}, \
+            f'test_divide_credits_root_moves_at_shallow_depths(): wrong counts at depth {depth}: {divided}'
+
+
+def test_board_methods_agree_with_bitboards():
+    boards = [
+        (Board.deserialize("........|........|..W.....|..BBB...|..WBW...|...WBB..|........|........"), Tile.WHITE),
+        (Board.deserialize("WWWWWWWW|WBBBBBBW|WB....BW|WB.WB.BW|WB.BW.BW|WB....BW|WBBBBBBW|WWWWWWW."), Tile.BLACK),
+    ]
+    for board, color in boards:
+        for depth in range(4):
+            own, opp = board._masks(color)
+            assert perft_board(board, color, depth) == perft(own, opp, depth), \
+                f'test_board_methods_agree_with_bitboards(): counts differ at depth {depth}'
+
+    board = Board.deserialize("BBBBBBBB|BBBBBBBB|BBBBBBBB|BBBBBBBB|BBBBBBBB|BBBBBBBB|BBBBBBBW|BBBBBBW.")
+    assert run_perft(board, Tile.WHITE, 3, processes=1) == {PASS: 1}, \
+        'test_board_methods_agree_with_bitboards(): pass not counted'
+
+
+if __name__ == "__main__":
+    test_perft_matches_known_counts()
+    test_divide_credits_root_moves_at_shallow_depths()
+    test_board_methods_agree_with_bitboards()
+    print("perft_test.py tested successful, all tests passed")
@@ -0,0 +1,211 @@
+"""
+Headless self-play between two engine configurations, used for engine tuning.
+
+    python selfplay.py --games 2000 --time-budget 0.05 --b '{"mobility_weight": 12}'
+
+Games are played in pairs from the same seeded random opening with colours swapped,
+and the match stops early once the sequential probability ratio test accepts either
+H0 (B is no better than A by `elo0`) or H1 (B is stronger by `elo1`).
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import math
+import os
+import random
+import time
+from dataclasses import dataclass, replace
+from multiprocessing import Pool
+from typing import Optional
+from ai import Engine, EngineConfig
+from board import Board, Tile
+
+WIN = 1.0
+DRAW = 0.5
+LOSS = 0.0
+PSEUDO_GAMES = 0.5  # added to every outcome when computing the LLR
+
+
+@dataclass(frozen=True)
+class GameTask:
+    index: int
+    seed: int
+    opening_plies: int
+    config_a: EngineConfig
+    config_b: EngineConfig
+
+
+@dataclass(frozen=True)
+class GameResult:
+    index: int
+    score_b: float  # from the point of view of engine B
+    plies: int
+    cpu_seconds: float
+
+
+def random_opening(seed: int, plies: int) -> tuple[Board, Tile]:
+    rng = random.Random(seed)
+    board = Board()
+    turn = Tile.BLACK
+    for _ in range(plies):
+        if board.winner() != Tile.EMPTY:
+            break
+        row = rng.choice(board.rows_with_valid_moves(turn))
+        col = rng.choice(board.tiles_with_valid_move(turn, row))
+        board.place(row, col, turn)
+        turn = turn.opposite()
+    return board, turn
+
+
+def play_game(task: GameTask) -> GameResult:
+    """
+    Plays a single game. Even indices give engine A the black tiles, odd ones give them to engine B,
+    and both games of a pair start from the same opening.
+    """
+
+    cpu_started = time.process_time()
+    board, turn = random_opening(task.seed + task.index // 2, task.opening_plies)
+    b_color = Tile.WHITE if task.index % 2 == 0 else Tile.BLACK
+    engines = {
+        b_color.opposite(): Engine(task.config_a),
+        b_color: Engine(task.config_b),
+    }
+
+    plies = 0
+    while board.winner() == Tile.EMPTY:
+        row, col = engines[turn].choose_move(board, turn)
+        board.place(row, col, turn)
+        turn = turn.opposite()
+        plies += 1
+
+    scores = board.scores()
+    if scores[b_color] > scores[b_color.opposite()]:
+        score_b = WIN
+    elif scores[b_color] < scores[b_color.opposite()]:
+        score_b = LOSS
+    else:
+        score_b = DRAW
+    return GameResult(task.index, score_b, plies, time.process_time() - cpu_started)
+
+
+def expected_score(elo: float) -> float:
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def sprt_llr(wins: int, draws: int, losses: int, elo0: float, elo1: float) -> float:
+    """
+    Log-likelihood ratio of H1 (elo = `elo1`) against H0 (elo = `elo0`) for the observed results,
+    using the normal approximation of the trinomial model. Every outcome gets PSEUDO_GAMES extra
+    games, so one-sided results still have a variance and cross the bounds.
+    """
+
+    if wins + draws + losses == 0:
+        return 0.0
+    wins, draws, losses = wins + PSEUDO_GAMES, draws + PSEUDO_GAMES, losses + PSEUDO_GAMES
+    games = wins + draws + losses
+
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+
+    s0 = expected_score(elo0)
+    s1 = expected_score(elo1)
+    return (s1 - s0) * (2 * score - s0 - s1) * games / (2 * variance)
+
+
+def sprt_bounds(alpha: float, beta: float) -> tuple[float, float]:
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def elo_difference(score: float) -> float:
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def run_match(config_a: EngineConfig, config_b: EngineConfig, games: int, processes: Optional[int] = None,
+              seed: int = 0, opening_plies: int = 6, elo0: float = 0.0, elo1: float = 10.0,
+              alpha: float = 0.05, beta: float = 0.05) -> dict:
+    processes = processes or os.cpu_count() or 1
+    lower, upper = sprt_bounds(alpha, beta)
+    tasks = [GameTask(i, seed, opening_plies, config_a, config_b) for i in range(games)]
+    wins = draws = losses = 0
+    plies = 0
+    cpu_seconds = 0.0
+    verdict = "inconclusive"
+
+    started = time.perf_counter()
+    with Pool(processes) as pool:
+        for result in pool.imap_unordered(play_game, tasks):
+            if result.score_b == WIN:
+                wins += 1
+            elif result.score_b == DRAW:
+                draws += 1
+            else:
+                losses += 1
+            plies += result.plies
+            cpu_seconds += result.cpu_seconds
+
+            llr = sprt_llr(wins, draws, losses, elo0, elo1)
+            played = wins + draws + losses
+            if played % 10 == 0:
+                print(f"[INFO] {played} games: +{wins} ={draws} -{losses}, LLR {llr:.2f} [{lower:.2f}, {upper:.2f}]")
+            if llr >= upper:
+                verdict = "H1"
+                break
+            if llr <= lower:
+                verdict = "H0"
+                break
+        pool.terminate()
+    wall_seconds = time.perf_counter() - started
+
+    played = wins + draws + losses
+    return {
+        "games": played,
+        "wins": wins,
+        "draws": draws,
+        "losses": losses,
+        "score": (wins + draws / 2) / played if played else 0.0,
+        "elo": elo_difference((wins + draws / 2) / played) if played else 0.0,
+        "llr": sprt_llr(wins, draws, losses, elo0, elo1),
+        "verdict": verdict,
+        "wall_seconds": wall_seconds,
+        "games_per_second": played / wall_seconds if wall_seconds else 0.0,
+        "plies_per_second": plies / wall_seconds if wall_seconds else 0.0,
+        "processes": processes,
+        "core_utilisation": cpu_seconds / (wall_seconds * processes) if wall_seconds else 0.0,
+    }
+
+
+def _config(overrides: str, time_budget: float) -> EngineConfig:
+    return replace(EngineConfig(time_budget=time_budget), **json.loads(overrides))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play engine A against engine B and run an SPRT.")
+    parser.add_argument("--a", default="{}", help="JSON object of EngineConfig overrides for engine A")
+    parser.add_argument("--b", default="{}", help="JSON object of EngineConfig overrides for engine B")
+    parser.add_argument("--games", type=int, default=1000, help="maximum number of games")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes, all cores by default")
+    parser.add_argument("--time-budget", type=float, default=0.05, help="seconds per move for both engines")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--opening-plies", type=int, default=6, help="random moves played before the engines take over")
+    parser.add_argument("--elo0", type=float, default=0.0)
+    parser.add_argument("--elo1", type=float, default=10.0)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    args = parser.parse_args()
+
+    summary = run_match(
+        _config(args.a, args.time_budget), _config(args.b, args.time_budget),
+        args.games, args.processes, args.seed, args.opening_plies,
+        args.elo0, args.elo1, args.alpha, args.beta,
+    )
+    print(f"[INFO] Result: +{summary['wins']} ={summary['draws']} -{summary['losses']} "
+          f"({summary['elo']:+.1f} Elo), SPRT verdict: {summary['verdict']}")
+    print(f"[INFO] {summary['games_per_second']:.2f} games/s on {summary['processes']} processes, "
+          f"core utilisation {summary['core_utilisation']:.0%}")
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import math
+from ai import EngineConfig
+from selfplay import run_match, sprt_bounds, sprt_llr
+
+FAST = EngineConfig(time_budget=1.0, max_depth=1, endgame_empties=0)
+
+
+def test_llr_follows_the_results():
+    assert sprt_llr(60, 20, 20, 0, 10) > 0, 'test_llr_follows_the_results(): wins do not favour H1'
+    assert sprt_llr(20, 20, 60, 0, 10) < 0, 'test_llr_follows_the_results(): losses do not favour H0'
+    assert sprt_llr(0, 0, 0, 0, 10) == 0, 'test_llr_follows_the_results(): no games is not neutral'
+
+    llrs = [sprt_llr(50 + extra, 20, 30, 0, 10) for extra in range(0, 50, 10)]
+    assert llrs == sorted(llrs) and len(set(llrs)) == len(llrs), \
+        'test_llr_follows_the_results(): more wins did not raise the LLR'
+    llrs = [sprt_llr(50, 20, 30 + extra, 0, 10) for extra in range(0, 50, 10)]
+    assert llrs == sorted(llrs, reverse=True) and len(set(llrs)) == len(llrs), \
+        'test_llr_follows_the_results(): more losses did not lower the LLR'
+
+
+def test_one_sided_results_reach_the_bounds():
+    lower, upper = sprt_bounds(0.05, 0.05)
+    assert sprt_llr(20, 0, 0, 0, 10) >= upper, 'test_one_sided_results_reach_the_bounds(): sweep does not accept H1'
+    assert sprt_llr(0, 0, 20, 0, 10) <= lower, 'test_one_sided_results_reach_the_bounds(): whitewash does not accept H0'
+    assert sprt_llr(0, 100, 0, 0, 10) < 0, 'test_one_sided_results_reach_the_bounds(): draws favour H1'
+
+
+def test_sprt_bounds():
+    lower, upper = sprt_bounds(0.05, 0.05)
+    assert math.isclose(lower, -math.log(19)) and math.isclose(upper, math.log(19)), \
+        f'test_sprt_bounds(): wrong bounds {lower}, {upper}'
+    lower, upper = sprt_bounds(0.05, 0.1)
+    assert math.isclose(lower, math.log(0.1 / 0.95)) and math.isclose(upper, math.log(0.9 / 0.05)), \
+        f'test_sprt_bounds(): wrong bounds {lower}, {upper}'
+
+
+def test_match_pairs_games_with_colours_swapped():
+    summary = run_match(FAST, FAST, games=2, processes=1)
+    assert summary["games"] == 2 and summary["wins"] + summary["draws"] + summary["losses"] == 2, \
+        f'test_match_pairs_games_with_colours_swapped(): wrong totals {summary}'
+    assert summary["wins"] == summary["losses"] and summary["score"] == 0.5, \
+        f'test_match_pairs_games_with_colours_swapped(): equal engines did not split the pair {summary}'
+    assert summary["verdict"] == "inconclusive", 'test_match_pairs_games_with_colours_swapped(): verdict after 2 games'
+
+
+if __name__ == '__main__':
+    test_llr_follows_the_results()
+    test_one_sided_results_reach_the_bounds()
+    test_sprt_bounds()
+    test_match_pairs_games_with_colours_swapped()
+    print("Self-play tested successful, all tests passed")
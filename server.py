@@ -1,65 +1,402 @@
-from netcode import ServerChannel
-from board import Board, Tile, deserialize_place
+import argparse
+import time
+from collections import deque
+from threading import RLock, Thread
+from typing import Optional, Union
+from netcode import (ANY, BINARY_PROTOCOL, DELTA_PROTOCOL, TEXT_PROTOCOL, Mailbox, Match, Matcher, Message,
+                     ReceiveCancelled, ServerChannel, negotiate_protocol)
+from board import Board, Tile, deserialize_place, pack_delta, unpack_place
+from ai import COMPUTER_UID, Engine
+from journal import JOURNAL_PATH, Journal, JournalGame
+from book import BOOK_PATH, OpeningBook, open_book
+import log
+from metrics import METRICS_PORT, REGISTRY, MetricsFile, serve_http
 
+BOARD_ACK_SECONDS = REGISTRY.histogram("othello_board_ack_seconds", "From sending the board to its board-ack.")
+TURN_SECONDS = REGISTRY.histogram("othello_turn_seconds", "From your-turn to the player's move, on the server.")
+ENGINE_SECONDS = REGISTRY.histogram("othello_engine_seconds", "Time the computer took for a move.")
+REJOIN_SECONDS = 60.0  # how long a recovered game waits for its players to connect again
 
-def wait_for_players(channel: ServerChannel) -> dict[Tile, str]:
-    print("[INFO] Waiting for players...")
-    clients: set[str] = set()
 
-    while len(clients) < 2:
-        message = channel.receive_any()
-        if message.tag == "connected":
-            clients.add(message.sender)
-        elif message.tag == "disconnected":
-            clients.discard(message.sender)
-
-    black_uid = clients.pop()
-    white_uid = clients.pop()
-    return {Tile.BLACK: black_uid, Tile.WHITE: white_uid}
-
-
-def game_loop(channel: ServerChannel, players: dict[Tile, str]):
-    print("[INFO] Starting the game!")
-    board = Board()
-    turn = Tile.BLACK
-
-    while board.winner() == Tile.EMPTY:
-        messages = channel.flush_mailbox()
-        for message in messages:
-            if message.tag == "disconnected" and message.sender in players.values:
-                print(f"[INFO] Player ({message.sender}) left the game!")
-                winner = Tile.WHITE if players[Tile.BLACK] == message.sender else Tile.BLACK
-                print(f"[INFO] Game finished, winner: {winner}")
-                channel.broadcast("winner", winner.value)
+class PlayerLeft(Exception):
+    """
+    Raised while a room waits on a player if one of the room's players disconnects.
+    """
+
+    def __init__(self, uid: str) -> None:
+        super().__init__(uid)
+        self.uid = uid
+
+
+class RoomChannel:
+    """
+    The part of a ServerChannel seen by a single game. Messages from the room's players are routed
+    into the room's own mailbox by RoomManager, and broadcasts only reach the room's players,
+    so `game_loop` can run unchanged next to other games on the same connection.
+    Boards and moves are encoded in the protocol version negotiated with each player. Players using
+    DELTA_PROTOCOL get one snapshot and then only the moves played, plus a new snapshot on `resync`.
+    A room recovered from the journal is given `rejoin_timeout`, the time its players have to connect again.
+    """
+
+    def __init__(self, channel: ServerChannel, players: dict[Tile, str],
+                 protocols: Optional[dict[str, int]] = None, rejoin_timeout: Optional[float] = None) -> None:
+        self._channel = channel
+        self._players = players
+        self._protocols = protocols or {}
+        self._mailbox = Mailbox()
+        self._snapshot = b""  # latest packed board, for resync requests
+        self._synced: set[str] = set()  # DELTA_PROTOCOL players that already got a snapshot
+        self._leaving = tuple(Match(uid, "disconnected") for uid in players.values() if uid != COMPUTER_UID)
+        self._rejoin_timeout = rejoin_timeout
+        self._absent = [] if rejoin_timeout is None else [uid for uid in players.values() if uid != COMPUTER_UID]
+
+    def deliver(self, message: Message) -> None:
+        self._mailbox.put(message)
+
+    def receive_matching(self, condition: Matcher, timeout: Optional[float] = None) -> Message:
+        return self._mailbox.receive_matching(condition, timeout)
+
+    def receive_any(self) -> Message:
+        return self.receive_matching(ANY)
+
+    def receive_from_players(self, *conditions: Match, timeout: Optional[float] = None) -> Message:
+        """
+        Wait for a message matching one of `conditions`, raising PlayerLeft if a player disconnects first.
+        """
+
+        message = self.receive_matching(conditions + self._leaving, timeout)
+        if message.tag == "disconnected":
+            raise PlayerLeft(message.sender)
+        return message
+
+    def flush_mailbox(self) -> list[Message]:
+        return self._mailbox.flush()
+
+    def awaits_rejoin(self, uid: str) -> bool:
+        return uid in self._absent
+
+    def rejoin(self, message: Message, protocol: int) -> None:
+        """
+        Hand the `connected` message of a player coming back to a recovered game to `wait_for_rejoin`.
+        """
+
+        self._protocols[message.sender] = protocol
+        self._synced.discard(message.sender)
+        self.deliver(message)
+
+    def wait_for_rejoin(self) -> None:
+        """
+        Wait until every player of a recovered game has connected again. Raises PlayerLeft for the
+        first player still missing once `rejoin_timeout` has passed.
+        """
+
+        if self._rejoin_timeout is None:
+            return
+        deadline = time.monotonic() + self._rejoin_timeout
+        while self._absent:
+            try:
+                message = self.receive_from_players(*(Match(uid, "connected") for uid in self._absent),
+                                                    timeout=max(deadline - time.monotonic(), 0))
+            except TimeoutError:
+                raise PlayerLeft(self._absent[0]) from None
+            self._absent.remove(message.sender)
+
+    def send_to_client(self, client_uid: str, tag: str, content: Union[str, bytes, None] = None) -> None:
+        self._channel.send_to_client(client_uid, tag, content)
+
+    def broadcast(self, tag: str, content: Union[str, bytes, None] = None) -> None:
+        for uid in self._players.values():
+            if uid != COMPUTER_UID:
+                self._channel.send_to_client(uid, tag, content)
+
+    def protocol(self, uid: str) -> int:
+        return self._protocols.get(uid, TEXT_PROTOCOL)
+
+    def broadcast_board(self, board: Board, side: Tile, sequence: int) -> None:
+        """
+        Send the position before a turn to every player that is not following it through deltas.
+        """
+
+        self._snapshot = board.pack(side, sequence)
+        serialized = None
+        for uid in self._players.values():
+            if uid == COMPUTER_UID:
+                continue
+            protocol = self.protocol(uid)
+            if protocol == DELTA_PROTOCOL:
+                if uid not in self._synced:
+                    self.send_snapshot(uid)
+            elif protocol == BINARY_PROTOCOL:
+                self._channel.send_to_client(uid, "board-bin", self._snapshot)
+            else:
+                serialized = serialized or board.serialize()
+                self._channel.send_to_client(uid, "board", serialized)
+
+    def broadcast_move(self, board: Board, row: int, col: int, color: Tile, sequence: int) -> None:
+        """
+        Send a valid move just played on `board` to the players using DELTA_PROTOCOL, if there are any.
+        """
+
+        if not self._synced:
+            return
+        delta = pack_delta(sequence, row, col, color, board)
+        for uid in self._players.values():
+            if uid in self._synced:
+                self._channel.send_to_client(uid, "move-bin", delta)
+
+    def send_snapshot(self, uid: str) -> None:
+        if self.protocol(uid) != DELTA_PROTOCOL:
+            return
+        self._channel.send_to_client(uid, "board-bin", self._snapshot)
+        self._synced.add(uid)
+
+    def needs_board_ack(self, uid: str) -> bool:
+        return self.protocol(uid) != DELTA_PROTOCOL
+
+    def your_turn(self, uid: str, side: Tile, sequence: int) -> None:
+        if self.protocol(uid) == DELTA_PROTOCOL:
+            self._channel.send_to_client(uid, "your-turn", f"{side.value},{sequence}")
+        else:
+            self._channel.send_to_client(uid, "your-turn", side.value)
+
+    def receive_place(self, uid: str) -> Optional[tuple[int, int]]:
+        """
+        Wait for the move of `uid`, answering the resync requests that arrive in the meantime.
+        Raises PlayerLeft if a player disconnects first.
+        """
+
+        if self.protocol(uid) == TEXT_PROTOCOL:
+            return deserialize_place(self.receive_from_players(Match(uid, "place")).content)
+
+        while True:
+            message = self.receive_from_players(Match(uid, "place-bin"), Match(tag="resync"))
+            if message.tag == "place-bin":
+                return unpack_place(message.content)
+            self.send_snapshot(message.sender)
+
+
+class RoomManager:
+    """
+    Hosts any number of concurrent games on one ServerChannel. Connecting players are queued
+    and paired in arrival order, each pair gets its own room running `game_loop` in a thread,
+    and every incoming message is routed to the room of its sender. A player connecting again
+    while their game is still ending is queued for the next game once the room closes.
+    """
+
+    def __init__(self, channel: ServerChannel, against_computer: bool = False, journal: Optional[Journal] = None,
+                 book: Optional[OpeningBook] = None, rejoin_timeout: float = REJOIN_SECONDS) -> None:
+        self._channel = channel
+        self._against_computer = against_computer
+        self._journal = journal
+        self._book = book
+        self._rejoin_timeout = rejoin_timeout
+        self._waiting: deque[str] = deque()
+        self._rooms: dict[str, RoomChannel] = {}  # player uid -> room
+        self._protocols: dict[str, int] = {}  # player uid -> negotiated protocol version
+        self._rejoining: dict[str, Message] = {}  # `connected` messages of players whose game is ending
+        self._lock = RLock()
+
+    def run(self) -> None:
+        """
+        Dispatch incoming messages until the channel is closed.
+        """
+
+        self.recover()
+        log.info("Waiting for players...")
+        while True:
+            try:
+                message = self._channel.receive_any()
+            except ReceiveCancelled:
                 return
+            self.dispatch(message)
+
+    def dispatch(self, message: Message) -> None:
+        with self._lock:
+            self._dispatch(message)
+
+    def _dispatch(self, message: Message) -> None:
+        room = self._rooms.get(message.sender)
+        if room is not None:
+            if message.tag == "connected" and room.awaits_rejoin(message.sender):
+                self._negotiate(message)
+                room.rejoin(message, self._protocols.get(message.sender, TEXT_PROTOCOL))
+            elif message.tag == "connected":
+                self._rejoining[message.sender] = message  # queued again once the room closes
+            else:
+                room.deliver(message)
+        elif message.tag == "connected":
+            self._negotiate(message)
+            if message.sender not in self._waiting:
+                self._waiting.append(message.sender)
+            self._start_games()
+        elif message.tag == "disconnected":
+            if message.sender in self._waiting:
+                self._waiting.remove(message.sender)
+            self._protocols.pop(message.sender, None)
+        else:
+            log.warning("Dropping message from a player outside any room: {}", message)
+
+    def _negotiate(self, message: Message) -> None:
+        if message.content:  # clients predating versioning send no offer and would not expect a reply
+            self._protocols[message.sender] = negotiate_protocol(message.content)
+            self._channel.send_to_client(message.sender, "protocol", str(self._protocols[message.sender]))
 
-        print(f"[INFO] Starting {turn}'s turn!")
-        print("[INFO] Sending board state...")
-        channel.broadcast("board", board.serialize())
-        channel.receive_matching(lambda m: m.sender == players[turn] and m.tag == "board-ack")
+    def _start_games(self) -> None:
+        needed = 1 if self._against_computer else 2
+        while len(self._waiting) >= needed:
+            black_uid = self._waiting.popleft()
+            white_uid = COMPUTER_UID if self._against_computer else self._waiting.popleft()
+            players = {Tile.BLACK: black_uid, Tile.WHITE: white_uid}
+            protocols = {uid: self._protocols[uid] for uid in players.values() if uid in self._protocols}
+            record = self._journal.start_game(players, protocols) if self._journal is not None else None
+            log.info("Starting a room for {} and {}", black_uid, white_uid)
+            self._open_room(players, protocols, record)
 
-        move = None
-        while move is None:
-            print("[INFO] Waiting for player's move...")
-            channel.send_to_client(players[turn], "your-turn", turn.value)
-            message = channel.receive_matching(lambda m: m.sender == players[turn] and m.tag == "place")
-            move = deserialize_place(message.content)
+    def recover(self) -> None:
+        """
+        Reopen the rooms of the games the journal shows in progress, continuing from their last move
+        once the players connect again. A player not back within `rejoin_timeout` loses the game.
+        """
 
-        row, col = move
-        board.place(row, col, turn)
+        if self._journal is None:
+            return
+        with self._lock:
+            for game in self._journal.recovered:
+                log.info("Recovering game {} after {} moves", game.game_id, len(game.moves))
+                self._open_room(game.players, game.protocols, self._journal.resume(game.game_id),
+                                game.board_at(), game.turn, len(game.moves), self._rejoin_timeout)
 
-        turn = turn.opposite()
+    def _open_room(self, players: dict[Tile, str], protocols: dict[str, int], record: Optional[JournalGame],
+                   board: Optional[Board] = None, turn: Tile = Tile.BLACK, sequence: int = 0,
+                   rejoin_timeout: Optional[float] = None) -> None:
+        room = RoomChannel(self._channel, players, protocols, rejoin_timeout)
+        for uid in players.values():
+            self._rooms[uid] = room
+        Thread(target=self._run_room, args=(room, players, record, board, turn, sequence), daemon=True).start()
 
-    winner = board.winner()
-    print(f"[INFO] Game finished, winner: {winner}")
+    def _run_room(self, room: RoomChannel, players: dict[Tile, str], record: Optional[JournalGame],
+                  board: Optional[Board], turn: Tile, sequence: int) -> None:
+        try:
+            game_loop(room, players, record, board, turn, sequence, self._book)
+        finally:
+            with self._lock:
+                for uid in players.values():
+                    if self._rooms.get(uid) is room:
+                        del self._rooms[uid]
+                        self._protocols.pop(uid, None)
+                for uid in players.values():
+                    if uid in self._rejoining:
+                        self._dispatch(self._rejoining.pop(uid))
+
+    @property
+    def active_rooms(self) -> int:
+        with self._lock:
+            return len(set(map(id, self._rooms.values())))
+
+
+def game_loop(channel: RoomChannel, players: dict[Tile, str], record: Optional[JournalGame] = None,
+              board: Optional[Board] = None, turn: Tile = Tile.BLACK, sequence: int = 0,
+              book: Optional[OpeningBook] = None):
+    """
+    Plays a game from the start, or from `board` after `sequence` moves when it is being recovered
+    and its players are back.
+    Moves and the outcome are written to `record` if the server keeps a journal, and the computer
+    plays its openings from `book` when there is one.
+    """
+
+    log.info("Starting the game!")
+    board = board if board is not None else Board()
+    engine = Engine(book=book) if COMPUTER_UID in players.values() else None
+
+    try:
+        channel.wait_for_rejoin()
+        while board.winner() == Tile.EMPTY:
+            messages = channel.flush_mailbox()
+            resyncs = set()
+            for message in messages:
+                if message.tag == "disconnected" and message.sender in players.values():
+                    raise PlayerLeft(message.sender)
+                if message.tag == "resync":
+                    resyncs.add(message.sender)
+
+            log.debug("Starting {}'s turn!", turn)
+            log.debug("Sending board state...")
+            board_sent = time.perf_counter()
+            channel.broadcast_board(board, turn, sequence)
+            for uid in resyncs:
+                channel.send_snapshot(uid)
+
+            if players[turn] == COMPUTER_UID:
+                log.debug("Computer is thinking...")
+                started = time.perf_counter()
+                move = engine.choose_move(board, turn)
+                ENGINE_SECONDS.observe(time.perf_counter() - started)
+                log.debug("Computer searched {} nodes to depth {}", engine.last_nodes, engine.last_depth)
+            else:
+                if channel.needs_board_ack(players[turn]):
+                    channel.receive_from_players(Match(players[turn], "board-ack"))
+                    BOARD_ACK_SECONDS.observe(time.perf_counter() - board_sent)
+
+                move = None
+                while move is None:
+                    log.debug("Waiting for player's move...")
+                    channel.your_turn(players[turn], turn, sequence)
+                    asked = time.perf_counter()
+                    move = channel.receive_place(players[turn])
+                    TURN_SECONDS.observe(time.perf_counter() - asked)
+                    if move is not None and not board._is_move_valid(turn, *move):
+                        log.warning("Rejecting invalid move {} from ({})", move, players[turn])
+                        move = None
+
+            row, col = move
+            board.place(row, col, turn)
+            if record is not None:
+                record.move(row, col, turn)
+            sequence += 1
+            channel.broadcast_move(board, row, col, turn, sequence)
+
+            turn = turn.opposite()
+        winner = board.winner()
+    except PlayerLeft as left:
+        log.info("Player ({}) left the game!", left.uid)
+        winner = Tile.WHITE if players[Tile.BLACK] == left.uid else Tile.BLACK
+
+    log.info("Game finished, winner: {}", winner)
+    if record is not None:
+        record.finish(winner)
     channel.broadcast("winner", winner.value)
 
 
 def main():
-    print("[INFO] Starting...")
-    with ServerChannel() as channel:
-        players = wait_for_players(channel)
-        game_loop(channel, players)
+    parser = argparse.ArgumentParser(description="Host Othello games over MQTT.")
+    parser.add_argument("--computer", action="store_true", help="pair every player with the engine")
+    parser.add_argument("--journal", default=JOURNAL_PATH, help="game journal, recovered on startup")
+    parser.add_argument("--no-journal", action="store_true", help="do not record or recover games")
+    parser.add_argument("--book", default=BOOK_PATH, help="opening book of the computer, used if it exists")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="serve Prometheus metrics on localhost at this port, 0 to disable")
+    parser.add_argument("--metrics-file", default=None, help="also rewrite the metrics into this file periodically")
+    args = parser.parse_args()
+
+    log.info("Starting...")
+    journal = Journal(args.journal) if not args.no_journal else None
+    book = open_book(args.book)
+    if book is not None:
+        log.info("Opening book with {} entries loaded", len(book))
+    metrics_server = serve_http(args.metrics_port) if args.metrics_port else None
+    metrics_file = MetricsFile(args.metrics_file) if args.metrics_file else None
+    try:
+        with ServerChannel() as channel:
+            RoomManager(channel, args.computer, journal, book).run()
+    finally:
+        if journal is not None:
+            journal.close()
+        if book is not None:
+            book.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if metrics_file is not None:
+            metrics_file.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,143 @@
+import pathlib
+import tempfile
+import time
+from threading import Lock
+from netcode import Message, SERVER_UID
+from board import Tile, pack_place
+from journal import Journal, JournalReader
+from server import RoomManager
+
+
+class RecordingChannel:
+    def __init__(self) -> None:
+        self.sent: list[tuple[str, str, str]] = []
+        self._lock = Lock()
+
+    def send_to_client(self, client_uid: str, tag: str, content=None) -> None:
+        with self._lock:
+            self.sent.append((client_uid, tag, content or ''))
+
+    def sent_to(self, uid: str) -> list[str]:
+        with self._lock:
+            return [tag for receiver, tag, _ in self.sent if receiver == uid]
+
+
+def wait_until(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_rooms_are_independent():
+    channel = RecordingChannel()
+    manager = RoomManager(channel)
+
+    for uid in ("a", "b", "c", "d", "e"):
+        manager.dispatch(Message(uid, SERVER_UID, "connected", ""))
+    assert manager.active_rooms == 2, 'test_rooms_are_independent(): expected two rooms'
+    assert wait_until(lambda: all(channel.sent_to(uid) == ["board"] for uid in "abcd")), \
+        'test_rooms_are_independent(): boards were not sent to the room players'
+    assert channel.sent_to("e") == [], 'test_rooms_are_independent(): waiting player received a message'
+
+    manager.dispatch(Message("c", SERVER_UID, "board-ack", ""))
+    assert wait_until(lambda: channel.sent_to("c") == ["board", "your-turn"]), \
+        'test_rooms_are_independent(): ack was not routed to the second room'
+    assert channel.sent_to("a") == ["board"], 'test_rooms_are_independent(): ack leaked into the first room'
+
+
+def test_protocol_is_negotiated_per_player():
+    channel = RecordingChannel()
+    manager = RoomManager(channel)
+
+    manager.dispatch(Message("a", SERVER_UID, "connected", "1,2"))
+    manager.dispatch(Message("b", SERVER_UID, "connected", ""))
+    assert channel.sent[0] == ("a", "protocol", "2"), 'test_protocol_is_negotiated_per_player(): no binary protocol'
+    assert wait_until(lambda: channel.sent_to("a") == ["protocol", "board-bin"] and channel.sent_to("b") == ["board"]), \
+        'test_protocol_is_negotiated_per_player(): boards were not encoded per player'
+
+    manager.dispatch(Message("a", SERVER_UID, "board-ack", ""))
+    assert wait_until(lambda: channel.sent_to("a")[-1:] == ["your-turn"]), \
+        'test_protocol_is_negotiated_per_player(): player was not asked to move'
+    manager.dispatch(Message("a", SERVER_UID, "place-bin", pack_place(2, 3)))
+    assert wait_until(lambda: channel.sent_to("b") == ["board", "board"]), \
+        'test_protocol_is_negotiated_per_player(): binary move was not applied'
+
+
+def test_delta_players_get_moves_and_resyncs():
+    channel = RecordingChannel()
+    manager = RoomManager(channel)
+
+    manager.dispatch(Message("a", SERVER_UID, "connected", "1,2,3"))
+    manager.dispatch(Message("b", SERVER_UID, "connected", "1,2,3"))
+    assert wait_until(lambda: channel.sent_to("a") == ["protocol", "board-bin", "your-turn"]), \
+        'test_delta_players_get_moves_and_resyncs(): board-ack was awaited or snapshot missing'
+
+    manager.dispatch(Message("a", SERVER_UID, "place-bin", pack_place(2, 3)))
+    assert wait_until(lambda: channel.sent_to("b") == ["protocol", "board-bin", "move-bin", "your-turn"]), \
+        'test_delta_players_get_moves_and_resyncs(): move was not sent as a delta'
+
+    manager.dispatch(Message("a", SERVER_UID, "resync", ""))
+    assert wait_until(lambda: channel.sent_to("a")[-1:] == ["board-bin"]), \
+        'test_delta_players_get_moves_and_resyncs(): resync was not answered'
+
+
+def test_player_leaving_mid_turn_closes_the_room():
+    channel = RecordingChannel()
+    manager = RoomManager(channel)
+
+    manager.dispatch(Message("a", SERVER_UID, "connected", ""))
+    manager.dispatch(Message("b", SERVER_UID, "connected", ""))
+    manager.dispatch(Message("a", SERVER_UID, "board-ack", ""))
+    assert wait_until(lambda: channel.sent_to("a") == ["board", "your-turn"]), \
+        'test_player_leaving_mid_turn_closes_the_room(): player was not asked to move'
+
+    manager.dispatch(Message("a", SERVER_UID, "disconnected", ""))
+    assert wait_until(lambda: manager.active_rooms == 0), 'test_player_leaving_mid_turn_closes_the_room(): room kept'
+    assert ("b", "winner", "W") in channel.sent, 'test_player_leaving_mid_turn_closes_the_room(): opponent did not win'
+
+    manager.dispatch(Message("b", SERVER_UID, "connected", ""))
+    manager.dispatch(Message("c", SERVER_UID, "connected", ""))
+    assert wait_until(lambda: manager.active_rooms == 1 and channel.sent_to("c") == ["board"]), \
+        'test_player_leaving_mid_turn_closes_the_room(): players were not paired again'
+
+
+def test_invalid_moves_are_rejected(tmp_path):
+    path = str(tmp_path / "games.journal")
+    channel = RecordingChannel()
+    with Journal(path) as journal:
+        manager = RoomManager(channel, journal=journal)
+        manager.dispatch(Message("a", SERVER_UID, "connected", ""))
+        manager.dispatch(Message("b", SERVER_UID, "connected", ""))
+        manager.dispatch(Message("a", SERVER_UID, "board-ack", ""))
+        assert wait_until(lambda: channel.sent_to("a") == ["board", "your-turn"]), \
+            'test_invalid_moves_are_rejected(): player was not asked to move'
+
+        for place in ("-1,0", "40,40", "9,9", "0,0", "3,3"):  # out of range, then occupied or without flips
+            asked = len(channel.sent_to("a"))
+            manager.dispatch(Message("a", SERVER_UID, "place", place))
+            assert wait_until(lambda: len(channel.sent_to("a")) == asked + 1), \
+                f'test_invalid_moves_are_rejected(): no answer to {place}'
+            assert channel.sent_to("a")[-1] == "your-turn", f'test_invalid_moves_are_rejected(): {place} was accepted'
+        assert channel.sent_to("b") == ["board"], 'test_invalid_moves_are_rejected(): turn passed on'
+
+        manager.dispatch(Message("a", SERVER_UID, "place", "2,3"))
+        assert wait_until(lambda: channel.sent_to("b") == ["board", "board"]), \
+            'test_invalid_moves_are_rejected(): valid move was not played'
+        manager.dispatch(Message("b", SERVER_UID, "disconnected", ""))
+        assert wait_until(lambda: manager.active_rooms == 0), 'test_invalid_moves_are_rejected(): room kept'
+    with JournalReader(path) as reader:
+        assert [move[:3] for move in reader.game(1).moves] == [(2, 3, Tile.BLACK)], \
+            'test_invalid_moves_are_rejected(): rejected moves were journaled'
+
+
+if __name__ == '__main__':
+    test_rooms_are_independent()
+    test_protocol_is_negotiated_per_player()
+    test_delta_players_get_moves_and_resyncs()
+    test_player_leaving_mid_turn_closes_the_room()
+    with tempfile.TemporaryDirectory() as directory:
+        test_invalid_moves_are_rejected(pathlib.Path(directory))
+    print("Server tested successful, all tests passed")
@@ -0,0 +1,94 @@
+from array import array
+from typing import NamedTuple, Optional
+
+EXACT = 0
+LOWER_BOUND = 1  # the search failed high, the real value is at least `value`
+UPPER_BOUND = 2  # the search failed low, the real value is at most `value`
+
+NO_MOVE = -1
+DEFAULT_MEMORY_BYTES = 4 * 1024 * 1024
+
+# key (8) + value (4) + depth (2) + flag (1) + move (1) + generation (1)
+_SLOT_BYTES = 17
+_SLOTS_PER_BUCKET = 2  # slot 0 is depth-preferred, slot 1 is always-replace
+
+
+class TTEntry(NamedTuple):
+    depth: int
+    value: int
+    flag: int
+    move: int
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of search results keyed by 64-bit Zobrist hashes.
+    Every bucket holds a depth-preferred slot, which keeps the deepest result seen for
+    the current search, and an always-replace slot, which keeps the most recent one.
+    All entries live in flat typed arrays so the table never grows past `memory_bytes`.
+    """
+
+    def __init__(self, memory_bytes: int = DEFAULT_MEMORY_BYTES) -> None:
+        buckets = max(1, memory_bytes // (_SLOT_BYTES * _SLOTS_PER_BUCKET))
+        buckets = 1 << (buckets.bit_length() - 1)  # round down to a power of two
+        self._mask = buckets - 1
+
+        slots = buckets * _SLOTS_PER_BUCKET
+        self._keys = array("Q", bytes(8 * slots))
+        self._values = array("i", bytes(4 * slots))
+        self._depths = array("h", [-1]) * slots  # -1 marks an empty slot
+        self._flags = array("b", bytes(slots))
+        self._moves = array("b", [NO_MOVE]) * slots
+        self._generations = array("B", bytes(slots))
+        self._generation = 0
+
+        self.probes = 0
+        self.hits = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._keys)
+
+    def new_search(self) -> None:
+        """
+        Age the stored entries, so the depth-preferred slots can be reclaimed by the next search.
+        """
+
+        self._generation = (self._generation + 1) & 0xFF
+
+    def clear(self) -> None:
+        for i in range(len(self._keys)):
+            self._keys[i] = 0
+            self._depths[i] = -1
+            self._moves[i] = NO_MOVE
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        self.probes += 1
+        slot = (key & self._mask) * _SLOTS_PER_BUCKET
+        for i in (slot, slot + 1):
+            if self._keys[i] == key and self._depths[i] >= 0:
+                self.hits += 1
+                return TTEntry(self._depths[i], self._values[i], self._flags[i], self._moves[i])
+        return None
+
+    def store(self, key: int, depth: int, value: int, flag: int, move: int = NO_MOVE) -> None:
+        slot = (key & self._mask) * _SLOTS_PER_BUCKET
+
+        preferred = self._depths[slot]
+        if (self._keys[slot] == key or preferred < 0 or depth >= preferred
+                or self._generations[slot] != self._generation):
+            if move == NO_MOVE and self._keys[slot] == key:
+                move = self._moves[slot]  # keep the best move of a shallower search
+        else:
+            slot += 1
+            if move == NO_MOVE and self._keys[slot] == key:
+                move = self._moves[slot]
+
+        self._keys[slot] = key
+        self._values[slot] = value
+        self._depths[slot] = depth
+        self._flags[slot] = flag
+        self._moves[slot] = move
+        self._generations[slot] = self._generation
@@ -0,0 +1,21 @@
+from transposition import EXACT, LOWER_BOUND, TranspositionTable
+
+
+def test_replacement_policy():
+    table = TranspositionTable(memory_bytes=1024)
+    key = 0x1234
+    colliding_key = key + table.capacity * 16  # same bucket, different key
+
+    table.store(key, depth=6, value=10, flag=EXACT, move=19)
+    table.store(colliding_key, depth=2, value=-3, flag=LOWER_BOUND, move=20)
+    assert table.probe(key) == (6, 10, EXACT, 19), 'test_replacement_policy(): deep entry was replaced'
+    assert table.probe(colliding_key) == (2, -3, LOWER_BOUND, 20), 'test_replacement_policy(): shallow entry was lost'
+
+    table.new_search()
+    table.store(colliding_key + table.capacity * 16, depth=1, value=0, flag=EXACT)
+    assert table.probe(key) is None, 'test_replacement_policy(): stale deep entry was kept'
+
+
+if __name__ == '__main__':
+    test_replacement_policy()
+    print("Transposition table tested successful, all tests passed")